@@ -1,15 +1,25 @@
+import time
 from datetime import datetime, timezone
 from typing import Any, Dict, Literal, List
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field, ConfigDict, conlist, constr
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ...core.encoding import encode_payload
+from ...core.idempotency import IdempotencyCache, IdempotencyConflict, idempotency_key, payload_digest
 from ...core.ingestor import SovereignIngestor
-from ...core.auth import get_verified_creator
+from ...core.ledger_export import ExportFilter, stream_ndjson
+from ...core.merkle import inclusion_proof
+from ...core.profiling import incr, record, stage
+from ...core.telemetry import MAX_RANGE, MAX_SERIES_ROWS, EcgRollups
+from ...core.auth import CreatorContext, get_replayable_creator, get_verified_creator
+from ...core.container import get_ingestor, get_sentinel
 from ...database import get_db
-from ...security import anubis
+from ...security.anubis import AnubisSentinel
+from ...security.signatures import SignatureError
 import structlog
 
 # Logger estructurado con contexto inyectado de fábrica
@@ -17,6 +27,13 @@ logger = structlog.get_logger("tamv.gate")
 
 router = APIRouter(prefix="/isabella", tags=["Sovereignty"])
 
+# Respaldo local (sin Redis) cuando la app no registra una caché compartida
+_local_idempotency = IdempotencyCache()
+
+
+def get_idempotency_cache(request: Request) -> IdempotencyCache:
+    return getattr(request.app.state, "idempotency", None) or _local_idempotency
+
 # ====== Modelos de Datos de Grado Militar (Pydantic V2) ======
 
 class SovereignPayload(BaseModel):
@@ -34,16 +51,6 @@ class SovereignPayload(BaseModel):
     quantum_sig: str | None = Field(default=None, min_length=64, max_length=2048)
     data: Dict[str, Any] | None = None
 
-class CreatorContext(BaseModel):
-    """Contexto de Identidad Soberana extraído de la firma Ed25519."""
-    model_config = ConfigDict(str_strip_whitespace=True)
-
-    did: str = Field(..., min_length=3, max_length=255)
-    pubkey: str = Field(..., min_length=16, max_length=512)
-    signature: str = Field(..., min_length=32, max_length=1024)
-    device_id: str = Field(default="ROOT_CONSOLE", max_length=128)
-    assurance_level: Literal["low", "substantial", "high"] = "low"
-
 # ====== Lógica de Despacho (Dispatch) ======
 
 @router.post(
@@ -52,29 +59,40 @@ class CreatorContext(BaseModel):
     summary="Anclaje de acción soberana en el Ledger Civilizatorio",
     responses={
         429: {"description": "ANUBIS: Intrusión detectada o límite excedido"},
-        401: {"description": "Falla de integridad criptográfica en la firma"},
+        401: {"description": "Falla de integridad criptográfica en la firma, o firma repetida sin respuesta guardada"},
+        409: {"description": "Clave de idempotencia aún en proceso o reutilizada con otro payload"},
         500: {"description": "Colapso del sistema de persistencia inmutable"}
     },
 )
 async def dispatch_sovereign_action(
     request: Request,
+    response: Response,
     payload: SovereignPayload,
-    creator_ctx: CreatorContext = Depends(get_verified_creator),
-    db: AsyncSession = Depends(get_db),
+    creator_ctx: CreatorContext = Depends(get_replayable_creator),
+    ingestor: SovereignIngestor = Depends(get_ingestor),
+    anubis: AnubisSentinel = Depends(get_sentinel),
+    idempotency: IdempotencyCache = Depends(get_idempotency_cache),
 ):
     """
     Punto de entrada de alta presión para Isabella IA.
     Coordina la validación de identidad, el escudo ANUBIS y la persistencia inmutable.
+    Un reintento con la misma clave de idempotencia recibe la respuesta original,
+    también si reenvía la misma petición firmada; una firma repetida sin respuesta
+    guardada es un replay y se rechaza.
     """
-    ingestor = SovereignIngestor(db)
+    started = time.perf_counter()
     client_ip = request.client.host if request.client else "unknown"
     
     # Correlación única para trazabilidad en microservicios
-    trace_id = request.headers.get("x-trace-id", str(uuid.uuid4()))
+    client_trace_id = request.headers.get("x-trace-id")
+    trace_id = client_trace_id or str(uuid.uuid4())
     request_id = str(uuid.uuid4())
 
     # 1. ESCUDO ANUBIS: Verificación de Reputación e IP
-    if not anubis.is_ip_allowed(client_ip):
+    with stage("anubis"):
+        allowed = anubis.is_ip_allowed(client_ip)
+    if not allowed:
+        incr("anubis_denied")
         logger.warning("ANUBIS_INTERCEPTION", 
             ip=client_ip, action=payload.action, trace_id=trace_id, reason="Blacklisted or RateLimited")
         raise HTTPException(
@@ -82,7 +100,22 @@ async def dispatch_sovereign_action(
             detail="access_denied_by_anubis_sentinel",
         )
 
+    # Única codificación: el mismo texto canónico da la clave, el digest y el hash del Crum
     try:
+        encoded = encode_payload(payload.model_dump())
+    except ValueError as e:
+        logger.warning("payload_rejected", ip=client_ip, error=str(e), trace_id=trace_id)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"integrity_validation_error: {str(e)}",
+        )
+    key = idempotency_key(creator_ctx.did, client_trace_id, encoded.encoded)
+
+    async def anchor() -> Dict[str, Any]:
+        if creator_ctx.replayed:
+            # La firma ya se usó y no hay respuesta que devolver: no es un reintento
+            raise SignatureError("replayed_request")
+
         # 2. PERFIL DE AGENTE (Metadatos de Auditoría)
         agent_profile = {
             "ip": client_ip,
@@ -95,7 +128,7 @@ async def dispatch_sovereign_action(
         # 3. COMPROMISO EN EL LEDGER (Inmutabilidad)
         # Solo se permite la ingesta si el contexto del creador es verificado
         crum_id = await ingestor.commit_crum(
-            raw_data=payload.model_dump(),
+            raw_data=encoded,
             agent_profile=agent_profile,
             creator_ctx=creator_ctx.model_dump(),
             verified_by_root=(creator_ctx.assurance_level == "high"),
@@ -127,10 +160,35 @@ async def dispatch_sovereign_action(
                 "risk_score": payload.risk,
                 "layer": "quantum" if payload.quantum_sig else "standard",
                 "non_repudiation_token": f"TAMV-CERT-{crum_id[:8]}",
+                "inclusion_proof": f"/isabella/ledger/proof/{crum_id}",
                 "creator_did": creator_ctx.did,
             },
         }
 
+    try:
+        result, replayed = await idempotency.run(key, payload_digest(encoded.encoded), anchor)
+        if replayed:
+            # Reintento: el Crum ya existe, no se vuelve a anclar
+            incr("dispatch_replayed")
+            response.headers["x-idempotent-replay"] = "true"
+            logger.info("sovereign_action_replayed", id=result["crum_id"], creator=creator_ctx.did, trace_id=trace_id)
+        record("dispatch", time.perf_counter() - started)
+        return result
+
+    except IdempotencyConflict as e:
+        logger.warning("idempotency_conflict", creator=creator_ctx.did, trace_id=trace_id, reason=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+        )
+
+    except SignatureError as e:
+        logger.warning("creator_signature_rejected", creator=creator_ctx.did, reason=str(e), trace_id=trace_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+        )
+
     except ValueError as e:
         # Violación de reglas de negocio o hash: Notificar a la red de defensa
         anubis.log_violation(client_ip, reason=str(e))
@@ -148,3 +206,166 @@ async def dispatch_sovereign_action(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="critical_infrastructure_failure",
         )
+
+
+# ====== Exportación del Ledger (Auditoría) ======
+
+@router.get(
+    "/ledger/export",
+    summary="Exportación en streaming del Ledger Civilizatorio (NDJSON)",
+    response_class=StreamingResponse,
+    responses={
+        403: {"description": "Exportar Crums ajenos requiere rol de auditor"},
+        429: {"description": "ANUBIS: Intrusión detectada o límite excedido"},
+    },
+)
+async def export_ledger(
+    request: Request,
+    creator_did: str | None = Query(default=None, min_length=3, max_length=255),
+    since: datetime | None = Query(default=None),
+    until: datetime | None = Query(default=None),
+    risk_level: List[Literal["low", "medium", "high", "critical"]] | None = Query(default=None),
+    action_type: str | None = Query(default=None, max_length=128, pattern=r"^[A-Z0-9_]+$"),
+    limit: int | None = Query(default=None, ge=1),
+    creator_ctx: CreatorContext = Depends(get_verified_creator),
+    db: AsyncSession = Depends(get_db),
+    anubis: AnubisSentinel = Depends(get_sentinel),
+):
+    """
+    Flujo NDJSON incremental con paginación keyset (created_at, id).
+    Memoria constante sin importar cuántos Crums se exporten.
+    Auditores (por fingerprint de llave) exportan todo; el resto, solo sus propios Crums.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    if not anubis.is_ip_allowed(client_ip):
+        logger.warning("ANUBIS_INTERCEPTION", ip=client_ip, action="LEDGER_EXPORT", reason="Blacklisted or RateLimited")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="access_denied_by_anubis_sentinel",
+        )
+
+    creator_fingerprint = None
+    if not creator_ctx.is_auditor:
+        # Sin rol de auditor: solo lo propio. El DID lo declara el cliente, así que
+        # además se filtra por la llave que firmó la petición.
+        if creator_did is not None and creator_did != creator_ctx.did:
+            logger.warning("ledger_export_forbidden", requester=creator_ctx.did, target=creator_did, ip=client_ip)
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="auditor_role_required")
+        creator_did = creator_ctx.did
+        creator_fingerprint = creator_ctx.fingerprint
+
+    flt = ExportFilter(
+        creator_did=creator_did,
+        since=since,
+        until=until,
+        risk_levels=risk_level or [],
+        action_type=action_type,
+        creator_fingerprint=creator_fingerprint,
+    )
+    logger.info("ledger_export_started", auditor=creator_ctx.did, ip=client_ip, **flt.__dict__)
+
+    async def body():
+        # Sesión propia: la de la dependencia puede cerrarse antes de terminar el stream
+        async with AsyncSession(db.bind, expire_on_commit=False) as session:
+            async for chunk in stream_ndjson(session, flt, limit=limit):
+                yield chunk
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@router.get(
+    "/ledger/proof/{crum_id}",
+    summary="Prueba de inclusión Merkle O(log n) para un Crum",
+    responses={
+        404: {"description": "Crum inexistente en el Ledger"},
+        202: {"description": "Bloque aún no sellado: reintentar tras el próximo checkpoint"},
+        410: {"description": "Bloque sellado incompleto en el Ledger (p. ej. partición retirada): sin camino de inclusión"},
+        429: {"description": "ANUBIS: Intrusión detectada o límite excedido"},
+    },
+)
+async def ledger_inclusion_proof(
+    request: Request,
+    crum_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    anubis: AnubisSentinel = Depends(get_sentinel),
+):
+    """
+    Devuelve el camino de inclusión del Crum hasta la raíz Merkle de su bloque.
+    El verificador recompone la raíz con O(log n) hashes SHA3-512.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    if not anubis.is_ip_allowed(client_ip):
+        logger.warning("ANUBIS_INTERCEPTION", ip=client_ip, action="LEDGER_PROOF", reason="Blacklisted or RateLimited")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="access_denied_by_anubis_sentinel",
+        )
+    proof = await inclusion_proof(db, crum_id)
+    if proof is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="crum_not_found")
+    if not proof["sealed"]:
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=proof)
+    if not proof["available"]:
+        return JSONResponse(status_code=status.HTTP_410_GONE, content=proof)
+    return proof
+
+
+# ====== Telemetría Emocional (Dashboards) ======
+
+@router.get(
+    "/telemetry/ecg",
+    summary="Serie temporal de telemetría ECG pre-agregada (minuto/hora)",
+    responses={
+        400: {"description": "Rango mayor que el tope de ventanas de la granularidad"},
+        403: {"description": "Leer la telemetría de otro creador requiere rol de auditor"},
+        429: {"description": "ANUBIS: Intrusión detectada o límite excedido"},
+    },
+)
+async def ecg_rollup_series(
+    request: Request,
+    since: datetime = Query(...),
+    until: datetime | None = Query(default=None),
+    granularity: Literal["minute", "hour"] = Query(default="minute"),
+    creator_did: str | None = Query(default=None, min_length=3, max_length=255),
+    pattern: str | None = Query(default=None, max_length=32),
+    creator_ctx: CreatorContext = Depends(get_verified_creator),
+    db: AsyncSession = Depends(get_db),
+    anubis: AnubisSentinel = Depends(get_sentinel),
+):
+    """
+    Lee solo tamv_ecg_rollups: el costo depende de las ventanas pedidas, no del tamaño del Ledger.
+    Auditores leen cualquier creador; el resto, solo su propio DID. El rango se
+    acota a MAX_RANGE por granularidad y la respuesta a MAX_SERIES_ROWS filas.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    if not anubis.is_ip_allowed(client_ip):
+        logger.warning("ANUBIS_INTERCEPTION", ip=client_ip, action="ECG_ROLLUPS", reason="Blacklisted or RateLimited")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="access_denied_by_anubis_sentinel",
+        )
+
+    if not creator_ctx.is_auditor:
+        if creator_did is not None and creator_did != creator_ctx.did:
+            logger.warning("ecg_rollups_forbidden", requester=creator_ctx.did, target=creator_did, ip=client_ip)
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="auditor_role_required")
+        creator_did = creator_ctx.did
+
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    end = until or datetime.now(timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end - since > MAX_RANGE[granularity]:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"range_exceeds_{granularity}_limit")
+
+    series = await EcgRollups.series(
+        db,
+        granularity,
+        since,
+        until=until,
+        creator_did=creator_did,
+        pattern=pattern.lower() if pattern else None,
+        limit=MAX_SERIES_ROWS,
+    )
+    return {"granularity": granularity, "buckets": series, "truncated": len(series) == MAX_SERIES_ROWS}
@@ -0,0 +1,68 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+
+from ...core.auth import CreatorContext, get_verified_creator
+from ...core.metrics import REGISTRY
+from ...core.profiling import SamplingProfiler
+import structlog
+
+logger = structlog.get_logger("tamv.metrics")
+
+router = APIRouter(tags=["Observability"])
+
+# Un solo perfilado a la vez: el muestreo compite con el event loop por el GIL
+_profile_lock = asyncio.Lock()
+
+
+def require_profile_enabled(request: Request) -> None:
+    """Sin TAMV_PROFILE_ENDPOINT, la ruta no existe para el cliente."""
+    if not getattr(request.app.state, "profile_endpoint", False):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Histogramas por etapa y contadores de ingesta (formato Prometheus)",
+)
+async def scrape_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get(
+    "/metrics/profile",
+    response_class=PlainTextResponse,
+    summary="Perfil por muestreo del event loop en pilas plegadas (flamegraph)",
+    responses={
+        403: {"description": "Requiere rol de auditor"},
+        404: {"description": "Endpoint desactivado (TAMV_PROFILE_ENDPOINT)"},
+        409: {"description": "Ya hay un perfilado en curso"},
+    },
+    dependencies=[Depends(require_profile_enabled)],
+)
+async def sample_profile(
+    seconds: float = Query(default=10.0, gt=0, le=120),
+    interval_ms: float = Query(default=5.0, ge=1, le=1000),
+    creator_ctx: CreatorContext = Depends(get_verified_creator),
+):
+    """
+    Activa el perfilador por muestreo durante `seconds` y devuelve las pilas plegadas.
+    Desactivado por configuración salvo TAMV_PROFILE_ENDPOINT=true, y aun así
+    solo para auditores: las pilas revelan rutas y nombres internos.
+    """
+    if not creator_ctx.is_auditor:
+        logger.warning("sampling_profiler_forbidden", did=creator_ctx.did)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="auditor_role_required")
+    if _profile_lock.locked():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="profile_in_progress")
+    async with _profile_lock:
+        profiler = SamplingProfiler(interval_ms=interval_ms)
+        profiler.start()
+        logger.info("sampling_profiler_started", seconds=seconds, interval_ms=interval_ms, did=creator_ctx.did)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+        return PlainTextResponse(profiler.folded())
@@ -0,0 +1,213 @@
+"""
+TAMV Auth: Contexto de Identidad Soberana del creador.
+El cliente firma con su llave Ed25519 el material canónico de la petición
+(método, ruta con query, timestamp, nonce y SHA-256 del cuerpo) y envía DID,
+llave pública, firma, timestamp y nonce en cabeceras. Fuera de la ventana de
+frescura la petición se rechaza, y dentro de ella una firma no se acepta dos veces
+(memoria compartida en Redis entre réplicas; local si Redis no está). En endpoints
+idempotentes (dispatch) una firma repetida no se rechaza aquí: el contexto sale
+marcado como `replayed` y el endpoint solo puede devolver la respuesta guardada.
+La verificación usa el verificador app-scoped (LRU de llaves + lotes en pool) y
+deja el fingerprint en el contexto para que el Ledger lo registre sin volver a
+procesar la llave. Roles y nivel de garantía salen de la política de la app
+(fingerprints de raíz y de auditores), nunca de cabeceras del cliente.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import FrozenSet, List, Literal, Optional
+
+import structlog
+from fastapi import Depends, HTTPException, Request, status
+from pydantic import BaseModel, ConfigDict, Field
+from redis.asyncio import Redis
+
+from ..security.signatures import Ed25519Verifier, SignatureError
+
+logger = structlog.get_logger("tamv.auth")
+
+_fallback_verifier: Optional[Ed25519Verifier] = None
+
+ROLE_AUDITOR = "auditor"
+ROLE_ROOT = "root"
+
+
+class CreatorContext(BaseModel):
+    """Contexto de Identidad Soberana extraído de la firma Ed25519."""
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    did: str = Field(..., min_length=3, max_length=255)
+    pubkey: str = Field(..., min_length=16, max_length=512)
+    signature: str = Field(..., min_length=32, max_length=1024)
+    device_id: str = Field(default="ROOT_CONSOLE", max_length=128)
+    assurance_level: Literal["low", "substantial", "high"] = "low"
+    # SHA-256 de la llave cruda; lo rellena la verificación
+    fingerprint: str | None = Field(default=None, min_length=64, max_length=64)
+    roles: List[str] = Field(default_factory=list)
+    # Firma ya vista dentro de la ventana: solo vale para recuperar una respuesta guardada
+    replayed: bool = Field(default=False, exclude=True)
+
+    @property
+    def is_auditor(self) -> bool:
+        return ROLE_AUDITOR in self.roles or ROLE_ROOT in self.roles
+
+
+@dataclass
+class CreatorPolicy:
+    """Roles por fingerprint de llave (el DID lo declara el cliente; la llave no se falsifica)."""
+    root_fingerprints: FrozenSet[str] = frozenset()
+    auditor_fingerprints: FrozenSet[str] = frozenset()
+    max_skew_s: float = 300.0
+    max_seen: int = 100_000
+    # Memoria anti-replay compartida entre réplicas; sin ella, solo por proceso
+    redis: Optional[Redis] = None
+    prefix: str = "isabella:sig:"
+    # firma -> instante (monotónico) en que sale de la ventana de frescura
+    _seen: "OrderedDict[str, float]" = field(default_factory=OrderedDict, init=False, repr=False)
+
+    def roles_for(self, fingerprint: str) -> List[str]:
+        roles = []
+        if fingerprint in self.root_fingerprints:
+            roles.append(ROLE_ROOT)
+        if fingerprint in self.auditor_fingerprints:
+            roles.append(ROLE_AUDITOR)
+        return roles
+
+    def assurance_for(self, roles: List[str]) -> str:
+        if ROLE_ROOT in roles:
+            return "high"
+        if ROLE_AUDITOR in roles:
+            return "substantial"
+        # Firma válida, pero el vínculo DID-llave lo declara el propio cliente
+        return "low"
+
+    def check_fresh(self, timestamp: str) -> None:
+        try:
+            skew = abs(time.time() - float(timestamp))
+        except (TypeError, ValueError):
+            raise SignatureError("invalid_timestamp")
+        if skew > self.max_skew_s:
+            raise SignatureError("stale_request")
+
+    async def remember(self, signature: str) -> bool:
+        """
+        Anti-replay dentro de la ventana. Devuelve True si la firma ya se había
+        aceptado antes (en cualquier réplica con Redis; si Redis falla, en este proceso).
+        """
+        seen_locally = self._remember_local(signature)
+        if self.redis is None:
+            return seen_locally
+        key = self.prefix + hashlib.sha256(signature.encode("utf-8")).hexdigest()
+        try:
+            # Doble ventana: cubre timestamps hasta max_skew_s en el futuro
+            first = await self.redis.set(key, b"1", nx=True, px=int(2 * self.max_skew_s * 1000))
+        except Exception as e:
+            logger.warning("replay_memory_unavailable", error=str(e))
+            return seen_locally
+        return seen_locally or not first
+
+    def _remember_local(self, signature: str) -> bool:
+        now = time.monotonic()
+        while self._seen:
+            expires_at = next(iter(self._seen.values()))
+            if expires_at > now and len(self._seen) < self.max_seen:
+                break
+            self._seen.popitem(last=False)
+        if signature in self._seen:
+            return True
+        self._seen[signature] = now + 2 * self.max_skew_s
+        return False
+
+
+_default_policy = CreatorPolicy()
+
+
+def signing_message(method: str, path: str, query: str, timestamp: str, nonce: str, body: bytes) -> bytes:
+    """Material firmado por el cliente; la query forma parte de la ruta firmada."""
+    target = f"{path}?{query}" if query else path
+    return "\n".join((
+        method.upper(),
+        target,
+        timestamp,
+        nonce,
+        hashlib.sha256(body).hexdigest(),
+    )).encode("utf-8")
+
+
+def get_signature_verifier(request: Request) -> Ed25519Verifier:
+    """Verificador de la app; sin él, uno local en línea (sin pool) creado al primer uso."""
+    global _fallback_verifier
+    verifier = getattr(request.app.state, "signature_verifier", None)
+    if verifier is not None:
+        return verifier
+    if _fallback_verifier is None:
+        _fallback_verifier = Ed25519Verifier()
+    return _fallback_verifier
+
+
+def get_creator_policy(request: Request) -> CreatorPolicy:
+    return getattr(request.app.state, "creator_policy", None) or _default_policy
+
+
+async def _verify_creator(
+    request: Request, verifier: Ed25519Verifier, policy: CreatorPolicy, allow_replay: bool
+) -> CreatorContext:
+    headers = request.headers
+    try:
+        ctx = CreatorContext(
+            did=headers.get("x-tamv-did", ""),
+            pubkey=headers.get("x-tamv-pubkey", ""),
+            signature=headers.get("x-tamv-signature", ""),
+            device_id=headers.get("x-tamv-device", "ROOT_CONSOLE"),
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="missing_creator_credentials")
+
+    timestamp = headers.get("x-tamv-timestamp", "")
+    try:
+        policy.check_fresh(timestamp)
+        message = signing_message(
+            request.method,
+            request.url.path,
+            request.url.query,
+            timestamp,
+            headers.get("x-tamv-nonce", ""),
+            # request.body() queda en caché: el endpoint vuelve a leerlo sin coste
+            await request.body(),
+        )
+        ctx.fingerprint = await verifier.verify(ctx.pubkey, ctx.signature, message)
+    except SignatureError as e:
+        logger.warning("creator_signature_rejected", did=ctx.did, reason=str(e))
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid_creator_signature")
+
+    # Solo firmas válidas entran en la memoria anti-replay
+    ctx.replayed = await policy.remember(ctx.signature)
+    if ctx.replayed and not allow_replay:
+        logger.warning("creator_signature_rejected", did=ctx.did, reason="replayed_request")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="replayed_request")
+
+    ctx.roles = policy.roles_for(ctx.fingerprint)
+    ctx.assurance_level = policy.assurance_for(ctx.roles)
+    return ctx
+
+
+async def get_verified_creator(
+    request: Request,
+    verifier: Ed25519Verifier = Depends(get_signature_verifier),
+    policy: CreatorPolicy = Depends(get_creator_policy),
+) -> CreatorContext:
+    """Firma válida, fresca y nunca vista antes."""
+    return await _verify_creator(request, verifier, policy, allow_replay=False)
+
+
+async def get_replayable_creator(
+    request: Request,
+    verifier: Ed25519Verifier = Depends(get_signature_verifier),
+    policy: CreatorPolicy = Depends(get_creator_policy),
+) -> CreatorContext:
+    """
+    Para endpoints idempotentes: una firma repetida (el cliente reenvió tras un
+    timeout) pasa con `replayed=True` y el endpoint decide con su caché de idempotencia.
+    """
+    return await _verify_creator(request, verifier, policy, allow_replay=True)
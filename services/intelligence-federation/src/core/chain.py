@@ -0,0 +1,83 @@
+"""
+TAMV Ledger Chain: Primitivas del encadenamiento SHA3-512.
+Compartidas por el ingestor y el committer por lotes para que cada eslabón
+se calcule exactamente con las mismas entradas.
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from .encoding import canonical_payload  # noqa: F401  (re-exportado para modelos y verificador)
+from .profiling import stage
+
+GENESIS_HASH = "0" * 128  # SHA3-512 Initial State Genesis
+GLOBAL_CHAIN = "global"
+
+
+def chain_genesis(chain_key: str = GLOBAL_CHAIN) -> str:
+    """Génesis de una cadena: la global usa GENESIS_HASH; cada shard deriva el suyo de ella."""
+    if chain_key == GLOBAL_CHAIN:
+        return GENESIS_HASH
+    return hashlib.sha3_512(f"{GENESIS_HASH}|{chain_key}".encode("utf-8")).hexdigest()
+
+
+class IntegrityError(Exception):
+    """Falla crítica: La cadena de bloques del Ledger ha sido alterada."""
+    pass
+
+
+def compute_integrity_hash(
+    crum_id: str,
+    previous_hash: str,
+    payload_json: str,
+    timestamp: datetime,
+    salt: str,
+    blob: Optional[bytes] = None,
+) -> str:
+    """
+    El Hash de Integridad vincula: ID + Hash Anterior + Payload + Time + Salt.
+    Si el Crum trae una ráfaga binaria, sus bytes crudos se añaden al final.
+    """
+    # Normalizado a UTC: el driver puede devolver created_at en otra zona
+    timestamp = timestamp.astimezone(timezone.utc)
+    checksum_context = f"{crum_id}|{previous_hash}|{payload_json}|{timestamp.isoformat()}|{salt}"
+    digest = hashlib.sha3_512(checksum_context.encode("utf-8"))
+    if blob is not None:
+        digest.update(b"|")
+        digest.update(blob)
+    return digest.hexdigest()
+
+
+@dataclass
+class PendingCrum:
+    """Crum construido pero aún no enlazado a la cadena ni persistido."""
+    crum_id: str
+    timestamp: datetime
+    payload_json: str
+    salt: str
+    row: Dict[str, Any]
+    blob: Optional[bytes] = None
+    previous_hash: Optional[str] = None
+    integrity_hash: Optional[str] = None
+
+    def link(self, previous_hash: str) -> str:
+        """Enlaza el Crum al eslabón anterior y devuelve su propio hash."""
+        self.previous_hash = previous_hash
+        self.integrity_hash = compute_integrity_hash(
+            self.crum_id, previous_hash, self.payload_json, self.timestamp, self.salt, self.blob
+        )
+        self.row["parent_hash"] = previous_hash
+        self.row["integrity_hash"] = self.integrity_hash
+        self.row["integrity_salt"] = self.salt
+        return self.integrity_hash
+
+
+def link_chain(previous_hash: str, pendings: List[PendingCrum], start_height: Optional[int] = None) -> str:
+    """Encadena en memoria un lote completo, en orden. Devuelve el nuevo head."""
+    with stage("hashing"):
+        for offset, pending in enumerate(pendings, start=1):
+            previous_hash = pending.link(previous_hash)
+            if start_height is not None:
+                pending.row["chain_height"] = start_height + offset
+    return previous_hash
@@ -0,0 +1,154 @@
+"""
+TAMV Chain Head: Cabeza de cadena en memoria con secuenciador de escritor único.
+Se carga una vez al arranque y avanza con compare-and-set sobre
+tamv_chain_heads, de modo que cada inserción no necesita SELECTs previos.
+Regla de alturas: los Crums previos a chain_height ocupan las alturas 1..L en
+orden (created_at, id); el primer Crum secuenciado es L+1. El arranque los
+numera una sola vez para que verificador, Merkle y retención los vean igual.
+"""
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+import structlog
+from sqlalchemy import select, desc, func, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.ledger_state import TAMVChainHeadEntity
+from ..models.sovereign_event import TAMVCrumEntity
+from .chain import GLOBAL_CHAIN, chain_genesis
+
+logger = structlog.get_logger("tamv.chain_head")
+
+
+class StaleChainHeadError(Exception):
+    """Otro escritor movió la cadena y no fue posible re-sincronizar."""
+    pass
+
+
+class ChainHead:
+    def __init__(self, chain_key: str = GLOBAL_CHAIN, genesis_hash: Optional[str] = None):
+        self.chain_key = chain_key
+        self.genesis_hash = genesis_hash or chain_genesis(chain_key)
+        self.hash: Optional[str] = None
+        self.height: int = 0
+        # Secuenciador: un único escritor avanza la cabeza a la vez
+        self.sequencer = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.hash is not None
+
+    async def load(self, session: AsyncSession) -> None:
+        """Carga la cabeza al arranque; la crea desde el Ledger si no existe."""
+        if not await self.resync(session):
+            await self._bootstrap(session)
+            await self.resync(session)
+        logger.info("chain_head_loaded", chain=self.chain_key, height=self.height, head=self.hash[:16])
+
+    async def resync(self, session: AsyncSession) -> bool:
+        """Relee la cabeza persistida. Devuelve False si aún no existe."""
+        stmt = select(TAMVChainHeadEntity.head_hash, TAMVChainHeadEntity.height).where(
+            TAMVChainHeadEntity.chain_key == self.chain_key
+        )
+        row = (await session.execute(stmt)).one_or_none()
+        if row is None:
+            return False
+        self.hash, self.height = row.head_hash, row.height
+        return True
+
+    def invalidate(self) -> None:
+        """Marca la cabeza como desconocida (p. ej. tras un commit ambiguo)."""
+        self.hash = None
+
+    async def compare_and_advance(
+        self, session: AsyncSession, new_hash: str, count: int, fence: Optional[int] = None
+    ) -> bool:
+        """
+        Avanza la cabeza persistida solo si sigue apuntando a self.hash.
+        Con `fence`, además exige que ningún titular de lease más reciente la haya movido.
+        Debe ejecutarse en la misma transacción que el INSERT de los Crums.
+        """
+        conditions = [
+            TAMVChainHeadEntity.chain_key == self.chain_key,
+            TAMVChainHeadEntity.head_hash == self.hash,
+        ]
+        values = {
+            "head_hash": new_hash,
+            "height": TAMVChainHeadEntity.height + count,
+            "updated_at": func.now(),
+        }
+        if fence is not None:
+            conditions.append(or_(TAMVChainHeadEntity.fence_token.is_(None), TAMVChainHeadEntity.fence_token <= fence))
+            values["fence_token"] = fence
+        stmt = update(TAMVChainHeadEntity).where(*conditions).values(**values)
+        result = await session.execute(stmt)
+        return result.rowcount == 1
+
+    def advance(self, new_hash: str, count: int) -> None:
+        """Aplica en memoria un avance ya confirmado en la base de datos."""
+        self.hash = new_hash
+        self.height += count
+
+    async def _bootstrap(self, session: AsyncSession) -> None:
+        """Arranque único: numera el tramo sin altura y deriva la cabeza del último Crum de esta cadena."""
+        height = await number_legacy_rows(session, self.chain_key)
+        last_stmt = (
+            select(TAMVCrumEntity.integrity_hash)
+            .where(TAMVCrumEntity.chain_key == self.chain_key)
+            .order_by(desc(TAMVCrumEntity.chain_height).nulls_last(), desc(TAMVCrumEntity.created_at))
+            .limit(1)
+        )
+        last_hash = (await session.execute(last_stmt)).scalar_one_or_none()
+
+        stmt = pg_insert(TAMVChainHeadEntity).values(
+            chain_key=self.chain_key,
+            head_hash=last_hash or self.genesis_hash,
+            height=height,
+        ).on_conflict_do_nothing(index_elements=[TAMVChainHeadEntity.chain_key])
+        await session.execute(stmt)
+        await session.commit()
+
+
+async def number_legacy_rows(session: AsyncSession, chain_key: str = GLOBAL_CHAIN) -> int:
+    """
+    Asigna a los Crums sin altura las posiciones 1..L por (created_at, id) y
+    devuelve la altura máxima de la cadena. chain_height no entra al hash: la
+    numeración no altera ningún integrity_hash. Si ya hay alturas que no empiezan
+    en L+1, no numera nada y lo deja a la vista del verificador.
+    """
+    in_chain = TAMVCrumEntity.chain_key == chain_key
+    legacy, lowest = (await session.execute(
+        select(
+            func.count(TAMVCrumEntity.id).filter(TAMVCrumEntity.chain_height.is_(None)),
+            func.min(TAMVCrumEntity.chain_height),
+        ).where(in_chain)
+    )).one()
+    if legacy and (lowest is None or lowest == legacy + 1):
+        numbered = (
+            select(
+                TAMVCrumEntity.id,
+                TAMVCrumEntity.created_at,
+                func.row_number().over(order_by=(TAMVCrumEntity.created_at, TAMVCrumEntity.id)).label("position"),
+            )
+            .where(in_chain, TAMVCrumEntity.chain_height.is_(None))
+            .subquery()
+        )
+        await session.execute(
+            update(TAMVCrumEntity)
+            .where(TAMVCrumEntity.id == numbered.c.id, TAMVCrumEntity.created_at == numbered.c.created_at)
+            .values(chain_height=numbered.c.position)
+        )
+        logger.info("legacy_crums_numbered", chain=chain_key, count=legacy)
+    elif legacy:
+        logger.critical("legacy_height_conflict", chain=chain_key, legacy=legacy, lowest_height=lowest)
+    return (await session.execute(select(func.max(TAMVCrumEntity.chain_height)).where(in_chain))).scalar() or 0
+
+
+def fence_floor_loader(session_factory: Callable[[], AsyncSession], chain_key: str = GLOBAL_CHAIN) -> Callable[[], Awaitable[int]]:
+    """Lector del último fence_token persistido de la cadena, para re-sembrar el ChainLease."""
+    async def load() -> int:
+        async with session_factory() as session:
+            stmt = select(func.max(TAMVChainHeadEntity.fence_token)).where(TAMVChainHeadEntity.chain_key == chain_key)
+            return (await session.execute(stmt)).scalar() or 0
+    return load
@@ -0,0 +1,151 @@
+"""
+TAMV Chain Lease: Secuenciador distribuido de la cabeza de cadena sobre Redis.
+Un nodo adquiere el derecho de anexar con un lease (SET NX PX) y recibe un
+fencing token monotónico; mientras lo conserva, ancla lote tras lote sin
+competir. Si otro nodo espera, el titular cede el lease tras su lote en curso.
+El token viaja al compare-and-set de tamv_chain_heads: un titular expirado
+(pausa larga, partición de red) no puede avanzar la cabeza aunque lo intente.
+Si Redis pierde el contador (reinicio sin persistencia), la primera adquisición
+lo re-siembra por encima del último fence_token persistido en la base.
+Funciona igual contra un Redis local o fakeredis (los scripts son Lua estándar).
+"""
+import asyncio
+import random
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import structlog
+from redis.asyncio import Redis
+
+from .chain import GLOBAL_CHAIN
+
+logger = structlog.get_logger("tamv.chain_lease")
+
+# KEYS: lease, fence, waiting | ARGV: node_id, ttl_ms
+# Devuelve {token, contended, fresh}: token 0 = otro nodo tiene el lease (y queda
+# registrado como en espera); fresh = 1 si el contador de fence no existía (Redis reiniciado)
+ACQUIRE_LUA = """
+local owner = redis.call('GET', KEYS[1])
+if owner == ARGV[1] then
+  redis.call('PEXPIRE', KEYS[1], ARGV[2])
+  local waiting = redis.call('GET', KEYS[3])
+  return {tonumber(redis.call('GET', KEYS[2]) or '0'), waiting and 1 or 0, 0}
+end
+if not owner then
+  redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+  redis.call('DEL', KEYS[3])
+  local fresh = redis.call('EXISTS', KEYS[2]) == 0 and 1 or 0
+  return {redis.call('INCR', KEYS[2]), 0, fresh}
+end
+redis.call('SET', KEYS[3], ARGV[1], 'PX', ARGV[2])
+return {0, 0, 0}
+"""
+
+# KEYS: lease, fence | ARGV: node_id, floor
+# Solo el titular re-siembra: el fence queda por encima del persistido. Devuelve el token (0 = ya no es titular)
+RESEED_LUA = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+  return 0
+end
+local fence = tonumber(redis.call('GET', KEYS[2]) or '0')
+if fence <= tonumber(ARGV[2]) then
+  fence = tonumber(ARGV[2]) + 1
+  redis.call('SET', KEYS[2], fence)
+end
+return fence
+"""
+
+# KEYS: lease | ARGV: node_id
+RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaseTimeoutError(Exception):
+    """No fue posible obtener el lease de la cadena dentro del plazo."""
+    pass
+
+
+class ChainLease:
+    def __init__(
+        self,
+        redis: Redis,
+        chain_key: str = GLOBAL_CHAIN,
+        node_id: Optional[str] = None,
+        ttl_ms: int = 3000,
+        min_hold_ms: float = 20.0,
+        poll_min_ms: float = 1.0,
+        poll_max_ms: float = 25.0,
+        fence_floor: Optional[Callable[[], Awaitable[int]]] = None,
+    ):
+        self.chain_key = chain_key
+        self.node_id = node_id or f"node-{uuid.uuid4()}"
+        self.ttl_ms = ttl_ms
+        self.min_hold = min_hold_ms / 1000.0
+        self.poll_min = poll_min_ms / 1000.0
+        self.poll_max = poll_max_ms / 1000.0
+        self._keys = [f"ledger:lease:{chain_key}", f"ledger:lease:{chain_key}:fence", f"ledger:lease:{chain_key}:waiting"]
+        self._acquire = redis.register_script(ACQUIRE_LUA)
+        self._release = redis.register_script(RELEASE_LUA)
+        self._reseed = redis.register_script(RESEED_LUA)
+        # Último fence_token persistido (p. ej. max(fence_token) de tamv_chain_heads)
+        self.fence_floor = fence_floor
+        self.token = 0
+        # Otro nodo pidió el lease mientras lo teníamos
+        self.contended = False
+        self._acquired_at = 0.0
+        self._expires_at = 0.0
+
+    @property
+    def held(self) -> bool:
+        # Margen de un tercio del TTL: no se escribe con un lease a punto de expirar
+        return self.token > 0 and time.monotonic() < self._expires_at - self.ttl_ms / 3000.0
+
+    async def ensure(self, timeout_s: Optional[float] = None) -> bool:
+        """
+        Adquiere o renueva el lease (un round-trip si ya es nuestro).
+        Devuelve True si es una tenencia nueva: otro nodo pudo mover la cabeza entretanto.
+        """
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        delay = self.poll_min
+        while True:
+            started = time.monotonic()
+            token, contended, fresh = await self._acquire(keys=self._keys, args=[self.node_id, self.ttl_ms])
+            token = int(token)
+            if token and int(fresh) and self.fence_floor is not None:
+                # Contador recién creado: sin re-siembra, el CAS rechazaría todo token
+                floor = await self.fence_floor()
+                token = int(await self._reseed(keys=self._keys[:2], args=[self.node_id, floor]))
+                logger.warning("chain_lease_fence_reseeded", chain=self.chain_key, floor=floor, token=token)
+            if token:
+                new_tenure = token != self.token
+                if new_tenure:
+                    self._acquired_at = started
+                    logger.debug("chain_lease_acquired", chain=self.chain_key, node=self.node_id, token=token)
+                self.token = token
+                self.contended = bool(int(contended))
+                self._expires_at = started + self.ttl_ms / 1000.0
+                return new_tenure
+
+            self.token = 0
+            if deadline is not None and time.monotonic() >= deadline:
+                raise LeaseTimeoutError(f"Lease de '{self.chain_key}' no disponible tras {timeout_s}s.")
+            # Backoff exponencial con jitter: los nodos en espera no martillan Redis
+            await asyncio.sleep(delay * (0.5 + random.random()))
+            delay = min(delay * 2, self.poll_max)
+
+    def should_yield(self) -> bool:
+        """Ceder tras el lote en curso si hay nodos esperando y ya se retuvo lo mínimo."""
+        return self.contended and time.monotonic() - self._acquired_at >= self.min_hold
+
+    async def release(self) -> None:
+        if not self.token:
+            return
+        self.token = 0
+        self.contended = False
+        await self._release(keys=self._keys[:1], args=[self.node_id])
+        logger.debug("chain_lease_released", chain=self.chain_key, node=self.node_id)
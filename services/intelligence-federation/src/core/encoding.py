@@ -0,0 +1,91 @@
+"""
+TAMV Encoding: Una sola pasada de serialización por Crum.
+El payload se codifica una vez en su forma canónica (la que entra al hash) y
+esos mismos bytes se reutilizan para el JSONB de PostgreSQL vía json_serializer
+del engine. Los mensajes que no se hashean (fan-out a Redis, NDJSON, spool)
+usan orjson si está instalado y la stdlib en caso contrario.
+"""
+import json
+import math
+from typing import Any, Dict
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+def canonical_payload(raw_data: Dict[str, Any]) -> str:
+    """
+    Serialización determinista del payload que entra al hash.
+    El formato es parte del contrato del Ledger: cambiarlo invalida los hashes existentes.
+    """
+    return json.dumps(raw_data, sort_keys=True, separators=(",", ":"))
+
+
+class EncodedJSON(dict):
+    """
+    Payload ya codificado: se comporta como dict para quien lo lea y conserva
+    en `encoded` el texto canónico exacto que se hasheó.
+    """
+    __slots__ = ("encoded",)
+
+    def __init__(self, raw_data: Dict[str, Any], encoded: str):
+        super().__init__(raw_data)
+        self.encoded = encoded
+
+    @classmethod
+    def from_encoded(cls, encoded: str) -> "EncodedJSON":
+        return cls(json.loads(encoded), encoded)
+
+
+class PayloadEncodingError(ValueError):
+    """El payload tiene números que JSONB no devuelve con el mismo texto canónico."""
+    pass
+
+
+def _check_jsonb_stable(value: Any, path: str = "$") -> None:
+    """
+    JSONB guarda los números como numeric y los devuelve sin exponente: 1e+16
+    vuelve como el entero 10000000000000000 y -0.0 como 0.0. Su texto canónico
+    cambiaría al releerlos y el hash recalculado no coincidiría, así que se
+    rechazan al ingerir en lugar de reportarse luego como alterados.
+    """
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise PayloadEncodingError(f"non_finite_number at {path}")
+        if value == 0.0 and math.copysign(1.0, value) < 0:
+            raise PayloadEncodingError(f"negative_zero at {path}")
+        if "e+" in repr(value):
+            raise PayloadEncodingError(f"float_not_jsonb_stable at {path}: use an integer")
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            _check_jsonb_stable(item, f"{path}.{key}")
+    elif isinstance(value, (list, tuple)):
+        for index, item in enumerate(value):
+            _check_jsonb_stable(item, f"{path}[{index}]")
+
+
+def encode_payload(raw_data: Dict[str, Any]) -> EncodedJSON:
+    """Codificación única del payload que se hashea; falla si no sobrevive al JSONB."""
+    _check_jsonb_stable(raw_data)
+    return EncodedJSON(raw_data, canonical_payload(raw_data))
+
+
+def payload_text(payload: Dict[str, Any]) -> str:
+    """Texto canónico de un payload, sin recodificar si ya viene codificado."""
+    return payload.encoded if isinstance(payload, EncodedJSON) else canonical_payload(payload)
+
+
+def dumps(obj: Any) -> str:
+    """JSON compacto para mensajes que no se hashean (orden de claves no garantizado)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), default=str)
+
+
+def json_serializer(value: Any) -> str:
+    """json_serializer del engine: los payloads codificados se escriben tal cual."""
+    if isinstance(value, EncodedJSON):
+        return value.encoded
+    return dumps(value)
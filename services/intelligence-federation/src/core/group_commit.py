@@ -0,0 +1,152 @@
+"""
+TAMV Group Commit: Micro-lotes de anclaje para el Ledger.
+Los llamadores concurrentes se agrupan por tamaño y ventana de tiempo;
+cada lote se encadena en memoria y se confirma en una sola transacción.
+Con un LedgerStorage (memoria, SQLite o PostgreSQL), cada lote es un único append.
+"""
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .chain import PendingCrum
+from .ledger_writer import ROW_ERRORS, LedgerWriter
+from .storage import LedgerStorage
+
+logger = structlog.get_logger("tamv.group_commit")
+
+_Submission = Tuple[PendingCrum, asyncio.Future]
+
+
+class GroupCommitter:
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        writer: Optional[LedgerWriter] = None,
+        max_batch: int = 256,
+        max_wait_ms: float = 2.0,
+        storage: Optional[LedgerStorage] = None,
+    ):
+        if session_factory is None and storage is None:
+            raise ValueError("GroupCommitter requiere session_factory o storage.")
+        self.session_factory = session_factory
+        self.writer = writer or LedgerWriter()
+        # Backend intercambiable: el lote se confirma con storage.append en lugar del writer
+        self.storage = storage
+        self.row_errors = storage.ROW_ERRORS if storage is not None else ROW_ERRORS
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "asyncio.Queue[Optional[_Submission]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="tamv-group-commit")
+
+    async def stop(self) -> None:
+        """Drenado ordenado: confirma lo ya encolado y detiene el flusher."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, pending: PendingCrum) -> PendingCrum:
+        """Encola un Crum y espera a que su lote quede confirmado."""
+        if self._task is None:
+            raise RuntimeError("GroupCommitter no iniciado.")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((pending, future))
+        return await future
+
+    @property
+    def backlog(self) -> int:
+        """Crums encolados aún sin lote asignado."""
+        return self._queue.qsize()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch: List[_Submission] = [first]
+            deadline = loop.time() + self.max_wait
+
+            # Recolección: primero lo ya encolado, luego la ventana de tiempo
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[_Submission]) -> None:
+        # Los llamadores cancelados no se anclan
+        live = [(pending, future) for pending, future in batch if not future.cancelled()]
+        if not live:
+            return
+
+        # Con cadenas por shard, cada shard se confirma en su propia transacción, en paralelo
+        groups: Dict[Optional[str], List[_Submission]] = {}
+        for item in live:
+            groups.setdefault(self.writer.shard_key(item[0]), []).append(item)
+        await asyncio.gather(*(self._commit(group) for group in groups.values()))
+
+    async def _commit(self, live: List[_Submission]) -> None:
+        """
+        Confirma el grupo. Si el lote falla por los datos de una fila, se bisecta
+        y se reintenta por mitades, en orden: solo la submission culpable recibe el error.
+        """
+        try:
+            await self._append([pending for pending, _ in live])
+        except self.row_errors as e:
+            if len(live) == 1:
+                logger.error("group_commit_item_failed", crum_id=live[0][0].crum_id, error=str(e))
+                _fail(live, e)
+                return
+            logger.warning("group_commit_batch_bisected", size=len(live), error=str(e))
+            mid = len(live) // 2
+            await self._commit(live[:mid])
+            await self._commit(live[mid:])
+            return
+        except Exception as e:
+            # Fallo de la cadena o de la base (conexión, pool, timeout): bisectar solo
+            # multiplicaría las transacciones contra una base que ya no responde
+            logger.error("group_commit_batch_failed", size=len(live), error=str(e))
+            _fail(live, e)
+            return
+
+        for pending, future in live:
+            if not future.done():
+                future.set_result(pending)
+
+    async def _append(self, pendings: List[PendingCrum]) -> None:
+        if self.storage is not None:
+            await self.storage.append(pendings)
+            return
+        async with self.session_factory() as session:
+            try:
+                await self.writer.append(session, pendings)
+            except Exception:
+                await session.rollback()
+                raise
+
+
+def _fail(live: List[_Submission], error: Exception) -> None:
+    for _, future in live:
+        if not future.done():
+            future.set_exception(error)
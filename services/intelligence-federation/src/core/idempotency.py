@@ -0,0 +1,196 @@
+"""
+TAMV Idempotency: Deduplicación de reintentos de dispatch.
+Una clave de idempotencia (x-trace-id del cliente, o hash del payload) resuelve
+a la respuesta original: caché local LRU con TTL, deduplicación de peticiones
+en vuelo en el mismo proceso y un reclamo SET NX en Redis para que las réplicas
+compartan el resultado. Un duplicado nunca toca el Ledger.
+Cada respuesta guarda el hash del payload que la produjo: reutilizar un trace-id
+con otro cuerpo es un conflicto, no un replay. Si Redis falla, se degrada a la
+caché local (deduplicación solo por proceso) en lugar de tumbar el dispatch.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import structlog
+from redis.asyncio import Redis
+
+from .encoding import dumps
+from .profiling import incr
+
+logger = structlog.get_logger("tamv.idempotency")
+
+_PENDING = "__PENDING__"
+
+
+class IdempotencyConflict(Exception):
+    """La clave sigue en proceso en otra réplica, o ya se usó con otro payload."""
+    pass
+
+
+def payload_digest(payload_json: str) -> str:
+    return hashlib.sha256(payload_json.encode("utf-8")).hexdigest()
+
+
+def idempotency_key(creator_did: str, trace_id: Optional[str], payload_json: str) -> str:
+    """
+    Clave acotada al creador: un trace-id ajeno nunca colisiona con el propio.
+    Sin trace-id, la clave es el payload: la firma cambia en cada petición
+    (timestamp y nonce) y no identifica un reintento.
+    """
+    if trace_id:
+        material = f"trace|{creator_did}|{trace_id}"
+    else:
+        material = f"body|{creator_did}|{payload_digest(payload_json)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class IdempotencyCache:
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        ttl_s: float = 86400.0,
+        max_entries: int = 100_000,
+        pending_ttl_s: float = 30.0,
+        pending_wait_s: float = 5.0,
+        prefix: str = "isabella:idem:",
+    ):
+        self.redis = redis
+        self.ttl = ttl_s
+        self.max_entries = max_entries
+        # El reclamo en Redis caduca solo si la réplica que lo tomó muere a mitad
+        self.pending_ttl_ms = int(pending_ttl_s * 1000)
+        self.pending_wait = pending_wait_s
+        self.prefix = prefix
+        # clave -> (caducidad, hash del payload, respuesta)
+        self._entries: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+    async def run(
+        self,
+        key: str,
+        digest: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Devuelve (respuesta, replay). replay=True si la respuesta es la de una
+        petición anterior con la misma clave y `compute` no se ejecutó.
+        `digest` es el hash del payload; si no coincide con el de la respuesta
+        guardada se lanza IdempotencyConflict.
+        """
+        cached = self._get_local(key)
+        if cached is not None:
+            return _matching(cached, digest), True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            inflight_digest, inflight_future = inflight
+            if inflight_digest != digest:
+                raise IdempotencyConflict("idempotency_key_reused")
+            return await asyncio.shield(inflight_future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = (digest, future)
+        try:
+            claimed = False
+            if self.redis is not None:
+                try:
+                    remote = await self._claim(key)
+                    claimed = remote is None
+                except IdempotencyConflict:
+                    raise
+                except Exception as e:
+                    incr("idempotency_redis_errors")
+                    logger.warning("idempotency_redis_unavailable", op="claim", error=str(e))
+                    remote = None
+                if remote is not None:
+                    self._put_local(key, remote)
+                    response = _matching(remote, digest)
+                    future.set_result(response)
+                    return response, True
+
+            try:
+                response = await compute()
+            except BaseException:
+                if claimed:
+                    # Liberar el reclamo: el siguiente reintento debe poder anclar
+                    await self._redis_call("release", self.redis.delete(self.prefix + key))
+                raise
+
+            record = (digest, response)
+            self._put_local(key, record)
+            if self.redis is not None:
+                await self._redis_call(
+                    "store",
+                    self.redis.set(self.prefix + key, dumps({"digest": digest, "response": response}), ex=int(self.ttl)),
+                )
+            future.set_result(response)
+            return response, False
+        except BaseException as e:
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                    # Evita "exception was never retrieved" si nadie más esperaba
+                    future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _redis_call(self, op: str, call: Awaitable[Any]) -> None:
+        """El Crum ya está (o no) en el Ledger: un fallo de Redis aquí no debe convertirse en 500."""
+        try:
+            await call
+        except Exception as e:
+            incr("idempotency_redis_errors")
+            logger.warning("idempotency_redis_unavailable", op=op, error=str(e))
+
+    async def _claim(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Reclamo entre réplicas. None = la clave es nuestra; (hash, respuesta) = ya existente."""
+        redis_key = self.prefix + key
+        deadline = time.monotonic() + self.pending_wait
+        delay = 0.005
+        while True:
+            if await self.redis.set(redis_key, _PENDING, nx=True, px=self.pending_ttl_ms):
+                return None
+            value = await self.redis.get(redis_key)
+            if value is None:
+                continue  # El reclamo ajeno caducó o se liberó entre SET y GET
+            if isinstance(value, bytes):
+                value = value.decode("utf-8")
+            if value != _PENDING:
+                stored = json.loads(value)
+                return stored["digest"], stored["response"]
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict("idempotency_key_in_progress")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    def _get_local(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, digest, response = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return digest, response
+
+    def _put_local(self, key: str, record: Tuple[str, Dict[str, Any]]) -> None:
+        digest, response = record
+        self._entries[key] = (time.monotonic() + self.ttl, digest, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _matching(record: Tuple[str, Dict[str, Any]], digest: str) -> Dict[str, Any]:
+    stored_digest, response = record
+    if stored_digest != digest:
+        raise IdempotencyConflict("idempotency_key_reused")
+    return response
@@ -1,32 +1,68 @@
 import json
-import hashlib
 import uuid
-import struct
 import structlog
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, func
+from sqlalchemy import select, func
 from sqlalchemy.exc import SQLAlchemyError
 
 from ..models.sovereign_event import TAMVCrumEntity, RiskLevel
 from ..security.anubis import AnubisSentinel
+from ..security.crisis import CrisisBroadcaster
+from .chain import GENESIS_HASH, IntegrityError, PendingCrum
+from .encoding import EncodedJSON, PayloadEncodingError, dumps, encode_payload
+from .group_commit import GroupCommitter
+from .ledger_writer import LedgerWriter
+from .outbox import ANCHOR_CHANNEL, anchor_event
+from .profiling import incr, stage
+from .spool import LedgerSpool
+from .storage import LedgerStorage
 
 # Logger de grado militar para trazabilidad forense
 logger = structlog.get_logger("tamv.ingestor")
 
-class IntegrityError(Exception):
-    """Falla crítica: La cadena de bloques del Ledger ha sido alterada."""
-    pass
+ORIGIN_SENSOR = "sensor"
 
 class SovereignIngestor:
-    def __init__(self, db: AsyncSession, redis: Redis, sentinel: AnubisSentinel):
+    def __init__(
+        self,
+        db: Optional[AsyncSession],
+        redis: Redis,
+        sentinel: AnubisSentinel,
+        committer: Optional[GroupCommitter] = None,
+        writer: Optional[LedgerWriter] = None,
+        broadcaster: Optional[CrisisBroadcaster] = None,
+        spool: Optional[LedgerSpool] = None,
+        storage: Optional[LedgerStorage] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+    ):
         self.db = db
+        # Sin sesión por petición (contenedor app-scoped): las lecturas abren la suya
+        self.session_factory = session_factory
         self.redis = redis
         self.sentinel = sentinel
-        self.genesis_hash = "0" * 128  # SHA3-512 Initial State Genesis
+        # Modo group-commit: si hay committer, el anclaje se agrupa en micro-lotes
+        self.committer = committer
+        # Writer app-scoped (con ChainHead) para que el secuenciador sea único
+        self.writer = writer or (committer.writer if committer else LedgerWriter())
+        self.genesis_hash = GENESIS_HASH  # SHA3-512 Initial State Genesis
+        # Señales de crisis deduplicadas y anclajes en lote por canal propio
+        self.broadcaster = broadcaster
+        # Modo spool: el Crum se confirma al ser durable en el WAL local y se drena en segundo plano
+        self.spool = spool
+        # Backend intercambiable (memoria/SQLite/Postgres); con él, `db` puede ser None.
+        # Sin committer es un append por Crum; para agrupar, GroupCommitter(storage=storage)
+        self.storage = storage
+        # Con outbox en el writer que persiste, el evento de anclaje viaja en la transacción
+        persister = self.writer
+        if spool is not None:
+            persister = spool.writer
+        elif storage is not None:
+            persister = getattr(storage, "writer", None)
+        self.outboxed = getattr(persister, "outbox", None) is not None
 
     async def commit_crum(
         self,
@@ -34,10 +70,13 @@ class SovereignIngestor:
         agent_profile: Dict[str, Any],
         creator_ctx: Dict[str, Any],
         verified_by_root: bool = False,
+        binary_payload: Optional[bytes] = None,
     ) -> str:
         """
         ANCLAJE SOBERANO: Procesa ráfagas sensoriales y datos críticos.
-        Valida la integridad del Ledger antes de cada inserción.
+        Valida la integridad del Ledger antes de cada lote de inserción.
+        binary_payload: bytes crudos de la ráfaga; se guardan como bytea y entran al hash.
+        raw_data puede llegar ya codificado (EncodedJSON, p. ej. desde el gate): no se recodifica.
         """
         log = logger.bind(
             trace_id=agent_profile.get("trace_id"),
@@ -47,116 +86,155 @@ class SovereignIngestor:
         )
 
         try:
-            # 1. CAPA DE SEGURIDAD: VERIFICACIÓN DE CADENA (Anti-Tampering)
-            if not await self._verify_chain_link():
-                await self._trigger_emergency_protocol(
-                    reason="CHAIN_BREACH_DETECTED",
-                    severity=100.0,
-                    source="LEDGER_INTEGRITY",
-                )
-                raise IntegrityError("CRITICAL: Ledger chain link is broken. Ingestion halted.")
-
-            # 2. CAPA DE IDENTIDAD: VALIDACIÓN NVIDA™
+            # 1. CAPA DE IDENTIDAD: VALIDACIÓN NVIDA™
             if raw_data.get("action") == "SINDÉRESIS_BURST":
-                if not await self.sentinel.validate_id_nvida(creator_ctx.get("did")):
+                with stage("anubis"):
+                    authorized = await self.sentinel.validate_id_nvida(creator_ctx.get("did"))
+                if not authorized:
                     await self._trigger_emergency_protocol("IDENTITY_FRAUD", 100.0, "VORTEX")
                     raise PermissionError("Soberanía de ID no verificada para ráfagas sensoriales.")
 
-            # 3. RECUPERAR ANCLAJE (LAST HASH)
-            last_crum = await self._fetch_last_crum()
-            previous_hash = last_crum.integrity_hash if last_crum else self.genesis_hash
-
-            # 4. CONSTRUCCIÓN CRIPTOGRÁFICA (SHA3-512 + SALT)
-            crum_id = str(uuid.uuid4())
-            timestamp = datetime.now(timezone.utc)
-            
-            # Tratamiento especial para ráfagas binarias si vienen en el payload
-            if "binary_burst" in raw_data:
-                # Inyección de Capa 2: Neuro-Shift calculation
-                raw_data["sensory_temp"] = self._calculate_synapse_shift(
-                    raw_data.get("freq", 0), 
-                    raw_data.get("power", 0)
-                )
+            # 2. CONSTRUCCIÓN CRIPTOGRÁFICA (SHA3-512 + SALT)
+            pending = self._prepare_crum(raw_data, agent_profile, creator_ctx, verified_by_root, binary_payload)
 
-            payload_json = json.dumps(raw_data, sort_keys=True, separators=(",", ":"))
-            salt = agent_profile.get("trace_id", "") + str(uuid.uuid4())
-            
-            # El Hash de Integridad vincula: ID + Hash Anterior + Payload + Time + Salt
-            checksum_context = f"{crum_id}|{previous_hash}|{payload_json}|{timestamp.isoformat()}|{salt}"
-            integrity_hash = hashlib.sha3_512(checksum_context.encode("utf-8")).hexdigest()
-
-            # 5. PREPARAR ENTIDAD SINDÉRESIS-X
-            new_crum = TAMVCrumEntity(
-                id=crum_id,
-                canonical_id=f"TAMV-{timestamp.strftime('%Y%m%d')}-{crum_id[:8]}",
-                action_type=raw_data.get("action", "UNDEFINED"),
-                payload=raw_data,
-                agent_metadata=agent_profile,
-                creator_did=creator_ctx.get("did"),
-                creator_signature=creator_ctx.get("signature"),
-                integrity_hash=integrity_hash,
-                previous_hash=previous_hash,
-                risk_level=(raw_data.get("risk") or "LOW").upper(),
-                verified_by_root=verified_by_root,
-                created_at=timestamp,
-                non_repudiation_token=f"TAMV-CERT-{crum_id[:8]}",
-            )
+            # 3. ENCADENAMIENTO + PERSISTENCIA ATÓMICA (CAPA 4)
+            # El anclaje (último hash) sale de la ChainHead del LedgerWriter,
+            # o de una única lectura por lote si no hay cabeza en memoria.
+            # Con spool, el encadenamiento lo hace el propio spool sobre su cabeza local.
+            try:
+                if self.spool is not None:
+                    await self.spool.append(pending)
+                elif self.committer is not None:
+                    await self.committer.submit(pending)
+                elif self.storage is not None:
+                    await self.storage.append([pending])
+                else:
+                    await self.writer.append(self.db, [pending])
+            except IntegrityError:
+                await self._trigger_emergency_protocol(
+                    reason="CHAIN_BREACH_DETECTED",
+                    severity=100.0,
+                    source="LEDGER_INTEGRITY",
+                )
+                raise
 
-            # 6. PERSISTENCIA ATÓMICA (CAPA 4)
-            self.db.add(new_crum)
-            await self.db.flush()
-            await self.db.commit()
+            crum_id = pending.crum_id
+            integrity_hash = pending.integrity_hash
 
-            # 7. CAPA DE SALIDA: PROPAGACIÓN AL DREAMSPACE (REDIS)
-            await self.redis.publish("anubis:crisis_channel", json.dumps({
-                "status": "CRUM_ANCHORED",
-                "type": raw_data.get("action"),
-                "sensory_temp": raw_data.get("sensory_temp", 0),
-                "integrity": integrity_hash[:16]
-            }))
+            # 4. CAPA DE SALIDA: PROPAGACIÓN AL DREAMSPACE (REDIS)
+            # Los anclajes rutinarios no viajan por el canal de crisis.
+            # Con outbox, el relay ya tiene el evento: nada que hacer en el camino crítico.
+            if not self.outboxed:
+                with stage("publish"):
+                    if self.broadcaster is not None:
+                        self.broadcaster.anchored(anchor_event(pending))
+                    else:
+                        await self.redis.publish(ANCHOR_CHANNEL, dumps(anchor_event(pending)))
 
             log.info("crum_anchored_successfully", crum_id=crum_id, hash=integrity_hash[:16])
-            await self.sentinel.log_attempt(agent_profile.get("ip", "unknown"), success=True)
+            incr("crums_anchored")
+            # Reputación fuera del camino crítico (script atómico en segundo plano)
+            self.sentinel.record_attempt(agent_profile.get("ip", "unknown"), success=True)
 
             return crum_id
 
+        except PayloadEncodingError as e:
+            # Payload del cliente no anclable tal cual: no es una falla del Ledger
+            incr("ingest_rejected")
+            log.warning("crum_payload_rejected", error=str(e))
+            raise
         except SQLAlchemyError as db_err:
-            await self.db.rollback()
+            incr("ingest_db_errors")
+            await self._rollback()
             log.error("ledger_persistence_error", error=str(db_err))
             await self.sentinel.log_attempt(agent_profile.get("ip", "unknown"), success=False, reason="DB_ERROR")
             raise db_err
         except Exception as e:
-            await self.db.rollback()
+            incr("ingest_failures")
+            await self._rollback()
             log.critical("ingestor_unhandled_exception", error=str(e))
             # Disparar cierre de emergencia en ANUBIS
             await self.sentinel.emergency_shutdown_trigger(reason=str(e))
             raise e
 
+    async def _rollback(self) -> None:
+        if self.db is not None:
+            await self.db.rollback()
+
+    def _prepare_crum(
+        self,
+        raw_data: Dict[str, Any],
+        agent_profile: Dict[str, Any],
+        creator_ctx: Dict[str, Any],
+        verified_by_root: bool,
+        binary_payload: Optional[bytes] = None,
+    ) -> PendingCrum:
+        """Construye la entidad Sindéresis-X lista para ser encadenada."""
+        crum_uuid = uuid.uuid4()
+        crum_id = str(crum_uuid)
+        timestamp = datetime.now(timezone.utc)
+
+        # Tratamiento especial para ráfagas binarias si vienen en el payload
+        if "binary_burst" in raw_data:
+            # Inyección de Capa 2: Neuro-Shift calculation
+            raw_data["sensory_temp"] = self._calculate_synapse_shift(
+                raw_data.get("freq", 0),
+                raw_data.get("power", 0)
+            )
+
+        # Única codificación del payload: el mismo texto va al hash y al JSONB.
+        # Si ya viene codificado se reutiliza, salvo que la capa 2 le haya añadido campos.
+        if isinstance(raw_data, EncodedJSON) and "binary_burst" not in raw_data:
+            payload = raw_data
+        else:
+            payload = encode_payload(raw_data)
+        salt = agent_profile.get("trace_id", "") + str(uuid.uuid4())
+
+        row = {
+            "id": crum_uuid,
+            "canonical_id": f"TAMV-{timestamp.strftime('%Y%m%d')}-{crum_id[:8]}",
+            "action_type": raw_data.get("action", "UNDEFINED"),
+            "payload": payload,
+            "creator_did": creator_ctx.get("did"),
+            "creator_pubkey": creator_ctx.get("pubkey"),
+            "creator_signature": creator_ctx.get("signature"),
+            # Fingerprint calculado al verificar la firma: la llave no se vuelve a procesar
+            "creator_fingerprint": creator_ctx.get("fingerprint"),
+            # Sin firma (ráfagas Vortex autenticadas por ANUBIS): origen de sensor explícito
+            "origin": creator_ctx.get("origin") or ("signed" if creator_ctx.get("signature") else ORIGIN_SENSOR),
+            "risk_level": (raw_data.get("risk") or "LOW").upper(),
+            "is_verified_by_root": verified_by_root,
+            "session_id": agent_profile.get("trace_id"),
+            "device_id": creator_ctx.get("device_id"),
+            "ip_address": agent_profile.get("ip"),
+            "burst_blob": binary_payload,
+            "created_at": timestamp,
+        }
+        return PendingCrum(
+            crum_id=crum_id,
+            timestamp=timestamp,
+            payload_json=payload.encoded,
+            salt=salt,
+            row=row,
+            blob=binary_payload,
+        )
+
     def _calculate_synapse_shift(self, f: float, p: float) -> float:
         """Traducción de ráfaga binaria a intensidad sensorial (Capa 2)."""
         return min((f * p) / 1000.0, 2.0)
 
-    async def _fetch_last_crum(self) -> Optional[TAMVCrumEntity]:
-        stmt = select(TAMVCrumEntity).order_by(desc(TAMVCrumEntity.created_at)).limit(1)
-        result = await self.db.execute(stmt)
-        return result.scalar_one_or_none()
+    async def _fetch_last_crum(self, session: Optional[AsyncSession] = None) -> Optional[TAMVCrumEntity]:
+        return await self.writer.fetch_last_crum(session or self.db)
 
-    async def _verify_chain_link(self) -> bool:
+    async def _verify_chain_link(self, session: Optional[AsyncSession] = None) -> bool:
         """Validación de coherencia retrospectiva de la cadena."""
-        stmt = select(TAMVCrumEntity).order_by(desc(TAMVCrumEntity.created_at)).limit(2)
-        result = await self.db.execute(stmt)
-        records = result.scalars().all()
-
-        if len(records) < 2:
-            return True
-
-        current, previous = records[0], records[1]
-        if current.previous_hash != previous.integrity_hash:
-            return False
-        return True
+        return await self.writer.verify_chain_link(session or self.db)
 
     async def _trigger_emergency_protocol(self, reason: str, severity: float, source: str):
         """Propagación de señal de crisis a la interfaz táctica."""
+        if self.broadcaster is not None:
+            await self.broadcaster.signal(source=source, reason=f"SECURITY_BREACH: {reason}", threat_level=severity)
+            return
         event_payload = {
             "status": "CRITICAL",
             "threatLevel": severity,
@@ -168,14 +246,36 @@ class SovereignIngestor:
 
     async def get_sovereign_stats(self) -> Dict[str, Any]:
         """Dashboard Data: Estado de salud del Ledger."""
+        stats = self.writer.stats
+        if stats is not None and stats.loaded:
+            # O(1): contadores incrementales en memoria, sin COUNT(*) por consulta
+            return {**stats.snapshot(), "last_sync": datetime.now(timezone.utc).isoformat()}
+
+        if self.storage is not None:
+            head_hash, _ = await self.storage.head()
+            return {
+                "ledger_height": await self.storage.count(),
+                "integrity_status": "SECURE" if await self.storage.verify_tail() else "BROKEN",
+                "last_sync": datetime.now(timezone.utc).isoformat(),
+                "last_hash": None if head_hash == self.genesis_hash else head_hash,
+            }
+
+        if self.db is not None:
+            return await self._stats_from_db(self.db)
+        if self.session_factory is None:
+            raise RuntimeError("Sin sesión, storage ni session_factory para leer el estado del Ledger.")
+        async with self.session_factory() as session:
+            return await self._stats_from_db(session)
+
+    async def _stats_from_db(self, session: AsyncSession) -> Dict[str, Any]:
         count_stmt = select(func.count(TAMVCrumEntity.id))
-        res = await self.db.execute(count_stmt)
+        res = await session.execute(count_stmt)
         total_crums = res.scalar() or 0
-        last_crum = await self._fetch_last_crum()
+        last_crum = await self._fetch_last_crum(session)
 
         return {
             "ledger_height": total_crums,
-            "integrity_status": "SECURE" if await self._verify_chain_link() else "BROKEN",
+            "integrity_status": "SECURE" if await self._verify_chain_link(session) else "BROKEN",
             "last_sync": datetime.now(timezone.utc).isoformat(),
             "last_hash": last_crum.integrity_hash if last_crum else None,
         }
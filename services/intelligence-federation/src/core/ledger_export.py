@@ -0,0 +1,97 @@
+"""
+TAMV Ledger Export: Lectura en streaming del Ledger para auditoría.
+Paginación keyset sobre (created_at, id) apoyada en ix_sovereignty_audit:
+memoria constante sin importar el tamaño del resultado y sin OFFSET.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.sovereign_event import TAMVCrumEntity, RiskLevel
+from .encoding import dumps
+
+_EXPORT_COLUMNS = (
+    TAMVCrumEntity.id,
+    TAMVCrumEntity.canonical_id,
+    TAMVCrumEntity.chain_height,
+    TAMVCrumEntity.action_type,
+    TAMVCrumEntity.creator_did,
+    TAMVCrumEntity.risk_level,
+    TAMVCrumEntity.integrity_hash,
+    TAMVCrumEntity.parent_hash,
+    TAMVCrumEntity.payload,
+    TAMVCrumEntity.created_at,
+)
+
+
+@dataclass
+class ExportFilter:
+    creator_did: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    risk_levels: List[str] = field(default_factory=list)
+    action_type: Optional[str] = None
+    # Exportación propia (no auditor): solo Crums firmados con esta llave
+    creator_fingerprint: Optional[str] = None
+
+
+def _build_query(flt: ExportFilter):
+    stmt = select(*_EXPORT_COLUMNS)
+    if flt.creator_did:
+        stmt = stmt.where(TAMVCrumEntity.creator_did == flt.creator_did)
+    if flt.creator_fingerprint:
+        stmt = stmt.where(TAMVCrumEntity.creator_fingerprint == flt.creator_fingerprint)
+    if flt.since:
+        stmt = stmt.where(TAMVCrumEntity.created_at >= flt.since)
+    if flt.until:
+        stmt = stmt.where(TAMVCrumEntity.created_at < flt.until)
+    if flt.risk_levels:
+        stmt = stmt.where(TAMVCrumEntity.risk_level.in_([RiskLevel(r) for r in flt.risk_levels]))
+    if flt.action_type:
+        stmt = stmt.where(TAMVCrumEntity.action_type == flt.action_type)
+    return stmt
+
+
+def _to_record(row) -> Dict[str, Any]:
+    return {
+        "crum_id": str(row.id),
+        "canonical_id": row.canonical_id,
+        "chain_height": row.chain_height,
+        "action": row.action_type,
+        "creator_did": row.creator_did,
+        "risk": row.risk_level.value if isinstance(row.risk_level, RiskLevel) else row.risk_level,
+        "integrity_hash": row.integrity_hash,
+        "parent_hash": row.parent_hash,
+        "payload": row.payload,
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+async def stream_ndjson(
+    session: AsyncSession,
+    flt: ExportFilter,
+    chunk_size: int = 5000,
+    limit: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Genera el Ledger filtrado como NDJSON, un bloque keyset a la vez."""
+    base = _build_query(flt).order_by(TAMVCrumEntity.created_at, TAMVCrumEntity.id)
+    cursor = None
+    emitted = 0
+    while limit is None or emitted < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - emitted)
+        stmt = base
+        if cursor is not None:
+            stmt = stmt.where(tuple_(TAMVCrumEntity.created_at, TAMVCrumEntity.id) > cursor)
+        rows = (await session.execute(stmt.limit(size))).all()
+        if not rows:
+            return
+
+        yield "".join(dumps(_to_record(row)) + "\n" for row in rows).encode("utf-8")
+
+        emitted += len(rows)
+        cursor = (rows[-1].created_at, rows[-1].id)
+        if len(rows) < size:
+            return
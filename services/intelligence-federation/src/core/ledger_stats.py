@@ -0,0 +1,184 @@
+"""
+TAMV Ledger Stats: Estadísticas O(1) del Ledger.
+Altura, último hash y contadores por acción/riesgo se mantienen de forma
+incremental con cada lote anclado; el dashboard los lee de memoria y una
+reconciliación periódica corrige cualquier deriva contra la tabla real.
+La reconciliación cuenta en un snapshot REPEATABLE READ junto con la altura
+máxima y los contadores persistidos de ese mismo instante: la corrección es
+un delta (no una reescritura) y solo se re-aplican los lotes por encima de
+la marca de altura.
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import select, desc, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.ledger_state import TAMVLedgerCounterEntity
+from ..models.sovereign_event import TAMVCrumEntity
+from .chain import PendingCrum
+
+logger = structlog.get_logger("tamv.ledger_stats")
+
+_CounterKey = Tuple[str, str]  # (dimension, value)
+
+
+class LedgerStats:
+    def __init__(self, chain_key: str = "global"):
+        self.chain_key = chain_key
+        self.height = 0
+        self.last_hash: Optional[str] = None
+        self.integrity_status = "SECURE"
+        self.last_reconciled: Optional[datetime] = None
+        self._counters: Counter = Counter()
+        # Lotes (altura final, deltas) aplicados mientras corre una reconciliación
+        self._since_reconcile: Optional[List[Tuple[Optional[int], Counter]]] = None
+        self.loaded = False
+
+    @staticmethod
+    def batch_deltas(pendings: List[PendingCrum]) -> Counter:
+        deltas: Counter = Counter()
+        for pending in pendings:
+            deltas[("action", pending.row["action_type"])] += 1
+            deltas[("risk", _risk_name(pending.row["risk_level"]))] += 1
+        return deltas
+
+    async def load(self, session: AsyncSession) -> None:
+        """Carga única al arranque desde la tabla de contadores."""
+        stmt = select(
+            TAMVLedgerCounterEntity.dimension,
+            TAMVLedgerCounterEntity.value,
+            TAMVLedgerCounterEntity.count,
+        ).where(TAMVLedgerCounterEntity.chain_key == self.chain_key)
+        rows = (await session.execute(stmt)).all()
+        self._counters = Counter({(row.dimension, row.value): row.count for row in rows})
+        self.height = sum(n for (dimension, _), n in self._counters.items() if dimension == "action")
+        last_stmt = select(TAMVCrumEntity.integrity_hash).order_by(desc(TAMVCrumEntity.created_at)).limit(1)
+        self.last_hash = (await session.execute(last_stmt)).scalar_one_or_none()
+        self.loaded = True
+
+    async def persist(self, session: AsyncSession, deltas: Counter) -> None:
+        """Upsert incremental; debe ir en la misma transacción que el INSERT del lote."""
+        if not deltas:
+            return
+        stmt = pg_insert(TAMVLedgerCounterEntity).values([
+            {"chain_key": self.chain_key, "dimension": dimension, "value": value, "count": n}
+            for (dimension, value), n in deltas.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                TAMVLedgerCounterEntity.chain_key,
+                TAMVLedgerCounterEntity.dimension,
+                TAMVLedgerCounterEntity.value,
+            ],
+            set_={"count": TAMVLedgerCounterEntity.count + stmt.excluded.count, "updated_at": func.now()},
+        )
+        await session.execute(stmt)
+
+    def apply(self, deltas: Counter, head_hash: str, height: Optional[int] = None) -> None:
+        """Aplica en memoria un lote ya confirmado; `height` es la altura de su último Crum."""
+        self._counters.update(deltas)
+        self.height += sum(n for (dimension, _), n in deltas.items() if dimension == "action")
+        self.last_hash = head_hash
+        if self._since_reconcile is not None:
+            self._since_reconcile.append((height, deltas))
+
+    def snapshot(self) -> Dict[str, Any]:
+        by_dimension: Dict[str, Dict[str, int]] = {"action": {}, "risk": {}}
+        for (dimension, value), n in self._counters.items():
+            by_dimension.setdefault(dimension, {})[value] = n
+        return {
+            "ledger_height": self.height,
+            "integrity_status": self.integrity_status,
+            "last_hash": self.last_hash,
+            "by_action": by_dimension["action"],
+            "by_risk": by_dimension["risk"],
+            "last_reconciled": self.last_reconciled.isoformat() if self.last_reconciled else None,
+        }
+
+    async def reconcile(self, session: AsyncSession, verify_link: Optional[Callable] = None) -> int:
+        """
+        Recuenta contra tamv_crums_ledger y corrige los contadores.
+        Devuelve la deriva absoluta detectada. Requiere una sesión sin
+        transacción abierta (el nivel de aislamiento se fija al empezar).
+        """
+        self._since_reconcile = []
+        try:
+            # Un solo snapshot: recuento, marca de altura y contadores persistidos coinciden
+            await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            in_chain = TAMVCrumEntity.chain_key == self.chain_key
+            mark = (await session.execute(select(func.max(TAMVCrumEntity.chain_height)).where(in_chain))).scalar() or 0
+
+            actual: Counter = Counter()
+            action_stmt = select(TAMVCrumEntity.action_type, func.count()).where(in_chain).group_by(TAMVCrumEntity.action_type)
+            for action, n in (await session.execute(action_stmt)).all():
+                actual[("action", action)] = n
+            risk_stmt = select(TAMVCrumEntity.risk_level, func.count()).where(in_chain).group_by(TAMVCrumEntity.risk_level)
+            for risk, n in (await session.execute(risk_stmt)).all():
+                actual[("risk", _risk_name(risk))] = n
+
+            stored_stmt = select(
+                TAMVLedgerCounterEntity.dimension,
+                TAMVLedgerCounterEntity.value,
+                TAMVLedgerCounterEntity.count,
+            ).where(TAMVLedgerCounterEntity.chain_key == self.chain_key)
+            stored = Counter({(row.dimension, row.value): row.count for row in (await session.execute(stored_stmt)).all()})
+
+            if verify_link is not None:
+                self.integrity_status = "SECURE" if await verify_link(session) else "BROKEN"
+            await session.commit()
+
+            # Corrección como delta: conmuta con los upserts de lotes concurrentes
+            correction: Counter = Counter()
+            for key in set(actual) | set(stored):
+                if actual[key] != stored[key]:
+                    correction[key] = actual[key] - stored[key]
+            if correction:
+                await self.persist(session, correction)
+                await session.commit()
+        finally:
+            applied, self._since_reconcile = self._since_reconcile, None
+
+        # En memoria: el snapshot más los lotes propios confirmados por encima de la marca
+        replayed: Counter = Counter()
+        for height, deltas in applied:
+            if height is None or height > mark:
+                replayed.update(deltas)
+        counters = actual + replayed
+        drift = sum(abs(counters[key] - self._counters[key]) for key in set(counters) | set(self._counters))
+        self._counters = counters
+        self.height = sum(n for (dimension, _), n in self._counters.items() if dimension == "action")
+        self.last_reconciled = datetime.now(timezone.utc)
+        if drift or correction:
+            logger.warning(
+                "ledger_stats_drift_corrected",
+                drift=drift,
+                persisted_drift=sum(abs(n) for n in correction.values()),
+                height=self.height,
+                mark=mark,
+            )
+        return drift
+
+    async def run_reconciliation(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        interval_s: float = 900.0,
+        verify_link: Optional[Callable] = None,
+    ) -> None:
+        """Tarea de fondo: reconciliación periódica fuera del camino de ingesta."""
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                async with session_factory() as session:
+                    await self.reconcile(session, verify_link)
+            except Exception as e:
+                logger.error("ledger_stats_reconcile_failed", error=str(e))
+
+
+def _risk_name(risk: Any) -> str:
+    return risk.name if isinstance(risk, Enum) else str(risk).upper()
@@ -0,0 +1,230 @@
+"""
+TAMV Ledger Writer: Persistencia encadenada de Crums.
+Enlaza un lote en memoria y lo escribe como un único INSERT multi-fila
+dentro de una sola transacción (un fsync por lote, no por Crum).
+Con una ChainHead, el anclaje sale de memoria y no requiere SELECTs.
+"""
+from typing import List, Optional
+
+import structlog
+from sqlalchemy import exc as sa_exc, select, desc, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.sovereign_event import TAMVCrumEntity
+from .chain import GENESIS_HASH, IntegrityError, PendingCrum, link_chain
+from .chain_head import ChainHead, StaleChainHeadError, number_legacy_rows
+from .chain_lease import ChainLease
+from .ledger_stats import LedgerStats
+from .outbox import LedgerOutbox
+from .profiling import stage
+from .telemetry import EcgRollups, extract_ecg
+
+logger = structlog.get_logger("tamv.ledger")
+
+# Errores causados por los datos de una fila (longitud, tipo, restricción): bisectar
+# el lote aísla a la culpable. Cualquier otro (conexión, pool, timeout) es del lote entero.
+ROW_ERRORS = (sa_exc.DataError, sa_exc.IntegrityError)
+
+
+class LedgerWriter:
+    def __init__(
+        self,
+        genesis_hash: str = GENESIS_HASH,
+        chain_head: Optional[ChainHead] = None,
+        max_resync: int = 3,
+        stats: Optional[LedgerStats] = None,
+        lease: Optional[ChainLease] = None,
+        outbox: Optional[LedgerOutbox] = None,
+        rollups: Optional[EcgRollups] = None,
+    ):
+        self.genesis_hash = chain_head.genesis_hash if chain_head else genesis_hash
+        self.chain_head = chain_head
+        self.max_resync = max_resync
+        # Contadores incrementales: se persisten en la misma transacción del lote
+        self.stats = stats
+        # Lease distribuido (multi-nodo): requiere chain_head; sin él, solo el CAS arbitra
+        self.lease = lease
+        # Outbox transaccional: el evento de anclaje se confirma junto con el lote
+        self.outbox = outbox
+        # Rollups ECG por ventana: mismo patrón transaccional que los contadores
+        self.rollups = rollups
+
+    async def append(self, session: AsyncSession, pendings: List[PendingCrum]) -> str:
+        """
+        Ancla un lote ordenado de Crums. Devuelve el nuevo hash de cabeza.
+        Lanza IntegrityError si la cadena persistida ya está rota.
+        """
+        if not pendings:
+            raise ValueError("Lote vacío: nada que anclar.")
+
+        # Columnas ECG del lote completo en una pasada (antes de cualquier reintento)
+        extract_ecg(pendings)
+
+        if self.chain_head is not None:
+            return await self._append_sequenced(session, pendings)
+
+        # 1. VERIFICACIÓN DE CADENA (una vez por lote)
+        with stage("chain_verify"):
+            chain_ok = await self.verify_chain_link(session)
+        if not chain_ok:
+            raise IntegrityError("CRITICAL: Ledger chain link is broken. Ingestion halted.")
+
+        # 2. RECUPERAR ANCLAJE (LAST HASH)
+        with stage("chain_read"):
+            last_crum = await self.fetch_last_crum(session)
+        previous_hash = last_crum.integrity_hash if last_crum else self.genesis_hash
+        last_height = 0
+        if last_crum is not None:
+            # Último Crum del tramo sin altura: se numera antes de continuar tras él
+            last_height = last_crum.chain_height or await number_legacy_rows(session, last_crum.chain_key)
+
+        # 3. ENCADENAMIENTO EN MEMORIA, EN ORDEN DE LLEGADA
+        head = link_chain(previous_hash, pendings, start_height=last_height)
+
+        # 4. PERSISTENCIA ATÓMICA: UN INSERT MULTI-FILA + UN COMMIT
+        with stage("commit"):
+            await session.execute(insert(TAMVCrumEntity).values([p.row for p in pendings]))
+            deltas = await self._persist_stats(session, pendings)
+            await self._persist_rollups(session, pendings)
+            await self._persist_outbox(session, pendings)
+            await session.commit()
+        self._apply_stats(deltas, head, pendings[-1].row.get("chain_height"))
+        self._notify_outbox()
+
+        logger.debug("ledger_batch_appended", size=len(pendings), head=head[:16])
+        return head
+
+    async def _append_sequenced(self, session: AsyncSession, pendings: List[PendingCrum]) -> str:
+        """
+        Escritor único sobre la ChainHead: encadena desde la cabeza en memoria
+        y confirma con compare-and-set. Si otro escritor movió la cadena,
+        re-sincroniza la cabeza y vuelve a enlazar el lote.
+        Un lote ya enlazado exactamente sobre la cabeza vigente (p. ej. desde
+        el spool local) se persiste tal cual, sin recalcular sus hashes.
+        Con lease, solo el nodo titular anexa; al estrenar tenencia relee la cabeza,
+        y si el lease ya no está holgadamente vigente justo antes del CAS, lo renueva.
+        """
+        head = self.chain_head
+        lease = self.lease
+        async with head.sequencer:
+            for attempt in range(self.max_resync + 1):
+                fence = None
+                if lease is not None:
+                    with stage("lease"):
+                        new_tenure = await lease.ensure()
+                    fence = lease.token
+                    if new_tenure and head.loaded:
+                        with stage("chain_read"):
+                            await head.resync(session)
+                if not head.loaded:
+                    with stage("chain_read"):
+                        await head.load(session)
+
+                if _linked_on(pendings, head):
+                    new_hash = pendings[-1].integrity_hash
+                else:
+                    new_hash = link_chain(head.hash, pendings, start_height=head.height)
+                for pending in pendings:
+                    pending.row["chain_key"] = head.chain_key
+
+                if lease is not None and not lease.held:
+                    # La lectura de cabeza consumió el margen del lease: renovar antes del CAS
+                    with stage("lease"):
+                        new_tenure = await lease.ensure()
+                    fence = lease.token
+                    if new_tenure:
+                        # Otro nodo pudo anexar entretanto: re-sincronizar y volver a enlazar
+                        with stage("chain_read"):
+                            await head.resync(session)
+                        continue
+
+                with stage("commit"):
+                    # CAS primero: bloquea la fila de cabeza hasta el commit
+                    advanced = await head.compare_and_advance(session, new_hash, len(pendings), fence=fence)
+                    if advanced:
+                        await session.execute(insert(TAMVCrumEntity).values([p.row for p in pendings]))
+                        deltas = await self._persist_stats(session, pendings)
+                        await self._persist_rollups(session, pendings)
+                        await self._persist_outbox(session, pendings)
+                        try:
+                            await session.commit()
+                        except Exception:
+                            # Resultado ambiguo: la próxima escritura relee la cabeza
+                            head.invalidate()
+                            raise
+
+                if not advanced:
+                    await session.rollback()
+                    if lease is not None:
+                        # Otro titular movió la cabeza: la tenencia actual ya no es fiable
+                        await lease.release()
+                    logger.warning("chain_head_stale", chain=head.chain_key, attempt=attempt, head=head.hash[:16])
+                    with stage("chain_read"):
+                        await head.resync(session)
+                    continue
+
+                head.advance(new_hash, len(pendings))
+                self._apply_stats(deltas, new_hash, head.height)
+                self._notify_outbox()
+                if lease is not None and lease.should_yield():
+                    # Traspaso: otro nodo espera y ya anclamos al menos un lote
+                    await lease.release()
+                logger.debug("ledger_batch_appended", size=len(pendings), head=new_hash[:16], height=head.height)
+                return new_hash
+
+        raise StaleChainHeadError(f"Chain head '{head.chain_key}' siguió moviéndose tras {self.max_resync} re-sincronizaciones.")
+
+    def shard_key(self, pending: PendingCrum) -> Optional[str]:
+        """Cadena destino del Crum; None = la cadena única de este writer."""
+        return None
+
+    async def _persist_stats(self, session: AsyncSession, pendings: List[PendingCrum]):
+        if self.stats is None:
+            return None
+        deltas = self.stats.batch_deltas(pendings)
+        await self.stats.persist(session, deltas)
+        return deltas
+
+    def _apply_stats(self, deltas, head_hash: str, height: Optional[int]) -> None:
+        if self.stats is not None and deltas is not None:
+            self.stats.apply(deltas, head_hash, height)
+
+    async def _persist_rollups(self, session: AsyncSession, pendings: List[PendingCrum]) -> None:
+        if self.rollups is not None:
+            await self.rollups.persist(session, self.rollups.batch_deltas(pendings))
+
+    async def _persist_outbox(self, session: AsyncSession, pendings: List[PendingCrum]) -> None:
+        if self.outbox is not None:
+            await self.outbox.persist(session, pendings)
+
+    def _notify_outbox(self) -> None:
+        if self.outbox is not None:
+            self.outbox.notify()
+
+    @staticmethod
+    async def fetch_last_crum(session: AsyncSession) -> Optional[TAMVCrumEntity]:
+        stmt = select(TAMVCrumEntity).order_by(desc(TAMVCrumEntity.created_at)).limit(1)
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def verify_chain_link(session: AsyncSession) -> bool:
+        """Validación de coherencia retrospectiva de la cadena."""
+        stmt = select(TAMVCrumEntity).order_by(desc(TAMVCrumEntity.created_at)).limit(2)
+        result = await session.execute(stmt)
+        records = result.scalars().all()
+
+        if len(records) < 2:
+            return True
+
+        current, previous = records[0], records[1]
+        return current.parent_hash == previous.integrity_hash
+
+
+def _linked_on(pendings: List[PendingCrum], head: ChainHead) -> bool:
+    first = pendings[0]
+    return (
+        first.previous_hash == head.hash
+        and first.row.get("chain_height") == head.height + 1
+        and pendings[-1].integrity_hash is not None
+    )
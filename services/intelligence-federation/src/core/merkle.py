@@ -0,0 +1,287 @@
+"""
+TAMV Merkle Checkpoints: Raíces Merkle por bloques consecutivos del Ledger.
+Cada bloque de BLOCK_SIZE alturas se resume en una raíz SHA3-512; probar que
+un Crum pertenece al Ledger cuesta O(log n) hashes en lugar de re-ejecutar
+la cadena desde el génesis. Con sharding cada cadena (global y shards) sella
+sus propios bloques; ChainCheckpointers descubre las cadenas en cada ronda.
+Un bloque sellado es inmutable: sus niveles de nodos se guardan en una LRU
+en proceso (al sellar o en la primera prueba) y las pruebas siguientes no
+vuelven a leer ni a hashear las 1024 hojas.
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import select, desc
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.ledger_state import TAMVChainHeadEntity, TAMVMerkleCheckpointEntity
+from ..models.sovereign_event import TAMVCrumEntity
+from .chain import GLOBAL_CHAIN
+
+logger = structlog.get_logger("tamv.merkle")
+
+BLOCK_SIZE = 1024
+# Separación de dominio hoja/nodo (evita ataques de segunda preimagen)
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+ProofStep = Tuple[str, str]  # ("L" | "R", hash hermano)
+Levels = List[List[bytes]]  # hojas primero, raíz al final
+
+
+def leaf_hash(integrity_hash: str) -> bytes:
+    return hashlib.sha3_512(_LEAF_PREFIX + bytes.fromhex(integrity_hash)).digest()
+
+
+def _node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha3_512(_NODE_PREFIX + left + right).digest()
+
+
+def _next_level(level: List[bytes]) -> List[bytes]:
+    # Un nodo impar sube sin emparejar
+    paired = [_node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        paired.append(level[-1])
+    return paired
+
+
+def merkle_levels(integrity_hashes: List[str]) -> Levels:
+    if not integrity_hashes:
+        raise ValueError("Bloque vacío: no hay raíz Merkle.")
+    levels = [[leaf_hash(h) for h in integrity_hashes]]
+    while len(levels[-1]) > 1:
+        levels.append(_next_level(levels[-1]))
+    return levels
+
+
+def merkle_root(integrity_hashes: List[str]) -> str:
+    return merkle_levels(integrity_hashes)[-1][0].hex()
+
+
+def proof_from_levels(levels: Levels, index: int) -> List[ProofStep]:
+    """Camino de inclusión de la hoja `index` leyendo niveles ya calculados."""
+    proof: List[ProofStep] = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(("L" if sibling < index else "R", level[sibling].hex()))
+        index //= 2
+    return proof
+
+
+def merkle_proof(integrity_hashes: List[str], index: int) -> List[ProofStep]:
+    """Camino de inclusión de la hoja `index` hasta la raíz del bloque."""
+    return proof_from_levels(merkle_levels(integrity_hashes), index)
+
+
+class SealedLevelCache:
+    """LRU de niveles por (cadena, bloque) sellado; ~128 KiB por bloque de 1024 hojas."""
+
+    def __init__(self, max_blocks: int = 64):
+        self.max_blocks = max_blocks
+        self._levels: "OrderedDict[Tuple[str, int], Levels]" = OrderedDict()
+
+    def get(self, chain_key: str, block_index: int) -> Optional[Levels]:
+        levels = self._levels.get((chain_key, block_index))
+        if levels is not None:
+            self._levels.move_to_end((chain_key, block_index))
+        return levels
+
+    def put(self, chain_key: str, block_index: int, levels: Levels) -> None:
+        self._levels[(chain_key, block_index)] = levels
+        self._levels.move_to_end((chain_key, block_index))
+        while len(self._levels) > self.max_blocks:
+            self._levels.popitem(last=False)
+
+
+SEALED_LEVELS = SealedLevelCache()
+
+
+def verify_proof(integrity_hash: str, proof: List[ProofStep], root: str) -> bool:
+    """Verificación O(log n): recompone la raíz desde la hoja y su camino."""
+    node = leaf_hash(integrity_hash)
+    for side, sibling in proof:
+        sibling_bytes = bytes.fromhex(sibling)
+        node = _node_hash(sibling_bytes, node) if side == "L" else _node_hash(node, sibling_bytes)
+    return node.hex() == root
+
+
+def block_range(block_index: int, block_size: int = BLOCK_SIZE) -> Tuple[int, int]:
+    """Alturas [inicio, fin] cubiertas por un bloque (las alturas empiezan en 1)."""
+    start = block_index * block_size + 1
+    return start, start + block_size - 1
+
+
+class MerkleCheckpointer:
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        chain_key: str = GLOBAL_CHAIN,
+        block_size: int = BLOCK_SIZE,
+        level_cache: Optional[SealedLevelCache] = SEALED_LEVELS,
+    ):
+        self.session_factory = session_factory
+        self.chain_key = chain_key
+        self.block_size = block_size
+        self.level_cache = level_cache
+
+    async def build_pending(self) -> int:
+        """Sella todos los bloques completos que aún no tienen checkpoint."""
+        sealed = 0
+        async with self.session_factory() as session:
+            next_block = await self._next_block_index(session)
+            while True:
+                start, end = block_range(next_block, self.block_size)
+                hashes = await block_hashes(session, start, end, self.chain_key)
+                if len(hashes) < self.block_size:
+                    break
+                levels = merkle_levels(hashes)
+                stmt = pg_insert(TAMVMerkleCheckpointEntity).values(
+                    chain_key=self.chain_key,
+                    block_index=next_block,
+                    start_height=start,
+                    end_height=end,
+                    merkle_root=levels[-1][0].hex(),
+                    end_hash=hashes[-1],
+                ).on_conflict_do_nothing()
+                await session.execute(stmt)
+                await session.commit()
+                if self.level_cache is not None:
+                    # Los bloques recién sellados son los que más pruebas reciben
+                    self.level_cache.put(self.chain_key, next_block, levels)
+                sealed += 1
+                next_block += 1
+        if sealed:
+            logger.info("merkle_blocks_sealed", chain=self.chain_key, sealed=sealed, next_block=next_block)
+        return sealed
+
+    async def run(self, interval_s: float = 60.0) -> None:
+        while True:
+            try:
+                await self.build_pending()
+            except Exception as e:
+                logger.error("merkle_checkpoint_failed", error=str(e))
+            await asyncio.sleep(interval_s)
+
+    async def _next_block_index(self, session: AsyncSession) -> int:
+        stmt = (
+            select(TAMVMerkleCheckpointEntity.block_index)
+            .where(TAMVMerkleCheckpointEntity.chain_key == self.chain_key)
+            .order_by(desc(TAMVMerkleCheckpointEntity.block_index))
+            .limit(1)
+        )
+        last = (await session.execute(stmt)).scalar_one_or_none()
+        return 0 if last is None else last + 1
+
+
+class ChainCheckpointers:
+    """Un MerkleCheckpointer por cadena con cabeza; los shards nuevos se incorporan solos."""
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], block_size: int = BLOCK_SIZE):
+        self.session_factory = session_factory
+        self.block_size = block_size
+        self._checkpointers: Dict[str, MerkleCheckpointer] = {}
+
+    async def chain_keys(self) -> List[str]:
+        async with self.session_factory() as session:
+            keys = set((await session.execute(select(TAMVChainHeadEntity.chain_key))).scalars())
+        # La cadena global se sella aunque el writer aún no haya creado su fila de cabeza
+        keys.add(GLOBAL_CHAIN)
+        return sorted(keys)
+
+    async def build_pending(self) -> int:
+        sealed = 0
+        for chain_key in await self.chain_keys():
+            checkpointer = self._checkpointers.get(chain_key)
+            if checkpointer is None:
+                checkpointer = self._checkpointers[chain_key] = MerkleCheckpointer(
+                    self.session_factory, chain_key=chain_key, block_size=self.block_size
+                )
+            try:
+                sealed += await checkpointer.build_pending()
+            except Exception as e:
+                # Un shard con problemas no frena el sellado del resto
+                logger.error("merkle_checkpoint_failed", chain=chain_key, error=str(e))
+        return sealed
+
+    async def run(self, interval_s: float = 60.0) -> None:
+        while True:
+            try:
+                await self.build_pending()
+            except Exception as e:
+                logger.error("merkle_checkpoint_failed", error=str(e))
+            await asyncio.sleep(interval_s)
+
+
+async def block_hashes(session: AsyncSession, start: int, end: int, chain_key: str = GLOBAL_CHAIN) -> List[str]:
+    stmt = (
+        select(TAMVCrumEntity.integrity_hash)
+        .where(TAMVCrumEntity.chain_key == chain_key, TAMVCrumEntity.chain_height.between(start, end))
+        .order_by(TAMVCrumEntity.chain_height)
+    )
+    return list((await session.execute(stmt)).scalars().all())
+
+
+async def inclusion_proof(
+    session: AsyncSession,
+    crum_id: str,
+    block_size: int = BLOCK_SIZE,
+    level_cache: Optional[SealedLevelCache] = SEALED_LEVELS,
+) -> Optional[dict]:
+    """
+    Prueba de inclusión de un Crum contra el checkpoint de su bloque, en su propia cadena.
+    Devuelve None si el Crum no existe; 'sealed' es False si su bloque aún no tiene raíz.
+    Si el bloque sellado ya no está completo en el Ledger (p. ej. una partición
+    retirada), 'available' es False y no se devuelve camino: sería contra otro árbol.
+    """
+    crum_stmt = select(
+        TAMVCrumEntity.chain_key, TAMVCrumEntity.chain_height, TAMVCrumEntity.integrity_hash
+    ).where(TAMVCrumEntity.id == crum_id)
+    crum = (await session.execute(crum_stmt)).one_or_none()
+    if crum is None or crum.chain_height is None:
+        return None
+    chain_key = crum.chain_key
+
+    block_index = (crum.chain_height - 1) // block_size
+    checkpoint = await session.get(TAMVMerkleCheckpointEntity, (chain_key, block_index))
+    result = {
+        "crum_id": str(crum_id),
+        "chain_key": chain_key,
+        "chain_height": crum.chain_height,
+        "leaf": crum.integrity_hash,
+        "block_index": block_index,
+        "sealed": checkpoint is not None,
+        "algorithm": "sha3-512",
+        "leaf_prefix": _LEAF_PREFIX.hex(),
+        "node_prefix": _NODE_PREFIX.hex(),
+    }
+    if checkpoint is None:
+        return result
+
+    levels = level_cache.get(chain_key, block_index) if level_cache is not None else None
+    if levels is None:
+        hashes = await block_hashes(session, checkpoint.start_height, checkpoint.end_height, chain_key)
+        expected = checkpoint.end_height - checkpoint.start_height + 1
+        if len(hashes) != expected:
+            logger.error("merkle_block_incomplete", chain=chain_key, block=block_index, rows=len(hashes), expected=expected)
+            result.update({
+                "merkle_root": checkpoint.merkle_root,
+                "available": False,
+                "reason": "block_rows_missing",
+            })
+            return result
+        levels = merkle_levels(hashes)
+        if level_cache is not None:
+            level_cache.put(chain_key, block_index, levels)
+    index = crum.chain_height - checkpoint.start_height
+    result.update({
+        "merkle_root": checkpoint.merkle_root,
+        "block_end_hash": checkpoint.end_hash,
+        "available": True,
+        "proof": [{"side": side, "hash": sibling} for side, sibling in proof_from_levels(levels, index)],
+    })
+    return result
@@ -0,0 +1,116 @@
+"""
+TAMV Metrics: Histogramas y contadores en memoria del camino de ingesta.
+Se alimenta de los cronómetros de profiling.stage() y se expone en formato
+de texto de Prometheus (scrape). Observar una muestra cuesta un bisect y
+dos sumas; no hay E/S ni locks en el camino caliente.
+"""
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence
+
+from . import profiling
+
+# Segundos: de 50µs (caché de ANUBIS) a 5s (commit bajo contención)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+class Histogram:
+    __slots__ = ("bounds", "buckets", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        # Último bucket = +Inf
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimación por límite superior del bucket (para el dashboard, no para auditoría)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else float("inf")
+        return float("inf")
+
+
+class MetricsRegistry:
+    def __init__(self, namespace: str = "tamv", bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.namespace = namespace
+        self.bounds = tuple(bounds)
+        self.stages: Dict[str, Histogram] = {}
+        self.events: Counter = Counter()
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    # ====== Registro ======
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = Histogram(self.bounds)
+        histogram.observe(seconds)
+
+    def incr(self, event: str, n: int = 1) -> None:
+        self.events[event] += n
+
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Gauge evaluado en cada scrape (altura del Ledger, backlog del spool...)."""
+        self._gauges[name] = read
+
+    def install(self) -> None:
+        """Conecta el registro a los cronómetros y contadores de profiling."""
+        profiling.add_stage_recorder(self.observe_stage)
+        profiling.add_event_recorder(self.incr)
+
+    def uninstall(self) -> None:
+        profiling.remove_stage_recorder(self.observe_stage)
+        profiling.remove_event_recorder(self.incr)
+
+    # ====== Exposición ======
+
+    def render(self) -> str:
+        """Formato de texto de exposición de Prometheus (version 0.0.4)."""
+        ns = self.namespace
+        lines: List[str] = [
+            f"# HELP {ns}_stage_duration_seconds Duración por etapa del camino de ingesta.",
+            f"# TYPE {ns}_stage_duration_seconds histogram",
+        ]
+        for name in sorted(self.stages):
+            histogram = self.stages[name]
+            cumulative = 0
+            for bound, n in zip(self.bounds, histogram.buckets):
+                cumulative += n
+                lines.append(f'{ns}_stage_duration_seconds_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{ns}_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{ns}_stage_duration_seconds_sum{{stage="{name}"}} {histogram.sum:.9f}')
+            lines.append(f'{ns}_stage_duration_seconds_count{{stage="{name}"}} {histogram.count}')
+
+        lines += [
+            f"# HELP {ns}_events_total Eventos del camino de ingesta.",
+            f"# TYPE {ns}_events_total counter",
+        ]
+        for event in sorted(self.events):
+            lines.append(f'{ns}_events_total{{event="{event}"}} {self.events[event]}')
+
+        for name in sorted(self._gauges):
+            try:
+                value = float(self._gauges[name]())
+            except Exception:
+                continue
+            lines += [f"# TYPE {ns}_{name} gauge", f"{ns}_{name} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+# Registro por proceso que sirve el endpoint de scrape
+REGISTRY = MetricsRegistry()
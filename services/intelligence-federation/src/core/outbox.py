@@ -0,0 +1,171 @@
+"""
+TAMV Outbox: Fan-out transaccional de eventos del Ledger.
+El evento de anclaje se inserta en tamv_ledger_outbox dentro de la misma
+transacción que el lote de Crums: si el Crum existe, su evento también.
+Un relay en segundo plano drena la tabla a Redis y borra lo entregado en la
+misma transacción que lo leyó. Cada lote drenado sale como un único mensaje
+CRUM_ANCHORED_BATCH por canal (mismo formato que el CrisisBroadcaster), no
+como un PUBLISH por Crum.
+Garantías: entrega al menos una vez (un fallo entre PUBLISH y COMMIT reenvía
+el lote; los consumidores deduplican por crum_id) y orden por cadena (la
+cabeza de cada cadena serializa sus commits, así que sus ids crecen en orden).
+"""
+import asyncio
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import structlog
+from redis.asyncio import Redis
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.ledger_state import TAMVOutboxEntity
+from .chain import GLOBAL_CHAIN, PendingCrum
+from .encoding import dumps
+from .profiling import incr
+
+logger = structlog.get_logger("tamv.outbox")
+
+ANCHOR_CHANNEL = "ledger:anchor_channel"
+# Clave del advisory lock de PostgreSQL: un solo relay activo conserva el orden
+RELAY_LOCK_KEY = 0x54414D56  # "TAMV"
+
+
+def anchor_event(pending: PendingCrum) -> Dict[str, Any]:
+    """Notificación rutinaria de anclaje; el relay las agrupa en CRUM_ANCHORED_BATCH."""
+    payload = pending.row.get("payload") or {}
+    return {
+        "status": "CRUM_ANCHORED",
+        "crum_id": pending.crum_id,
+        "type": payload.get("action"),
+        "sensory_temp": payload.get("sensory_temp", 0),
+        "integrity": pending.integrity_hash[:16],
+    }
+
+
+def batch_message(messages: List[str]) -> str:
+    """
+    Envuelve eventos ya serializados sin volver a parsearlos; el relay entrega
+    todo lo leído, así que `dropped` siempre es 0.
+    """
+    return (
+        '{"status":"CRUM_ANCHORED_BATCH","count":%d,"dropped":0,"crums":[%s]}'
+        % (len(messages), ",".join(messages))
+    )
+
+
+class LedgerOutbox:
+    """Lado escritor: el LedgerWriter lo invoca dentro de la transacción del lote."""
+
+    def __init__(self, channel: str = ANCHOR_CHANNEL):
+        self.channel = channel
+        # Señal local para que el relay del mismo proceso no espere al siguiente sondeo
+        self.committed = asyncio.Event()
+
+    async def persist(self, session: AsyncSession, pendings: List[PendingCrum]) -> None:
+        await session.execute(insert(TAMVOutboxEntity).values([
+            {
+                "chain_key": pending.row.get("chain_key", GLOBAL_CHAIN),
+                "channel": self.channel,
+                "message": dumps(anchor_event(pending)),
+            }
+            for pending in pendings
+        ]))
+
+    def notify(self) -> None:
+        """Llamar tras el COMMIT: despierta al relay."""
+        self.committed.set()
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        redis: Redis,
+        outbox: Optional[LedgerOutbox] = None,
+        batch_size: int = 500,
+        poll_interval_s: float = 0.25,
+        retry_backoff_s: float = 1.0,
+    ):
+        self.session_factory = session_factory
+        self.redis = redis
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval_s
+        self.retry_backoff = retry_backoff_s
+        self.delivered = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="tamv-outbox-relay")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Último drenaje: lo que quede lo entregará el próximo proceso
+        try:
+            while await self.drain_once():
+                pass
+        except Exception as e:
+            logger.warning("outbox_final_drain_failed", error=str(e))
+
+    async def drain_once(self) -> int:
+        """Entrega un lote en orden de id. Devuelve cuántos eventos publicó."""
+        async with self.session_factory() as session:
+            async with session.begin():
+                locked = await session.scalar(select(func.pg_try_advisory_xact_lock(RELAY_LOCK_KEY)))
+                if not locked:
+                    return 0  # Otro relay está drenando
+                stmt = (
+                    select(TAMVOutboxEntity.id, TAMVOutboxEntity.channel, TAMVOutboxEntity.message)
+                    .order_by(TAMVOutboxEntity.id)
+                    .limit(self.batch_size)
+                )
+                rows = (await session.execute(stmt)).all()
+                if not rows:
+                    return 0
+
+                # Un mensaje por canal con los eventos en orden de id; un solo round-trip
+                by_channel: Dict[str, List[str]] = defaultdict(list)
+                for row in rows:
+                    by_channel[row.channel].append(row.message)
+                pipe = self.redis.pipeline(transaction=False)
+                for channel, messages in by_channel.items():
+                    pipe.publish(channel, batch_message(messages))
+                await pipe.execute()
+
+                await session.execute(
+                    delete(TAMVOutboxEntity).where(TAMVOutboxEntity.id.in_([row.id for row in rows]))
+                )
+
+        self.delivered += len(rows)
+        incr("outbox_delivered", len(rows))
+        logger.debug("outbox_batch_relayed", size=len(rows), last_id=rows[-1].id)
+        return len(rows)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                delivered = await self.drain_once()
+            except Exception as e:
+                incr("outbox_relay_errors")
+                logger.error("outbox_relay_failed", error=str(e))
+                await asyncio.sleep(self.retry_backoff)
+                continue
+            if delivered >= self.batch_size:
+                continue  # Hay más pendiente: seguir sin esperar
+            await self._wait()
+
+    async def _wait(self) -> None:
+        if self.outbox is None:
+            await asyncio.sleep(self.poll_interval)
+            return
+        # Despertar por commit local o por sondeo (eventos de otros nodos)
+        try:
+            await asyncio.wait_for(self.outbox.committed.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self.outbox.committed.clear()
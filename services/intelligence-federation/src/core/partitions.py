@@ -0,0 +1,151 @@
+"""
+TAMV Ledger Partitions: Particionado mensual de tamv_crums_ledger por created_at.
+Crea las particiones por adelantado y aplica la retención guiada por expires_at
+una partición completa a la vez (DETACH + archivo o DROP), nunca con DELETEs
+fila a fila. La continuidad de cada cadena (global o shard) se protege exigiendo
+que el auditor de integridad haya verificado la partición antes de retirarla.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.ledger_state import TAMVVerificationCheckpointEntity
+from ..models.sovereign_event import TAMVCrumEntity
+
+logger = structlog.get_logger("tamv.partitions")
+
+LEDGER_TABLE = TAMVCrumEntity.__tablename__
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + (month.month - 1) + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{LEDGER_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+class LedgerPartitionManager:
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        months_ahead: int = 2,
+        default_retention: Optional[timedelta] = None,
+        archive: bool = True,
+    ):
+        self.session_factory = session_factory
+        self.months_ahead = months_ahead
+        # Retención para Crums sin expires_at (None = no caducan nunca)
+        self.default_retention = default_retention
+        # True: la partición retirada se conserva como tabla de archivo independiente
+        self.archive = archive
+
+    async def ensure_partitions(self, now: Optional[datetime] = None) -> List[str]:
+        """Crea la partición del mes actual y las `months_ahead` siguientes."""
+        current = _month_start(now or datetime.now(timezone.utc))
+        created = []
+        async with self.session_factory() as session:
+            for offset in range(self.months_ahead + 1):
+                lower = _add_months(current, offset)
+                upper = _add_months(current, offset + 1)
+                name = partition_name(lower)
+                await session.execute(text(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{LEDGER_TABLE}" '
+                    f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+                ))
+                created.append(name)
+            await session.commit()
+        return created
+
+    async def enforce_retention(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        Retira las particiones cuyo rango ya cerró y cuyos Crums han caducado todos.
+        Devuelve los nombres de las particiones retiradas.
+        """
+        now = now or datetime.now(timezone.utc)
+        retired = []
+        async with self.session_factory() as session:
+            checkpoints = await self._verified_heights(session)
+
+            for name, upper in await self._closed_partitions(session, now):
+                expired, max_heights = await self._partition_status(session, name, now)
+                if not expired:
+                    continue
+                # Continuidad: solo se retira lo que el auditor ya selló como íntegro, en cada cadena
+                unverified = {
+                    chain_key: height for chain_key, height in max_heights.items()
+                    if height is not None and height > checkpoints.get(chain_key, 0)
+                }
+                if unverified:
+                    logger.warning("partition_retention_blocked", partition=name, unverified=unverified)
+                    continue
+
+                await session.execute(text(f'ALTER TABLE "{LEDGER_TABLE}" DETACH PARTITION "{name}"'))
+                if self.archive:
+                    archive_name = name.replace(LEDGER_TABLE, "tamv_crums_archive", 1)
+                    await session.execute(text(f'ALTER TABLE "{name}" RENAME TO "{archive_name}"'))
+                else:
+                    await session.execute(text(f'DROP TABLE "{name}"'))
+                await session.commit()
+                retired.append(name)
+                logger.info("partition_retired", partition=name, archived=self.archive, max_heights=max_heights)
+        return retired
+
+    async def run(self, interval_s: float = 3600.0) -> None:
+        while True:
+            try:
+                await self.ensure_partitions()
+                await self.enforce_retention()
+            except Exception as e:
+                logger.error("partition_maintenance_failed", error=str(e))
+            await asyncio.sleep(interval_s)
+
+    async def _closed_partitions(self, session: AsyncSession, now: datetime) -> List[Tuple[str, datetime]]:
+        """Particiones del Ledger cuyo límite superior ya quedó en el pasado."""
+        stmt = text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent ORDER BY c.relname"
+        )
+        names = (await session.execute(stmt, {"parent": LEDGER_TABLE})).scalars().all()
+        closed = []
+        for name in names:
+            try:
+                year, month = name.rsplit("_p", 1)[1].split("_")
+                upper = _add_months(datetime(int(year), int(month), 1, tzinfo=timezone.utc), 1)
+            except (IndexError, ValueError):
+                # Partición adjunta a mano, fuera del esquema _pYYYY_MM: no se gestiona
+                continue
+            if upper <= now:
+                closed.append((name, upper))
+        return closed
+
+    async def _verified_heights(self, session: AsyncSession) -> Dict[str, int]:
+        stmt = select(TAMVVerificationCheckpointEntity.chain_key, TAMVVerificationCheckpointEntity.verified_height)
+        return {row.chain_key: row.verified_height for row in (await session.execute(stmt)).all()}
+
+    async def _partition_status(self, session: AsyncSession, name: str, now: datetime) -> Tuple[bool, Dict[str, Optional[int]]]:
+        """(todos los Crums caducados, altura máxima por cadena) de una partición."""
+        if self.default_retention is None:
+            expiry = "COALESCE(expires_at, 'infinity'::timestamptz)"
+            params = {"now": now}
+        else:
+            expiry = "COALESCE(expires_at, created_at + :retention)"
+            params = {"now": now, "retention": self.default_retention}
+        stmt = text(
+            f'SELECT chain_key, bool_and({expiry} <= :now) AS expired, '
+            f'max(chain_height) AS max_height FROM "{name}" GROUP BY chain_key'
+        )
+        rows = (await session.execute(stmt, params)).all()
+        # Partición vacía: caducada y sin alturas que proteger
+        return all(row.expired for row in rows), {row.chain_key: row.max_height for row in rows}
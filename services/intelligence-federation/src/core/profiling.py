@@ -0,0 +1,123 @@
+"""
+TAMV Stage Timing: Cronometraje por etapa del camino de ingesta.
+validation -> signature -> anubis -> lease -> chain_verify/chain_read -> hashing -> commit -> publish -> reputation.
+Sin registradores activos, stage() devuelve un contexto nulo compartido:
+el costo en producción es una comprobación de lista vacía.
+Incluye un perfilador por muestreo opcional, activable en caliente.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from typing import Callable, List, Optional
+
+StageRecorder = Callable[[str, float], None]  # (etapa, segundos)
+EventRecorder = Callable[[str, int], None]  # (evento, incremento)
+
+STAGES = ("validation", "signature", "anubis", "lease", "chain_verify", "chain_read", "hashing", "commit", "publish", "reputation")
+
+_recorders: List[StageRecorder] = []
+_event_recorders: List[EventRecorder] = []
+_NULL = nullcontext()
+
+
+def add_stage_recorder(recorder: StageRecorder) -> None:
+    if recorder not in _recorders:
+        _recorders.append(recorder)
+
+
+def remove_stage_recorder(recorder: StageRecorder) -> None:
+    if recorder in _recorders:
+        _recorders.remove(recorder)
+
+
+def add_event_recorder(recorder: EventRecorder) -> None:
+    if recorder not in _event_recorders:
+        _event_recorders.append(recorder)
+
+
+def remove_event_recorder(recorder: EventRecorder) -> None:
+    if recorder in _event_recorders:
+        _event_recorders.remove(recorder)
+
+
+class _StageTimer:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "_StageTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def stage(name: str):
+    """Contexto que mide la etapa `name` (también válido alrededor de awaits)."""
+    return _StageTimer(name) if _recorders else _NULL
+
+
+def record(name: str, seconds: float) -> None:
+    """Registra una duración medida a mano (p. ej. el total de una petición)."""
+    for recorder in _recorders:
+        recorder(name, seconds)
+
+
+def incr(event: str, n: int = 1) -> None:
+    """Contador de eventos (anclajes, rechazos de ANUBIS, fallos)."""
+    for recorder in _event_recorders:
+        recorder(event, n)
+
+
+class SamplingProfiler:
+    """
+    Perfilador por muestreo de pila: un hilo lee el frame activo del hilo objetivo
+    (el del event loop) cada `interval_ms` y acumula pilas plegadas, listas para
+    un flamegraph. Sin él no hay costo; con él, un acceso a sys._current_frames por muestra.
+    """
+
+    def __init__(self, interval_ms: float = 5.0, max_depth: int = 64, target_thread: Optional[int] = None):
+        self.interval = interval_ms / 1000.0
+        self.max_depth = max_depth
+        self.target = target_thread or threading.main_thread().ident
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="tamv-sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def folded(self) -> str:
+        """Formato 'marco;marco;marco N' (una pila por línea, de la raíz a la hoja)."""
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
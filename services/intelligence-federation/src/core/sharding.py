@@ -0,0 +1,178 @@
+"""
+TAMV Chain Sharding: Cadenas independientes por creador o por bucket de hash.
+Cada shard tiene su propia ChainHead (fila en tamv_chain_heads, génesis derivado)
+y su propio secuenciador, de modo que workers y nodos anclan en paralelo y solo
+compiten por la cabeza de su shard. Un Crum SHARD_ANCHOR periódico en la cadena
+global compromete todas las cabezas de shard: alterar cualquier shard por debajo
+de una altura anclada rompe el hash del ancla.
+"""
+import asyncio
+import hashlib
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.ledger_state import TAMVChainHeadEntity
+from .chain import GLOBAL_CHAIN, PendingCrum
+from .chain_head import ChainHead
+from .chain_lease import ChainLease
+from .encoding import encode_payload
+from .ledger_stats import LedgerStats
+from .ledger_writer import LedgerWriter
+from .outbox import LedgerOutbox
+from .telemetry import EcgRollups
+
+logger = structlog.get_logger("tamv.sharding")
+
+ANCHOR_ACTION = "SHARD_ANCHOR"
+ANCHOR_DID = "did:tamv:ledger"
+
+
+class ShardRouter:
+    """
+    mode="creator": una cadena por creator_did.
+    mode="bucket": `buckets` cadenas fijas; el creador elige bucket por hash.
+    """
+
+    def __init__(self, mode: str = "bucket", buckets: int = 16):
+        if mode not in ("creator", "bucket"):
+            raise ValueError(f"Modo de sharding desconocido: {mode}")
+        self.mode = mode
+        self.buckets = buckets
+
+    def key_for(self, creator_did: Optional[str]) -> str:
+        digest = hashlib.sha256((creator_did or "").encode("utf-8")).hexdigest()
+        if self.mode == "creator":
+            # chain_key es String(64): el DID completo no cabe, su hash sí
+            return f"creator-{digest[:32]}"
+        return f"bucket-{int(digest[:16], 16) % self.buckets:04d}"
+
+
+class ShardedLedgerWriter(LedgerWriter):
+    """Writer con una ChainHead por shard; mismo contrato que LedgerWriter."""
+
+    def __init__(
+        self,
+        router: ShardRouter,
+        max_resync: int = 3,
+        stats: Optional[LedgerStats] = None,
+        lease_factory: Optional[Callable[[str], ChainLease]] = None,
+        outbox: Optional[LedgerOutbox] = None,
+        rollups: Optional[EcgRollups] = None,
+    ):
+        super().__init__(max_resync=max_resync, stats=stats, outbox=outbox, rollups=rollups)
+        self.router = router
+        # Multi-nodo: un lease por shard, así cada nodo retiene solo los shards que escribe
+        self.lease_factory = lease_factory
+        self._writers: Dict[str, LedgerWriter] = {}
+
+    def shard_key(self, pending: PendingCrum) -> Optional[str]:
+        return self.router.key_for(pending.row.get("creator_did"))
+
+    def writer_for(self, chain_key: str) -> LedgerWriter:
+        writer = self._writers.get(chain_key)
+        if writer is None:
+            writer = self._writers[chain_key] = LedgerWriter(
+                chain_head=ChainHead(chain_key),
+                max_resync=self.max_resync,
+                stats=self.stats,
+                lease=self.lease_factory(chain_key) if self.lease_factory else None,
+                outbox=self.outbox,
+                rollups=self.rollups,
+            )
+        return writer
+
+    @property
+    def heads(self) -> Dict[str, ChainHead]:
+        return {key: writer.chain_head for key, writer in self._writers.items()}
+
+    async def append(self, session: AsyncSession, pendings: List[PendingCrum]) -> str:
+        """
+        Ancla el lote shard por shard, en orden de llegada dentro de cada shard.
+        Cada shard confirma su propia transacción: un lote multi-shard no es atómico
+        entre shards (el GroupCommitter ya los separa antes de llegar aquí).
+        """
+        if not pendings:
+            raise ValueError("Lote vacío: nada que anclar.")
+        groups: Dict[str, List[PendingCrum]] = {}
+        for pending in pendings:
+            groups.setdefault(self.shard_key(pending), []).append(pending)
+        head = None
+        for chain_key, group in groups.items():
+            head = await self.writer_for(chain_key).append(session, group)
+        return head
+
+
+class ShardAnchorer:
+    """Tarea de fondo: ancla periódicamente las cabezas de todos los shards en la cadena global."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        anchor_writer: Optional[LedgerWriter] = None,
+        anchor_chain: str = GLOBAL_CHAIN,
+    ):
+        self.session_factory = session_factory
+        self.anchor_chain = anchor_chain
+        self.anchor_writer = anchor_writer or LedgerWriter(chain_head=ChainHead(anchor_chain))
+        self._last_anchored: Dict[str, Tuple[str, int]] = {}
+
+    async def anchor_once(self) -> Optional[str]:
+        """Emite un SHARD_ANCHOR si alguna cabeza de shard avanzó. Devuelve su crum_id."""
+        async with self.session_factory() as session:
+            stmt = select(
+                TAMVChainHeadEntity.chain_key, TAMVChainHeadEntity.head_hash, TAMVChainHeadEntity.height
+            ).where(TAMVChainHeadEntity.chain_key != self.anchor_chain)
+            heads = {row.chain_key: (row.head_hash, row.height) for row in (await session.execute(stmt)).all()}
+            if not heads or heads == self._last_anchored:
+                return None
+
+            pending = _anchor_crum(heads)
+            try:
+                await self.anchor_writer.append(session, [pending])
+            except Exception:
+                await session.rollback()
+                raise
+        self._last_anchored = heads
+        logger.info("shard_heads_anchored", shards=len(heads), crum_id=pending.crum_id, head=pending.integrity_hash[:16])
+        return pending.crum_id
+
+    async def run(self, interval_s: float = 60.0) -> None:
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                await self.anchor_once()
+            except Exception as e:
+                logger.error("shard_anchor_failed", error=str(e))
+
+
+def _anchor_crum(heads: Dict[str, Tuple[str, int]]) -> PendingCrum:
+    crum_uuid = uuid.uuid4()
+    crum_id = str(crum_uuid)
+    timestamp = datetime.now(timezone.utc)
+    payload = encode_payload({
+        "action": ANCHOR_ACTION,
+        "shards": {key: {"head": head_hash, "height": height} for key, (head_hash, height) in sorted(heads.items())},
+    })
+    salt = f"SHARD-ANCHOR-{uuid.uuid4()}"
+    row = {
+        "id": crum_uuid,
+        "canonical_id": f"TAMV-{timestamp.strftime('%Y%m%d')}-{crum_id[:8]}",
+        "action_type": ANCHOR_ACTION,
+        "payload": payload,
+        "creator_did": ANCHOR_DID,
+        # Crum del sistema: sin llave de creador
+        "creator_pubkey": None,
+        "creator_signature": hashlib.sha3_512(payload.encoded.encode("utf-8")).hexdigest(),
+        "creator_fingerprint": None,
+        "origin": "system",
+        "risk_level": "LOW",
+        "is_verified_by_root": False,
+        "session_id": "SHARD-ANCHOR",
+        "created_at": timestamp,
+    }
+    return PendingCrum(crum_id=crum_id, timestamp=timestamp, payload_json=payload.encoded, salt=salt, row=row)
@@ -0,0 +1,482 @@
+"""
+TAMV Ledger Spool: Registro local de escritura anticipada (WAL) para la ingesta.
+Los Crums se encadenan y se escriben primero en segmentos mapeados en memoria;
+el llamador recibe su crum_id en cuanto el registro es durable en disco local,
+y una tarea de fondo los drena en orden hacia tamv_crums_ledger.
+Un registro que la base rechaza por sus datos (DataError/IntegrityError) no
+bloquea a los siguientes: el lote se bisecta, el culpable pasa al segmento de
+cartas muertas (dead-letter.seg, mismo formato) y el cursor sigue avanzando.
+
+Formato de registro: [magic u32][longitud u32][crc32 u32][JSON utf-8].
+Un encabezado en cero marca el final del segmento.
+
+Herramienta de inspección/reproducción:
+    python -m src.core.spool inspect <directorio> [--dead-letters]
+    python -m src.core.spool replay <directorio> --database-url postgresql+asyncpg://...
+"""
+import asyncio
+import base64
+import json
+import mmap
+import os
+import struct
+import uuid
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Deque, Iterator, List, Optional, Set, Tuple
+
+import structlog
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.sovereign_event import TAMVCrumEntity
+from .chain import PendingCrum, link_chain
+from .encoding import EncodedJSON, dumps
+from .ledger_writer import ROW_ERRORS, LedgerWriter
+from .profiling import incr, stage
+
+logger = structlog.get_logger("tamv.spool")
+
+_HEADER = struct.Struct("<III")
+_MAGIC = 0x5441_4D56  # "TAMV"
+_CURSOR_FILE = "cursor"
+_DEAD_LETTER_FILE = "dead-letter.seg"
+_RECOVERY_PROBE = 1000  # ids por consulta al deduplicar la recuperación
+
+
+def _segment_name(seq: int) -> str:
+    return f"spool-{seq:012d}.seg"
+
+
+def encode_record(pending: PendingCrum) -> bytes:
+    """Serializa un Crum ya encadenado con todo lo necesario para re-insertarlo."""
+    row = {
+        key: value for key, value in pending.row.items()
+        if key not in ("id", "payload", "created_at", "burst_blob")
+    }
+    record = {
+        "crum_id": pending.crum_id,
+        "timestamp": pending.timestamp.isoformat(),
+        "payload_json": pending.payload_json,
+        "salt": pending.salt,
+        "blob": base64.b64encode(pending.blob).decode("ascii") if pending.blob is not None else None,
+        "previous_hash": pending.previous_hash,
+        "integrity_hash": pending.integrity_hash,
+        "row": row,
+    }
+    data = dumps(record).encode("utf-8")
+    return _HEADER.pack(_MAGIC, len(data), zlib.crc32(data)) + data
+
+
+def decode_record(data: bytes) -> PendingCrum:
+    record = json.loads(data)
+    timestamp = datetime.fromisoformat(record["timestamp"])
+    blob = base64.b64decode(record["blob"]) if record["blob"] is not None else None
+    row = dict(record["row"])
+    row.update({
+        "id": uuid.UUID(record["crum_id"]),
+        "payload": EncodedJSON.from_encoded(record["payload_json"]),
+        "created_at": timestamp,
+        "burst_blob": blob,
+    })
+    return PendingCrum(
+        crum_id=record["crum_id"],
+        timestamp=timestamp,
+        payload_json=record["payload_json"],
+        salt=record["salt"],
+        row=row,
+        blob=blob,
+        previous_hash=record["previous_hash"],
+        integrity_hash=record["integrity_hash"],
+    )
+
+
+def scan_segment(path: str, offset: int = 0) -> Iterator[Tuple[int, PendingCrum]]:
+    """Recorre registros válidos desde `offset`; se detiene en el primer hueco o registro roto."""
+    with open(path, "rb") as fh:
+        buffer = fh.read()
+    while offset + _HEADER.size <= len(buffer):
+        magic, length, crc = _HEADER.unpack_from(buffer, offset)
+        start, end = offset + _HEADER.size, offset + _HEADER.size + length
+        if magic != _MAGIC or end > len(buffer):
+            return
+        data = buffer[start:end]
+        if zlib.crc32(data) != crc:
+            return  # Escritura rasgada por un crash: fin del log
+        yield end, decode_record(data)
+        offset = end
+
+
+@dataclass
+class _Spooled:
+    pending: PendingCrum
+    segment: int
+    end_offset: int
+
+
+class LedgerSpool:
+    def __init__(
+        self,
+        directory: str,
+        writer: LedgerWriter,
+        session_factory: Callable[[], AsyncSession],
+        segment_size: int = 64 * 1024 * 1024,
+        max_batch: int = 512,
+        max_pending: int = 100_000,
+        fsync: bool = True,
+        retry_backoff_s: float = 0.5,
+    ):
+        if writer.chain_head is None:
+            raise ValueError("El spool requiere un LedgerWriter con ChainHead (escritor único).")
+        self.directory = directory
+        self.writer = writer
+        self.session_factory = session_factory
+        self.segment_size = segment_size
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.retry_backoff = retry_backoff_s
+        # Cabeza del spool: puede ir por delante de la cabeza persistida en la base
+        self.head_hash: Optional[str] = None
+        self.head_height = 0
+        self._pending: Deque[_Spooled] = deque()
+        self._room = asyncio.Semaphore(max_pending)
+        self._sequencer = asyncio.Lock()
+        self._sync_lock = asyncio.Lock()
+        self._written_gen = 0
+        self._synced_gen = 0
+        self._wakeup = asyncio.Event()
+        self._segment_seq = 0
+        self._offset = 0
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ====== Ciclo de vida ======
+
+    async def open(self) -> int:
+        """Recuperación tras crash: re-encola lo no drenado y fija la cabeza del spool."""
+        os.makedirs(self.directory, exist_ok=True)
+        head = self.writer.chain_head
+        async with self.session_factory() as session:
+            await head.load(session)
+        self.head_hash, self.head_height = head.hash, head.height
+
+        cursor_seq, cursor_offset = self._read_cursor()
+        recovered: List[_Spooled] = []
+        last_seq, last_offset = cursor_seq, cursor_offset
+        for seq in self._segment_seqs():
+            if seq < cursor_seq:
+                os.remove(self._segment_path(seq))
+                continue
+            offset = cursor_offset if seq == cursor_seq else 0
+            last_seq, last_offset = seq, offset
+            for end, pending in scan_segment(self._segment_path(seq), offset):
+                recovered.append(_Spooled(pending, seq, end))
+                last_offset = end
+
+        # Un crash entre el COMMIT y el cursor deja registros ya persistidos. Se
+        # descartan por crum_id: si la base re-enlazó el lote, su hash ya no es el del spool
+        if recovered:
+            persisted = await self._persisted_ids([spooled.pending for spooled in recovered])
+            if persisted:
+                recovered = [spooled for spooled in recovered if spooled.pending.crum_id not in persisted]
+
+        for spooled in recovered:
+            await self._room.acquire()
+            self._pending.append(spooled)
+        if recovered:
+            last = recovered[-1].pending
+            self.head_hash, self.head_height = last.integrity_hash, last.row["chain_height"]
+
+        self._open_segment(last_seq, last_offset)
+        self._task = asyncio.create_task(self._drain_loop(), name="tamv-spool-drain")
+        self._wakeup.set()
+        logger.info("spool_opened", directory=self.directory, recovered=len(recovered), head=self.head_hash[:16])
+        return len(recovered)
+
+    async def close(self) -> None:
+        """Drenado ordenado antes de apagar; lo que no se drene queda en disco para el próximo arranque."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self._drain_once()
+        except Exception as e:
+            logger.warning("spool_final_drain_failed", pending=len(self._pending), error=str(e))
+        finally:
+            async with self._sync_lock:
+                self._close_segment()
+
+    # ====== Escritura ======
+
+    async def append(self, pending: PendingCrum) -> PendingCrum:
+        """Encadena y escribe el Crum en el spool; retorna cuando es durable en disco local."""
+        await self._room.acquire()
+        queued = False
+        try:
+            async with self._sequencer:
+                # La cabeza del spool solo avanza si el registro cabe y llega al segmento
+                head_hash = link_chain(self.head_hash, [pending], start_height=self.head_height)
+                with stage("commit"):
+                    record = encode_record(pending)
+                if len(record) + _HEADER.size > self.segment_size:
+                    raise ValueError(f"Registro de {len(record)} bytes excede el tamaño de segmento del spool.")
+                if self._offset + len(record) + _HEADER.size > self.segment_size:
+                    await self._roll_segment()
+                self._mmap[self._offset:self._offset + len(record)] = record
+                self._offset += len(record)
+                self.head_hash, self.head_height = head_hash, self.head_height + 1
+                self._written_gen += 1
+                generation = self._written_gen
+                self._pending.append(_Spooled(pending, self._segment_seq, self._offset))
+                queued = True
+        finally:
+            if not queued:
+                self._room.release()
+        with stage("commit"):
+            await self._sync(generation)
+        self._wakeup.set()
+        return pending
+
+    async def _sync(self, generation: int) -> None:
+        """msync agrupado: un flush cubre a todos los registros escritos antes de él."""
+        if not self.fsync:
+            return
+        async with self._sync_lock:
+            if self._synced_gen >= generation:
+                return
+            target = self._written_gen
+            await asyncio.to_thread(self._mmap.flush)
+            self._synced_gen = target
+
+    # ====== Drenado ======
+
+    async def _drain_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                try:
+                    await self._drain_once()
+                except Exception as e:
+                    logger.error("spool_drain_failed", pending=len(self._pending), error=str(e))
+                    await asyncio.sleep(self.retry_backoff)
+
+    async def _drain_once(self) -> None:
+        if not self._pending:
+            return
+        batch = [self._pending[i] for i in range(min(self.max_batch, len(self._pending)))]
+        await self._drain_batch(batch)
+        last = batch[-1]
+        # Si la base re-enlazó el lote (otra réplica movió la cadena, o se apartó un
+        # registro), el spool sigue desde la cabeza persistida
+        if not self._pending and last.pending.integrity_hash != self.head_hash:
+            async with self._sequencer:
+                if not self._pending:
+                    self.head_hash, self.head_height = self.writer.chain_head.hash, self.writer.chain_head.height
+        for seq in self._segment_seqs():
+            if seq < last.segment:
+                os.remove(self._segment_path(seq))
+
+    async def _drain_batch(self, batch: List[_Spooled]) -> None:
+        """
+        Persiste un prefijo de la cola. Un error de fila bisecta el lote en orden
+        y aparta solo al culpable; cualquier otro error se propaga y el drenado
+        reintenta desde lo aún no confirmado.
+        """
+        try:
+            async with self.session_factory() as session:
+                try:
+                    await self.writer.append(session, [spooled.pending for spooled in batch])
+                except Exception:
+                    await session.rollback()
+                    raise
+        except ROW_ERRORS as e:
+            if len(batch) == 1:
+                self._dead_letter(batch[0], e)
+            else:
+                logger.warning("spool_batch_bisected", size=len(batch), error=str(e))
+                mid = len(batch) // 2
+                await self._drain_batch(batch[:mid])
+                await self._drain_batch(batch[mid:])
+            return
+        self._consume(batch)
+
+    def _consume(self, batch: List[_Spooled]) -> None:
+        """Saca de la cola un prefijo ya resuelto y avanza el cursor tras él."""
+        for _ in batch:
+            self._pending.popleft()
+            self._room.release()
+        last = batch[-1]
+        self._write_cursor(last.segment, last.end_offset)
+
+    def _dead_letter(self, spooled: _Spooled, error: Exception) -> None:
+        """Aparta un registro que la base rechaza por sus datos; queda para inspección manual."""
+        path = os.path.join(self.directory, _DEAD_LETTER_FILE)
+        with open(path, "ab") as fh:
+            fh.write(encode_record(spooled.pending))
+            fh.flush()
+            os.fsync(fh.fileno())
+        incr("spool_dead_letters")
+        logger.error(
+            "spool_record_dead_lettered",
+            crum_id=spooled.pending.crum_id,
+            segment=spooled.segment,
+            error=str(error),
+        )
+        self._consume([spooled])
+
+    async def _persisted_ids(self, pendings: List[PendingCrum]) -> Set[str]:
+        """crum_ids del spool que ya existen en tamv_crums_ledger."""
+        found: Set[str] = set()
+        since = min(pending.timestamp for pending in pendings)
+        async with self.session_factory() as session:
+            for start in range(0, len(pendings), _RECOVERY_PROBE):
+                ids = [uuid.UUID(pending.crum_id) for pending in pendings[start:start + _RECOVERY_PROBE]]
+                stmt = select(TAMVCrumEntity.id).where(
+                    TAMVCrumEntity.id.in_(ids),
+                    # Poda de particiones: ningún Crum del spool es anterior a su propio timestamp
+                    TAMVCrumEntity.created_at >= since,
+                )
+                found.update(str(crum_id) for crum_id in (await session.execute(stmt)).scalars())
+        return found
+
+    @property
+    def backlog(self) -> int:
+        return len(self._pending)
+
+    # ====== Segmentos y cursor ======
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, _segment_name(seq))
+
+    def _segment_seqs(self) -> List[int]:
+        seqs = []
+        for name in os.listdir(self.directory):
+            if name.startswith("spool-") and name.endswith(".seg"):
+                seqs.append(int(name[len("spool-"):-len(".seg")]))
+        return sorted(seqs)
+
+    def _open_segment(self, seq: int, offset: int) -> None:
+        path = self._segment_path(seq)
+        self._file = open(path, "a+b")
+        if os.path.getsize(path) < self.segment_size:
+            self._file.truncate(self.segment_size)
+        self._mmap = mmap.mmap(self._file.fileno(), self.segment_size)
+        # Todo lo posterior al último registro válido se pone en cero (restos de un crash)
+        self._mmap[offset:offset + _HEADER.size] = bytes(_HEADER.size)
+        self._segment_seq, self._offset = seq, offset
+
+    def _close_segment(self) -> None:
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+
+    async def _roll_segment(self) -> None:
+        # Un msync en curso usa el mmap actual: no cerrarlo bajo sus pies
+        async with self._sync_lock:
+            self._close_segment()  # flush: lo escrito hasta aquí ya es durable
+            self._synced_gen = self._written_gen
+            self._open_segment(self._segment_seq + 1, 0)
+
+    def _read_cursor(self) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.directory, _CURSOR_FILE), "r") as fh:
+                seq, offset = fh.read().split()
+                return int(seq), int(offset)
+        except (FileNotFoundError, ValueError):
+            seqs = self._segment_seqs()
+            return (seqs[0] if seqs else 0), 0
+
+    def _write_cursor(self, seq: int, offset: int) -> None:
+        path = os.path.join(self.directory, _CURSOR_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as fh:
+            fh.write(f"{seq} {offset}")
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+
+# ====== Herramienta de inspección / reproducción ======
+
+def iter_spool(directory: str) -> Iterator[Tuple[int, int, PendingCrum]]:
+    """(segmento, offset final, Crum) de todos los registros válidos desde el cursor."""
+    probe = LedgerSpool.__new__(LedgerSpool)
+    probe.directory = directory
+    cursor_seq, cursor_offset = probe._read_cursor()
+    for seq in probe._segment_seqs():
+        if seq < cursor_seq:
+            continue
+        offset = cursor_offset if seq == cursor_seq else 0
+        for end, pending in scan_segment(probe._segment_path(seq), offset):
+            yield seq, end, pending
+
+
+def iter_dead_letters(directory: str) -> Iterator[Tuple[int, int, PendingCrum]]:
+    """Registros apartados por el drenado, con el mismo formato que iter_spool (segmento -1)."""
+    path = os.path.join(directory, _DEAD_LETTER_FILE)
+    if not os.path.exists(path):
+        return
+    for end, pending in scan_segment(path):
+        yield -1, end, pending
+
+
+async def _replay(directory: str, database_url: str, segment_size: int) -> int:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from .chain_head import ChainHead
+    from .encoding import json_serializer
+
+    engine = create_async_engine(database_url, json_serializer=json_serializer)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    spool = LedgerSpool(directory, LedgerWriter(chain_head=ChainHead()), session_factory, segment_size=segment_size)
+    recovered = await spool.open()
+    while spool.backlog:
+        await asyncio.sleep(0.1)
+    await spool.close()
+    await engine.dispose()
+    return recovered
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspección y reproducción del spool local del Ledger TAMV")
+    sub = parser.add_subparsers(dest="command", required=True)
+    inspect_cmd = sub.add_parser("inspect", help="Lista los Crums pendientes de drenar")
+    inspect_cmd.add_argument("directory")
+    inspect_cmd.add_argument("--dead-letters", action="store_true", help="Lista los registros apartados por la base")
+    replay_cmd = sub.add_parser("replay", help="Drena el spool hacia tamv_crums_ledger y termina")
+    replay_cmd.add_argument("directory")
+    replay_cmd.add_argument("--database-url", required=True)
+    replay_cmd.add_argument("--segment-size", type=int, default=64 * 1024 * 1024)
+    args = parser.parse_args(argv)
+
+    if args.command == "inspect":
+        count = 0
+        records = iter_dead_letters(args.directory) if args.dead_letters else iter_spool(args.directory)
+        for seq, end, pending in records:
+            count += 1
+            print(json.dumps({
+                "segment": seq,
+                "offset": end,
+                "crum_id": pending.crum_id,
+                "chain_height": pending.row.get("chain_height"),
+                "action": pending.row.get("action_type"),
+                "integrity_hash": pending.integrity_hash,
+            }))
+        print(json.dumps({"dead_letters" if args.dead_letters else "pending": count}))
+        return 0
+
+    recovered = asyncio.run(_replay(args.directory, args.database_url, args.segment_size))
+    print(json.dumps({"replayed": recovered}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
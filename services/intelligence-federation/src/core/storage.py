@@ -0,0 +1,298 @@
+"""
+TAMV Ledger Storage: Backends intercambiables para el Ledger encadenado.
+Contrato mínimo (append, cabeza, lectura por rango de alturas y conteo) con tres
+implementaciones: PostgreSQL (camino de producción vía LedgerWriter), memoria
+y SQLite (sqlite3 de la stdlib en hilos), para medir y probar la ingesta en
+una sola máquina sin servicios externos.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.sovereign_event import TAMVCrumEntity
+from .chain import GENESIS_HASH, PendingCrum, link_chain
+from .encoding import EncodedJSON, dumps, payload_text
+from .ledger_writer import ROW_ERRORS, LedgerWriter
+from .profiling import stage
+
+logger = structlog.get_logger("tamv.storage")
+
+Head = Tuple[str, int]  # (hash de cabeza, altura)
+
+
+class LedgerStorage(ABC):
+    """Contrato de almacenamiento del Ledger; las filas son dicts con las claves de PendingCrum.row."""
+
+    # Errores de append causados por los datos de una fila: el GroupCommitter bisecta ante ellos
+    ROW_ERRORS: Tuple[type, ...] = ()
+
+    @abstractmethod
+    async def append(self, pendings: List[PendingCrum]) -> str:
+        """Encadena y persiste un lote ordenado. Devuelve el nuevo hash de cabeza."""
+
+    @abstractmethod
+    async def head(self) -> Head:
+        """Hash y altura del último Crum (génesis y 0 si está vacío)."""
+
+    @abstractmethod
+    def scan(self, start_height: int = 1, end_height: Optional[int] = None, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """Recorre las filas por chain_height ascendente dentro de [start_height, end_height]."""
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Número de Crums persistidos."""
+
+    async def verify_tail(self) -> bool:
+        """Validación de coherencia retrospectiva: el último eslabón apunta al penúltimo."""
+        _, height = await self.head()
+        if height < 2:
+            return True
+        previous, current = [row async for row in self.scan(height - 1, height)]
+        return current["parent_hash"] == previous["integrity_hash"]
+
+    async def close(self) -> None:
+        pass
+
+
+# ====== PostgreSQL ======
+
+class PostgresLedgerStorage(LedgerStorage):
+    """Camino de producción: delega la escritura en LedgerWriter (ChainHead + CAS)."""
+
+    ROW_ERRORS = ROW_ERRORS
+
+    _COLUMNS = (
+        TAMVCrumEntity.id,
+        TAMVCrumEntity.canonical_id,
+        TAMVCrumEntity.chain_height,
+        TAMVCrumEntity.action_type,
+        TAMVCrumEntity.creator_did,
+        TAMVCrumEntity.risk_level,
+        TAMVCrumEntity.integrity_hash,
+        TAMVCrumEntity.parent_hash,
+        TAMVCrumEntity.integrity_salt,
+        TAMVCrumEntity.payload,
+        TAMVCrumEntity.burst_blob,
+        TAMVCrumEntity.created_at,
+    )
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], writer: Optional[LedgerWriter] = None):
+        self.session_factory = session_factory
+        self.writer = writer or LedgerWriter()
+
+    async def append(self, pendings: List[PendingCrum]) -> str:
+        async with self.session_factory() as session:
+            try:
+                return await self.writer.append(session, pendings)
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def head(self) -> Head:
+        async with self.session_factory() as session:
+            chain_head = self.writer.chain_head
+            if chain_head is not None:
+                if not chain_head.loaded:
+                    await chain_head.load(session)
+                return chain_head.hash, chain_head.height
+            last = await self.writer.fetch_last_crum(session)
+            if last is None:
+                return self.writer.genesis_hash, 0
+            return last.integrity_hash, last.chain_height or 0
+
+    async def scan(self, start_height: int = 1, end_height: Optional[int] = None, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        cursor = start_height - 1
+        async with self.session_factory() as session:
+            while True:
+                stmt = select(*self._COLUMNS).where(TAMVCrumEntity.chain_height > cursor)
+                if end_height is not None:
+                    stmt = stmt.where(TAMVCrumEntity.chain_height <= end_height)
+                rows = (await session.execute(stmt.order_by(TAMVCrumEntity.chain_height).limit(batch_size))).all()
+                for row in rows:
+                    yield dict(row._mapping)
+                if len(rows) < batch_size:
+                    return
+                cursor = rows[-1].chain_height
+
+    async def count(self) -> int:
+        async with self.session_factory() as session:
+            return (await session.execute(select(func.count(TAMVCrumEntity.id)))).scalar() or 0
+
+
+# ====== Memoria ======
+
+class MemoryLedgerStorage(LedgerStorage):
+    """Ledger en proceso: sin E/S, para medir el costo puro de la ingesta."""
+
+    def __init__(self, genesis_hash: str = GENESIS_HASH):
+        self.genesis_hash = genesis_hash
+        self._rows: List[Dict[str, Any]] = []
+        self._head = genesis_hash
+        self._lock = asyncio.Lock()
+
+    async def append(self, pendings: List[PendingCrum]) -> str:
+        if not pendings:
+            raise ValueError("Lote vacío: nada que anclar.")
+        async with self._lock:
+            self._head = link_chain(self._head, pendings, start_height=len(self._rows))
+            with stage("commit"):
+                self._rows.extend(dict(p.row) for p in pendings)
+            return self._head
+
+    async def head(self) -> Head:
+        return self._head, len(self._rows)
+
+    async def scan(self, start_height: int = 1, end_height: Optional[int] = None, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        end = len(self._rows) if end_height is None else min(end_height, len(self._rows))
+        for index in range(max(start_height, 1) - 1, end):
+            yield dict(self._rows[index])
+
+    async def count(self) -> int:
+        return len(self._rows)
+
+
+# ====== SQLite ======
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tamv_crums_ledger (
+    chain_height   INTEGER PRIMARY KEY,
+    id             TEXT NOT NULL UNIQUE,
+    canonical_id   TEXT NOT NULL,
+    action_type    TEXT NOT NULL,
+    creator_did    TEXT,
+    risk_level     TEXT NOT NULL,
+    integrity_hash TEXT NOT NULL,
+    parent_hash    TEXT,
+    integrity_salt TEXT,
+    payload        TEXT NOT NULL,
+    burst_blob     BLOB,
+    created_at     TEXT NOT NULL,
+    attributes     TEXT NOT NULL
+)
+"""
+
+# Columnas propias de la tabla SQLite; el resto de la fila viaja en `attributes` (JSON)
+_SQLITE_COLUMNS = (
+    "chain_height", "id", "canonical_id", "action_type", "creator_did", "risk_level",
+    "integrity_hash", "parent_hash", "integrity_salt", "payload", "burst_blob", "created_at",
+)
+
+
+class SQLiteLedgerStorage(LedgerStorage):
+    """
+    Ledger en un archivo SQLite (o ":memory:"). Las llamadas bloqueantes de sqlite3
+    corren en hilos; un lote = un executemany + un COMMIT.
+    """
+
+    ROW_ERRORS = (sqlite3.IntegrityError, sqlite3.DataError)
+
+    def __init__(self, path: str = ":memory:", genesis_hash: str = GENESIS_HASH, synchronous: str = "NORMAL"):
+        self.path = path
+        self.genesis_hash = genesis_hash
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.execute(_SQLITE_SCHEMA)
+        # sqlite3 no es seguro entre hilos concurrentes sobre una misma conexión
+        self._db_lock = threading.Lock()
+        self._sequencer = asyncio.Lock()
+        self._head: Optional[Head] = None
+
+    async def append(self, pendings: List[PendingCrum]) -> str:
+        if not pendings:
+            raise ValueError("Lote vacío: nada que anclar.")
+        async with self._sequencer:
+            if self._head is None:
+                with stage("chain_read"):
+                    self._head = await self.head()
+            head_hash, height = self._head
+            new_hash = link_chain(head_hash, pendings, start_height=height)
+            with stage("commit"):
+                params = [self._to_params(p.row) for p in pendings]
+                await asyncio.to_thread(self._insert, params)
+            self._head = (new_hash, height + len(pendings))
+            return new_hash
+
+    async def head(self) -> Head:
+        if self._head is not None:
+            return self._head
+        row = await asyncio.to_thread(
+            self._query, "SELECT integrity_hash, chain_height FROM tamv_crums_ledger ORDER BY chain_height DESC LIMIT 1", ()
+        )
+        return (row[0][0], row[0][1]) if row else (self.genesis_hash, 0)
+
+    async def scan(self, start_height: int = 1, end_height: Optional[int] = None, batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        cursor = start_height - 1
+        upper = end_height if end_height is not None else 2 ** 63 - 1
+        sql = (
+            f"SELECT {', '.join(_SQLITE_COLUMNS)}, attributes FROM tamv_crums_ledger "
+            "WHERE chain_height > ? AND chain_height <= ? ORDER BY chain_height LIMIT ?"
+        )
+        while True:
+            rows = await asyncio.to_thread(self._query, sql, (cursor, upper, batch_size))
+            for row in rows:
+                yield self._from_row(row)
+            if len(rows) < batch_size:
+                return
+            cursor = rows[-1][0]
+
+    async def count(self) -> int:
+        rows = await asyncio.to_thread(self._query, "SELECT count(*) FROM tamv_crums_ledger", ())
+        return rows[0][0]
+
+    async def close(self) -> None:
+        with self._db_lock:
+            self._conn.close()
+
+    def _insert(self, params: List[tuple]) -> None:
+        placeholders = ", ".join("?" * (len(_SQLITE_COLUMNS) + 1))
+        sql = f"INSERT INTO tamv_crums_ledger ({', '.join(_SQLITE_COLUMNS)}, attributes) VALUES ({placeholders})"
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(sql, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql: str, params: tuple) -> List[tuple]:
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _to_params(row: Dict[str, Any]) -> tuple:
+        attributes = {key: value for key, value in row.items() if key not in _SQLITE_COLUMNS}
+        return (
+            row["chain_height"],
+            str(row["id"]),
+            row["canonical_id"],
+            row["action_type"],
+            row.get("creator_did"),
+            str(row["risk_level"]),
+            row["integrity_hash"],
+            row.get("parent_hash"),
+            row.get("integrity_salt"),
+            payload_text(row["payload"]),
+            row.get("burst_blob"),
+            row["created_at"].isoformat(),
+            dumps(attributes),
+        )
+
+    @staticmethod
+    def _from_row(row: tuple) -> Dict[str, Any]:
+        record = json.loads(row[-1])
+        record.update(zip(_SQLITE_COLUMNS, row[:-1]))
+        record["id"] = uuid.UUID(record["id"])
+        record["payload"] = EncodedJSON.from_encoded(record["payload"])
+        record["created_at"] = datetime.fromisoformat(record["created_at"])
+        return record
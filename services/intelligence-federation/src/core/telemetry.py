@@ -0,0 +1,183 @@
+"""
+TAMV Telemetry: Extracción de ECG en la ingesta y rollups por ventana de tiempo.
+El dict `ecg` del payload se vuelca a columnas (telemetry_data, ecg_intensity,
+ecg_entropy, ecg_pattern) lote a lote, columna a columna, antes del INSERT.
+Con EcgRollups, el mismo lote actualiza tamv_ecg_rollups (minuto/hora x
+creador x patrón) en su transacción: los dashboards leen agregados pequeños
+en lugar de recorrer el JSONB del Ledger.
+"""
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.ledger_state import TAMVEcgRollupEntity
+from .chain import PendingCrum
+
+GRANULARITIES = ("minute", "hour")
+NO_PATTERN = "none"
+# Tope de ventanas por consulta de serie: un día en minutos, un mes en horas
+MAX_RANGE = {"minute": timedelta(days=1), "hour": timedelta(days=31)}
+# Tope de filas devueltas (ventanas x creadores x patrones)
+MAX_SERIES_ROWS = 10_000
+
+_RollupKey = Tuple[str, datetime, str, str]  # (granularidad, inicio de ventana, creador, patrón)
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _pattern(value: Any) -> Optional[str]:
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return value.strip().lower()[:32]
+
+
+def extract_ecg(pendings: List[PendingCrum]) -> None:
+    """
+    Rellena las columnas ECG de todo el lote. Todas las filas reciben las mismas
+    claves (None si no hay telemetría): el INSERT multi-fila lo exige.
+    """
+    ecgs = [(pending.row.get("payload") or {}).get("ecg") for pending in pendings]
+    ecgs = [ecg if isinstance(ecg, dict) else None for ecg in ecgs]
+    intensities = [_number(ecg.get("intensity")) if ecg else None for ecg in ecgs]
+    entropies = [_number(ecg.get("entropy")) if ecg else None for ecg in ecgs]
+    patterns = [_pattern(ecg.get("pattern")) if ecg else None for ecg in ecgs]
+    for pending, ecg, intensity, entropy, pattern in zip(pendings, ecgs, intensities, entropies, patterns):
+        row = pending.row
+        row["telemetry_data"] = ecg or {}
+        row["ecg_intensity"] = intensity
+        row["ecg_entropy"] = entropy
+        row["ecg_pattern"] = pattern
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    raise ValueError(f"Granularidad desconocida: {granularity}")
+
+
+@dataclass
+class _Aggregate:
+    count: int = 0
+    intensity_sum: float = 0.0
+    intensity_count: int = 0
+    intensity_max: Optional[float] = None
+    entropy_sum: float = 0.0
+    entropy_count: int = 0
+
+    def add(self, intensity: Optional[float], entropy: Optional[float]) -> None:
+        self.count += 1
+        if intensity is not None:
+            self.intensity_sum += intensity
+            self.intensity_count += 1
+            self.intensity_max = intensity if self.intensity_max is None else max(self.intensity_max, intensity)
+        if entropy is not None:
+            self.entropy_sum += entropy
+            self.entropy_count += 1
+
+
+class EcgRollups:
+    def __init__(self, granularities: Tuple[str, ...] = GRANULARITIES):
+        unknown = set(granularities) - set(GRANULARITIES)
+        if unknown:
+            raise ValueError(f"Granularidad desconocida: {sorted(unknown)}")
+        self.granularities = granularities
+
+    def batch_deltas(self, pendings: List[PendingCrum]) -> Dict[_RollupKey, _Aggregate]:
+        """Agregados del lote; requiere extract_ecg previo. Solo cuentan Crums con telemetría."""
+        deltas: Dict[_RollupKey, _Aggregate] = {}
+        for pending in pendings:
+            row = pending.row
+            if not row.get("telemetry_data"):
+                continue
+            creator = row.get("creator_did") or ""
+            pattern = row.get("ecg_pattern") or NO_PATTERN
+            for granularity in self.granularities:
+                key = (granularity, bucket_start(pending.timestamp, granularity), creator, pattern)
+                aggregate = deltas.get(key)
+                if aggregate is None:
+                    aggregate = deltas[key] = _Aggregate()
+                aggregate.add(row.get("ecg_intensity"), row.get("ecg_entropy"))
+        return deltas
+
+    async def persist(self, session: AsyncSession, deltas: Dict[_RollupKey, _Aggregate]) -> None:
+        """Upsert incremental; debe ir en la misma transacción que el INSERT del lote."""
+        if not deltas:
+            return
+        table = TAMVEcgRollupEntity
+        # Orden fijo de claves: dos lotes concurrentes bloquean las filas en el mismo orden
+        stmt = pg_insert(table).values([
+            {
+                "granularity": granularity,
+                "bucket_start": start,
+                "creator_did": creator,
+                "pattern": pattern,
+                "count": agg.count,
+                "intensity_sum": agg.intensity_sum,
+                "intensity_count": agg.intensity_count,
+                "intensity_max": agg.intensity_max,
+                "entropy_sum": agg.entropy_sum,
+                "entropy_count": agg.entropy_count,
+            }
+            for (granularity, start, creator, pattern), agg in sorted(deltas.items(), key=lambda item: item[0])
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.granularity, table.bucket_start, table.creator_did, table.pattern],
+            set_={
+                "count": table.count + stmt.excluded.count,
+                "intensity_sum": table.intensity_sum + stmt.excluded.intensity_sum,
+                "intensity_count": table.intensity_count + stmt.excluded.intensity_count,
+                # GREATEST ignora NULL en PostgreSQL
+                "intensity_max": func.greatest(table.intensity_max, stmt.excluded.intensity_max),
+                "entropy_sum": table.entropy_sum + stmt.excluded.entropy_sum,
+                "entropy_count": table.entropy_count + stmt.excluded.entropy_count,
+                "updated_at": func.now(),
+            },
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def series(
+        session: AsyncSession,
+        granularity: str,
+        since: datetime,
+        until: Optional[datetime] = None,
+        creator_did: Optional[str] = None,
+        pattern: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Serie temporal para dashboards, leída solo de la tabla de rollups."""
+        table = TAMVEcgRollupEntity
+        stmt = select(table).where(table.granularity == granularity, table.bucket_start >= since)
+        if until is not None:
+            stmt = stmt.where(table.bucket_start < until)
+        if creator_did is not None:
+            stmt = stmt.where(table.creator_did == creator_did)
+        if pattern is not None:
+            stmt = stmt.where(table.pattern == pattern)
+        stmt = stmt.order_by(table.bucket_start, table.creator_did, table.pattern)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return [
+            {
+                "bucket_start": row.bucket_start.isoformat(),
+                "creator_did": row.creator_did,
+                "pattern": row.pattern,
+                "count": row.count,
+                "intensity_avg": row.intensity_sum / row.intensity_count if row.intensity_count else None,
+                "intensity_max": row.intensity_max,
+                "entropy_avg": row.entropy_sum / row.entropy_count if row.entropy_count else None,
+            }
+            for row in (await session.execute(stmt)).scalars()
+        ]
@@ -0,0 +1,229 @@
+"""
+TAMV Ledger Verifier: Auditoría completa y reanudable de la cadena.
+Recorre el Ledger por chain_height en bloques con paginación keyset,
+recalcula cada integrity_hash en un pool de procesos y guarda un checkpoint
+para que la siguiente auditoría solo verifique los Crums nuevos.
+Los Crums previos a chain_height (altura NULL) se recorren antes, por
+(created_at, id), y ocupan las alturas 1..L igual que al numerarlos ChainHead:
+el primer Crum secuenciado debe ser L+1. El checkpoint nunca retrocede,
+tampoco con full=True.
+"""
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from ..models.ledger_state import TAMVVerificationCheckpointEntity
+from ..models.sovereign_event import TAMVCrumEntity
+from .chain import GLOBAL_CHAIN, canonical_payload, chain_genesis, compute_integrity_hash
+
+logger = structlog.get_logger("tamv.verifier")
+
+# (crum_id, parent_hash, payload, created_at, salt, burst_blob, integrity_hash)
+_HashRecord = Tuple[str, str, Dict[str, Any], datetime, Optional[str], Optional[bytes], str]
+
+
+def _find_tampered(records: List[_HashRecord]) -> List[str]:
+    """Worker del pool: devuelve los crum_id cuyo hash recalculado no coincide."""
+    tampered = []
+    for crum_id, parent_hash, payload, created_at, salt, blob, integrity_hash in records:
+        if salt is None:
+            tampered.append(crum_id)
+            continue
+        expected = compute_integrity_hash(crum_id, parent_hash, canonical_payload(payload), created_at, salt, blob)
+        if expected != integrity_hash:
+            tampered.append(crum_id)
+    return tampered
+
+
+@dataclass
+class VerificationReport:
+    chain_key: str
+    from_height: int
+    verified_height: int
+    verified_hash: str
+    rows_scanned: int = 0
+    tampered: List[str] = field(default_factory=list)
+    broken_links: List[str] = field(default_factory=list)
+
+    @property
+    def is_secure(self) -> bool:
+        return not self.tampered and not self.broken_links
+
+
+class LedgerVerifier:
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        chain_key: str = GLOBAL_CHAIN,
+        chunk_size: int = 10_000,
+        workers: Optional[int] = None,
+        genesis_hash: Optional[str] = None,
+    ):
+        self.session_factory = session_factory
+        self.chain_key = chain_key
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.genesis_hash = genesis_hash or chain_genesis(chain_key)
+
+    async def run(self, full: bool = False) -> VerificationReport:
+        """
+        Audita desde el último checkpoint (o desde el génesis si full=True).
+        El checkpoint solo avanza hasta la última altura contigua sin fallas.
+        Los Crums sin altura (anteriores a chain_height) se auditan cuando se
+        parte de la altura 0.
+        """
+        async with self.session_factory() as session:
+            checkpoint = None if full else await self._load_checkpoint(session)
+        start_height = checkpoint.verified_height if checkpoint else 0
+        # Altura 0: se re-audita el tramo sin altura desde el génesis
+        start_hash = checkpoint.verified_hash if checkpoint and start_height else self.genesis_hash
+
+        report = VerificationReport(
+            chain_key=self.chain_key,
+            from_height=start_height,
+            verified_height=start_height,
+            verified_hash=start_hash,
+        )
+        loop = asyncio.get_running_loop()
+        expected_parent, expected_height = start_hash, start_height
+        links_clean, advancing = True, True
+        # Bloques en vuelo: (altura final, hash final, future del pool, enlaces sanos)
+        inflight: Deque[Tuple[int, str, asyncio.Future, bool]] = deque()
+        workers = self.workers or os.cpu_count() or 1
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            max_inflight = 2 * workers
+
+            async for rows in self._stream(start_height):
+                report.rows_scanned += len(rows)
+                records: List[_HashRecord] = []
+
+                # 1. CONTINUIDAD (barata, en el proceso principal)
+                for row in rows:
+                    crum_id = str(row.id)
+                    # Sin altura (tramo previo a chain_height): su posición es su altura
+                    height_ok = row.chain_height is None or row.chain_height == expected_height + 1
+                    if not height_ok or row.parent_hash != expected_parent:
+                        report.broken_links.append(crum_id)
+                        links_clean = False
+                    expected_parent = row.integrity_hash
+                    expected_height = expected_height + 1 if row.chain_height is None else row.chain_height
+                    records.append((crum_id, row.parent_hash, row.payload, row.created_at, row.integrity_salt, row.burst_blob, row.integrity_hash))
+
+                # 2. SHA3-512 REPARTIDO EN EL POOL DE PROCESOS
+                future = loop.run_in_executor(pool, _find_tampered, records)
+                inflight.append((expected_height, expected_parent, future, links_clean))
+
+                while len(inflight) >= max_inflight:
+                    advancing = await self._settle(inflight.popleft(), report, advancing)
+
+            while inflight:
+                advancing = await self._settle(inflight.popleft(), report, advancing)
+
+        async with self.session_factory() as session:
+            await self._save_checkpoint(session, report)
+
+        log = logger.bind(chain=self.chain_key, scanned=report.rows_scanned, height=report.verified_height)
+        if report.is_secure:
+            log.info("ledger_verification_passed")
+        else:
+            log.critical(
+                "ledger_verification_failed",
+                tampered=len(report.tampered),
+                broken_links=len(report.broken_links),
+            )
+        return report
+
+    async def _settle(self, entry: Tuple[int, str, asyncio.Future, bool], report: VerificationReport, advancing: bool) -> bool:
+        """Incorpora el resultado de un bloque; avanza el checkpoint si sigue siendo contiguo."""
+        end_height, end_hash, future, links_clean = entry
+        tampered = await future
+        report.tampered.extend(tampered)
+        if advancing and links_clean and not tampered:
+            report.verified_height, report.verified_hash = end_height, end_hash
+            return True
+        return False
+
+    async def _stream(self, after_height: int) -> AsyncIterator[list]:
+        """
+        Paginación keyset sin OFFSET, coste constante por bloque: primero el
+        tramo sin altura por (created_at, id), luego por chain_height.
+        """
+        columns = (
+            TAMVCrumEntity.id,
+            TAMVCrumEntity.chain_height,
+            TAMVCrumEntity.parent_hash,
+            TAMVCrumEntity.integrity_hash,
+            TAMVCrumEntity.integrity_salt,
+            TAMVCrumEntity.payload,
+            TAMVCrumEntity.created_at,
+            TAMVCrumEntity.burst_blob,
+        )
+        async with self.session_factory() as session:
+            if after_height == 0:
+                cursor = None
+                while True:
+                    stmt = select(*columns).where(
+                        TAMVCrumEntity.chain_key == self.chain_key, TAMVCrumEntity.chain_height.is_(None)
+                    )
+                    if cursor is not None:
+                        stmt = stmt.where(tuple_(TAMVCrumEntity.created_at, TAMVCrumEntity.id) > cursor)
+                    stmt = stmt.order_by(TAMVCrumEntity.created_at, TAMVCrumEntity.id).limit(self.chunk_size)
+                    rows = (await session.execute(stmt)).all()
+                    if not rows:
+                        break
+                    yield rows
+                    cursor = (rows[-1].created_at, rows[-1].id)
+
+            while True:
+                stmt = (
+                    select(*columns)
+                    .where(TAMVCrumEntity.chain_key == self.chain_key, TAMVCrumEntity.chain_height > after_height)
+                    .order_by(TAMVCrumEntity.chain_height)
+                    .limit(self.chunk_size)
+                )
+                rows = (await session.execute(stmt)).all()
+                if not rows:
+                    return
+                yield rows
+                after_height = rows[-1].chain_height
+
+    async def _load_checkpoint(self, session: AsyncSession) -> Optional[TAMVVerificationCheckpointEntity]:
+        return await session.get(TAMVVerificationCheckpointEntity, self.chain_key)
+
+    async def _save_checkpoint(self, session: AsyncSession, report: VerificationReport) -> None:
+        """
+        Upsert que nunca retrocede: solo reemplaza un checkpoint de menor altura
+        (o de igual altura si la auditoría salió limpia, p. ej. una re-auditoría con full=True).
+        """
+        table = TAMVVerificationCheckpointEntity
+        stmt = pg_insert(table).values(
+            chain_key=self.chain_key,
+            verified_height=report.verified_height,
+            verified_hash=report.verified_hash,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.chain_key],
+            where=(
+                table.verified_height <= stmt.excluded.verified_height
+                if report.is_secure
+                else table.verified_height < stmt.excluded.verified_height
+            ),
+            set_={
+                "verified_height": stmt.excluded.verified_height,
+                "verified_hash": stmt.excluded.verified_hash,
+                "verified_at": func.now(),
+            },
+        )
+        await session.execute(stmt)
+        await session.commit()
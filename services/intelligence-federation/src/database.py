@@ -0,0 +1,13 @@
+"""
+TAMV Database: Sesión por petición sobre el pool app-scoped del ServiceContainer.
+La sesión solo toma una conexión del pool al primer uso y la devuelve al cerrar.
+"""
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import HTTPConnection
+
+
+async def get_db(conn: HTTPConnection) -> AsyncIterator[AsyncSession]:
+    async with conn.app.state.container.session_factory() as session:
+        yield session
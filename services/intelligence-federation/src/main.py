@@ -0,0 +1,13 @@
+"""
+TAMV Intelligence Federation: Aplicación FastAPI del gate de Isabella.
+Los servicios (pools, ingestor, ANUBIS, tareas de fondo) viven en el
+ServiceContainer y se crean una sola vez en el lifespan.
+"""
+from fastapi import FastAPI
+
+from .api.v1 import gate, metrics
+from .core.container import lifespan
+
+app = FastAPI(title="TAMV Intelligence Federation", lifespan=lifespan)
+app.include_router(gate.router)
+app.include_router(metrics.router)
@@ -0,0 +1,8 @@
+"""
+TAMV Sovereign Ledger - Base Declarativa
+Descripción: Base común de todas las entidades del Ledger; su metadata reúne las tablas del servicio.
+"""
+
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
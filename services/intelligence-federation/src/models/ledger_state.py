@@ -0,0 +1,136 @@
+"""
+TAMV Sovereign Ledger - Estado de Coordinación
+Descripción: Tablas auxiliares que acompañan al Ledger (cabeza de cadena, checkpoints, contadores, raíces Merkle, outbox, rollups ECG).
+"""
+
+from sqlalchemy import Column, String, DateTime, BigInteger, Float, Text
+from sqlalchemy.sql import func
+from .base import Base
+
+class TAMVChainHeadEntity(Base):
+    """
+    Cabeza persistida de una cadena del Ledger.
+    Actúa como compare-and-set: un escritor solo avanza si el head_hash
+    que tiene en memoria sigue siendo el vigente.
+    """
+    __tablename__ = "tamv_chain_heads"
+
+    chain_key = Column(String(64), primary_key=True)
+    head_hash = Column(String(128), nullable=False)
+    height = Column(BigInteger, nullable=False, default=0)
+    # Último fencing token del lease distribuido que avanzó la cabeza (NULL = sin lease)
+    fence_token = Column(BigInteger, nullable=True)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+
+    def __repr__(self):
+        return f"<TAMVChainHead(key={self.chain_key}, height={self.height}, head={self.head_hash[:16]})>"
+
+
+class TAMVVerificationCheckpointEntity(Base):
+    """
+    Última altura verificada de forma contigua por el auditor de integridad.
+    Las auditorías posteriores solo recorren los Crums añadidos después.
+    """
+    __tablename__ = "tamv_verification_checkpoints"
+
+    chain_key = Column(String(64), primary_key=True)
+    verified_height = Column(BigInteger, nullable=False, default=0)
+    verified_hash = Column(String(128), nullable=False)
+    verified_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<TAMVVerificationCheckpoint(key={self.chain_key}, height={self.verified_height})>"
+
+
+class TAMVLedgerCounterEntity(Base):
+    """
+    Contadores incrementales del Ledger por dimensión (action / risk).
+    Se actualizan en la misma transacción que cada lote de Crums y se
+    reconcilian periódicamente contra tamv_crums_ledger.
+    """
+    __tablename__ = "tamv_ledger_counters"
+
+    chain_key = Column(String(64), primary_key=True)
+    dimension = Column(String(16), primary_key=True)  # "action" | "risk"
+    value = Column(String(64), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+
+    def __repr__(self):
+        return f"<TAMVLedgerCounter({self.dimension}={self.value}, count={self.count})>"
+
+
+class TAMVMerkleCheckpointEntity(Base):
+    """
+    Raíz Merkle sellada de un bloque de alturas consecutivas del Ledger.
+    end_hash ancla el bloque a la cadena: todo Crum posterior lo compromete.
+    """
+    __tablename__ = "tamv_merkle_checkpoints"
+
+    chain_key = Column(String(64), primary_key=True)
+    block_index = Column(BigInteger, primary_key=True)
+    start_height = Column(BigInteger, nullable=False)
+    end_height = Column(BigInteger, nullable=False)
+    merkle_root = Column(String(128), nullable=False)
+    end_hash = Column(String(128), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<TAMVMerkleCheckpoint(key={self.chain_key}, block={self.block_index}, root={self.merkle_root[:16]})>"
+
+
+class TAMVOutboxEntity(Base):
+    """
+    Eventos del Ledger pendientes de fan-out a Redis.
+    Se insertan en la transacción de cada lote de Crums; el relay los publica
+    en orden de id y los borra al confirmar la entrega.
+    """
+    __tablename__ = "tamv_ledger_outbox"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    chain_key = Column(String(64), nullable=False)
+    channel = Column(String(128), nullable=False)
+    message = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<TAMVOutbox(id={self.id}, key={self.chain_key}, channel={self.channel})>"
+
+
+class TAMVEcgRollupEntity(Base):
+    """
+    Agregados de telemetría ECG por ventana (minuto/hora), creador y patrón.
+    Se mantienen con upserts incrementales en la transacción de cada lote;
+    los promedios se derivan de sumas y conteos al leer.
+    """
+    __tablename__ = "tamv_ecg_rollups"
+
+    granularity = Column(String(8), primary_key=True)  # "minute" | "hour"
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    creator_did = Column(String(255), primary_key=True)
+    pattern = Column(String(32), primary_key=True)  # "none" si el ECG no trae patrón
+    count = Column(BigInteger, nullable=False, default=0)
+    intensity_sum = Column(Float, nullable=False, default=0.0)
+    intensity_count = Column(BigInteger, nullable=False, default=0)
+    intensity_max = Column(Float, nullable=True)
+    entropy_sum = Column(Float, nullable=False, default=0.0)
+    entropy_count = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+
+    def __repr__(self):
+        return f"<TAMVEcgRollup({self.granularity}@{self.bucket_start}, {self.pattern}, count={self.count})>"
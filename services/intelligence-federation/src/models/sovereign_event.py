@@ -12,12 +12,13 @@ from typing import Any, Dict, Optional
 
 from sqlalchemy import (
     Column, String, JSON, DateTime, Boolean, 
-    Float, Index, Integer, Enum as SQLEnum,
-    Text, ForeignKey, Computed
+    Float, Index, Integer, BigInteger, Enum as SQLEnum,
+    Text, LargeBinary, ForeignKey, Computed
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 from .base import Base
+from ..core.chain import canonical_payload, compute_integrity_hash
 
 class VerificationLevel(str, Enum):
     BASIC = "basic"           # Firma estándar
@@ -39,22 +40,34 @@ class TAMVCrumEntity(Base):
     __tablename__ = "tamv_crums_ledger"
 
     # --- IDENTIFICADORES ÚNICOS ---
+    # La clave primaria incluye created_at: requisito de PostgreSQL para tablas particionadas
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     # ULID o Snowflake ID alternativo para ordenamiento cronológico natural
-    canonical_id = Column(String(64), unique=True, nullable=False, index=True)
+    canonical_id = Column(String(64), nullable=False, index=True)
     action_type = Column(String(64), nullable=False, index=True)
 
     # --- SOBERANÍA Y CRIPTOGRAFÍA DEL CREADOR ---
     creator_did = Column(String(255), nullable=False, index=True)
-    creator_pubkey = Column(Text, nullable=False)  # PEM o formato JWK
-    creator_signature = Column(Text, nullable=False)
+    # NULL solo en Crums sin firma de creador: ráfagas de sensor (Vortex) y anclas del sistema
+    creator_pubkey = Column(Text, nullable=True)  # PEM o formato JWK
+    creator_signature = Column(Text, nullable=True)
     # El fingerprint permite validaciones rápidas sin procesar llaves completas
-    creator_fingerprint = Column(String(64), nullable=False, index=True)
+    creator_fingerprint = Column(String(64), nullable=True, index=True)
+    # Procedencia: "signed" (firma Ed25519 verificada), "sensor" (Vortex) o "system" (ledger)
+    origin = Column(String(16), nullable=False, server_default="signed", index=True)
     
     # --- VALIDACIÓN DE INTEGRIDAD ---
     # Hash SHA-3/512 que encadena este Crum con el anterior (Blockchain-like)
-    integrity_hash = Column(String(128), unique=True, nullable=False)
+    # Sin UNIQUE global (no admitido entre particiones): la unicidad la garantiza
+    # el compare-and-set de tamv_chain_heads, que impide bifurcar la cadena
+    integrity_hash = Column(String(128), nullable=False, index=True)
     parent_hash = Column(String(128), nullable=True, index=True)
+    # Sal usada en el hash; sin ella el integrity_hash no es recalculable
+    integrity_salt = Column(Text, nullable=True)
+    # Posición en la cadena asignada por el secuenciador de escritura
+    chain_height = Column(BigInteger, nullable=True, index=True)
+    # Cadena a la que pertenece el Crum: "global" o un shard (por creador o bucket)
+    chain_key = Column(String(64), nullable=False, server_default="global", index=True)
     
     # --- SEGURIDAD AVANZADA (ANUBIS SENTINEL) ---
     risk_level = Column(SQLEnum(RiskLevel), default=RiskLevel.LOW, nullable=False, index=True)
@@ -77,6 +90,8 @@ class TAMVCrumEntity(Base):
     # --- PAYLOAD Y CONTEXTO ---
     payload = Column(JSONB, nullable=False)
     context_tags = Column(JSONB, nullable=True) # e.g., ["economy", "security", "xr"]
+    # Ráfaga binaria cruda (Vortex) fuera del JSONB indexado por GIN
+    burst_blob = Column(LargeBinary, nullable=True)
     
     # --- METADATOS DE SESIÓN Y ORIGEN ---
     session_id = Column(String(64), nullable=True, index=True)
@@ -84,10 +99,13 @@ class TAMVCrumEntity(Base):
     ip_address = Column(String(45), nullable=True) # IPv4/IPv6
 
     # --- AUDITORÍA TEMPORAL (TIEMPOS DE PRECISIÓN) ---
+    # Clave de partición mensual (RANGE): las consultas acotadas en el tiempo
+    # y _fetch_last_crum solo tocan las particiones recientes
     created_at = Column(
         DateTime(timezone=True), 
         server_default=func.now(), 
         nullable=False, 
+        primary_key=True,
         index=True
     )
     # Tiempo en que el servidor recibió y validó el evento
@@ -96,7 +114,7 @@ class TAMVCrumEntity(Base):
         server_default=func.now(), 
         nullable=False
     )
-    # Para eventos con caducidad legal o técnica
+    # Para eventos con caducidad legal o técnica (retención por partición completa)
     expires_at = Column(DateTime(timezone=True), nullable=True)
 
     # --- REGLAS DE NEGOCIO Y CONTRICCIONES ---
@@ -105,11 +123,17 @@ class TAMVCrumEntity(Base):
         Index("ix_tamv_crums_payload_gin", payload, postgresql_using="gin"),
         Index("ix_tamv_crums_tags_gin", context_tags, postgresql_using="gin"),
         
+        # Recorrido por cadena (auditor, Merkle, arranque de shards)
+        Index("ix_tamv_crums_chain_position", chain_key, chain_height),
+
         # Índice compuesto para auditoría de soberanía por tiempo
         Index("ix_sovereignty_audit", creator_did, created_at, risk_level),
         
         # Garantizar que no existan colisiones de integridad
-        {"comment": "Tabla maestra del Ledger Soberano de Isabella IA"}
+        {
+            "comment": "Tabla maestra del Ledger Soberano de Isabella IA",
+            "postgresql_partition_by": "RANGE (created_at)",
+        }
     )
 
     def __repr__(self):
@@ -118,8 +142,17 @@ class TAMVCrumEntity(Base):
     @property
     def is_tampered(self) -> bool:
         """
-        Lógica placeholder para verificar si el registro ha sido alterado.
-        En una implementación real, esto recalcula el integrity_hash.
+        Recalcula el integrity_hash con las mismas entradas que commit_crum.
+        Un registro sin sal o sin parent_hash no es verificable y se considera alterado.
         """
-        # TODO: Implementar validación cruzada con parent_hash
-        return False
+        if self.integrity_salt is None or self.parent_hash is None:
+            return True
+        expected = compute_integrity_hash(
+            str(self.id),
+            self.parent_hash,
+            canonical_payload(self.payload),
+            self.created_at,
+            self.integrity_salt,
+            self.burst_blob,
+        )
+        return expected != self.integrity_hash
@@ -1,42 +1,175 @@
 """
 ANUBIS Sentinel: Real-time Threat Intelligence & Response.
 Gestiona el estado de crisis y propaga alertas via WebSockets/Redis.
+La reputación se actualiza con un script atómico (un round-trip) y las
+consultas de acceso se resuelven contra una caché local allow/deny, acotada
+(los bloqueos más próximos a expirar salen primero si se llena).
+Con un CrisisBroadcaster, las señales repetidas se agregan en resúmenes.
 """
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Any, Optional, Set
+import asyncio
+import json
+import re
 import time
 import structlog
 from redis.asyncio import Redis
 
+from ..core.profiling import incr, stage
+
 logger = structlog.get_logger("tamv.anubis")
 
+# INCRBYFLOAT + EXPIRE atómicos en el servidor: un solo round-trip por intento
+REPUTATION_LUA = """
+local score = redis.call('INCRBYFLOAT', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return score
+"""
+
+# DID W3C: método en minúsculas y un identificador específico no vacío
+DID_PATTERN = re.compile(r"did:[a-z0-9]+:[A-Za-z0-9._:%-]+")
+DID_MAX_LENGTH = 255
+
 class AnubisSentinel:
-    def __init__(self, redis: Redis):
+    def __init__(self, redis: Redis, broadcaster: Optional[Any] = None, max_denied: int = 100_000):
         self.redis = redis
+        # CrisisBroadcaster opcional: deduplica y limita señales por fuente y motivo
+        self.broadcaster = broadcaster
         self.THREAT_THRESHOLD = 75.0  # Umbral para Modo Crisis (Rojo Sangre)
         self.LOCKDOWN_THRESHOLD = 95.0 # Umbral para Cierre Total
+        self.CRISIS_CHANNEL = "anubis:crisis_channel"
+        self.REPUTATION_TTL = 3600 # TTL de 1 hora para enfriamiento
+        self._reputation_script = redis.register_script(REPUTATION_LUA)
+        # Caché local allow/deny: ip -> instante (monotónico) de expiración del bloqueo.
+        # TTL único: el orden de inserción es el orden de expiración
+        self.max_denied = max_denied
+        self._denied: "OrderedDict[str, float]" = OrderedDict()
+        self._background: Set[asyncio.Task] = set()
+
+    def is_ip_allowed(self, ip: str) -> bool:
+        """Consulta local en microsegundos, sin round-trip a Redis."""
+        expires_at = self._denied.get(ip)
+        if expires_at is None:
+            return True
+        if expires_at <= time.monotonic():
+            del self._denied[ip]
+            return True
+        return False
 
     async def log_attempt(self, ip: str, success: bool, reason: Optional[str] = None):
         """Registra intentos y calcula el Risk Index en tiempo real."""
         key = f"anubis:reputation:{ip}"
-        if not success:
-            # Incremento exponencial de riesgo por fallo
-            current_risk = await self.redis.incrbyfloat(key, 12.5)
-            await self.redis.expire(key, 3600) # TTL de 1 hora para enfriamiento
-            
-            if current_risk >= self.THREAT_THRESHOLD:
-                await self._broadcast_crisis(ip, "BRUTE_FORCE_DETECTED", current_risk)
-        else:
-            # Decay lento de riesgo en intentos exitosos (reputación positiva)
-            await self.redis.incrbyfloat(key, -1.0)
+        # Incremento de riesgo por fallo / decay lento en intentos exitosos (reputación positiva)
+        delta = -1.0 if success else 12.5
+        with stage("reputation"):
+            current_risk = float(await self._reputation_script(keys=[key], args=[delta, self.REPUTATION_TTL]))
+
+        if not success and current_risk >= self.THREAT_THRESHOLD:
+            self._deny(ip)
+            await self._broadcast_crisis(ip, "BRUTE_FORCE_DETECTED", current_risk)
+
+    def record_attempt(self, ip: str, success: bool, reason: Optional[str] = None) -> None:
+        """Saca la reputación del camino crítico: la actualización corre en segundo plano."""
+        task = asyncio.create_task(self.log_attempt(ip, success, reason))
+        self._background.add(task)
+        task.add_done_callback(self._reap)
+
+    def _reap(self, task: asyncio.Task) -> None:
+        """Recoge la tarea de fondo; su excepción se registra en lugar de perderse."""
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("anubis_reputation_update_failed", error=str(task.exception()))
+
+    def log_violation(self, ip: str, reason: str) -> None:
+        """Violación de reglas de negocio o de integridad: penaliza la reputación del origen."""
+        logger.warning("anubis_violation_recorded", ip=ip, reason=reason)
+        self.record_attempt(ip, success=False, reason=reason)
+
+    def register_critical_failure(self, ip: str, error: str) -> None:
+        """Falla de infraestructura: se registra sin penalizar al cliente."""
+        logger.error("anubis_critical_failure", ip=ip, error=error)
+
+    async def validate_id_nvida(self, did: Optional[str]) -> bool:
+        """Identidad apta para ráfagas sensoriales: DID bien formado y sin bloqueo vigente."""
+        if not did or len(did) > DID_MAX_LENGTH or DID_PATTERN.fullmatch(did) is None:
+            return False
+        # La caché de bloqueo también admite DIDs como clave
+        return self.is_ip_allowed(did)
+
+    async def emergency_shutdown_trigger(self, reason: str) -> None:
+        """Falla no controlada en la ingesta: señal de crisis con origen en el Ledger."""
+        logger.error("anubis_ingestor_failure", reason=reason)
+        # Motivo fijo: con CrisisBroadcaster, las repeticiones se agregan en un resumen
+        await self._broadcast_crisis("LEDGER", "INGESTOR_FAILURE", self.THREAT_THRESHOLD)
+
+    async def listen_crisis_channel(self):
+        """
+        Invalida la caché local con las señales de otras réplicas:
+        CRITICAL/LOCKDOWN con source_ip (o source_ips, en resúmenes) bloquea, CLEARED libera.
+        """
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.CRISIS_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    event = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                self._apply_crisis_event(event)
+        finally:
+            await pubsub.unsubscribe(self.CRISIS_CHANNEL)
+
+    def _apply_crisis_event(self, event: dict) -> None:
+        """
+        Un evento individual trae source_ip; el resumen de tormenta del
+        CrisisBroadcaster trae la muestra en source_ips y cuántas señales quedaron
+        fuera de ella en unsampled (esas IPs solo las bloquea la réplica de origen).
+        """
+        ips = list(event.get("source_ips") or ())
+        if event.get("source_ip"):
+            ips.append(event["source_ip"])
+        status = event.get("status")
+        if status in ("CRITICAL", "LOCKDOWN"):
+            for ip in ips:
+                self._deny(ip)
+            if event.get("unsampled"):
+                incr("anubis_unsampled_signals", event["unsampled"])
+                logger.warning("crisis_summary_unsampled", unsampled=event["unsampled"], denied=len(ips))
+        elif status == "CLEARED":
+            for ip in ips:
+                self._denied.pop(ip, None)
+
+    def _deny(self, ip: str):
+        now = time.monotonic()
+        self._denied[ip] = now + self.REPUTATION_TTL
+        self._denied.move_to_end(ip)
+        # Barrido de expirados desde el frente; en tormenta, se descartan los más antiguos
+        while self._denied:
+            expires_at = next(iter(self._denied.values()))
+            if expires_at > now and len(self._denied) <= self.max_denied:
+                break
+            self._denied.popitem(last=False)
 
     async def _broadcast_crisis(self, source_ip: str, alert_type: str, severity: float):
         """Propaga el estado de crisis a través del bus de eventos."""
+        if self.broadcaster is not None:
+            await self.broadcaster.signal(
+                source=source_ip,
+                reason=alert_type,
+                threat_level=severity,
+                status="CRITICAL" if severity < self.LOCKDOWN_THRESHOLD else "LOCKDOWN",
+                source_ip=source_ip,
+            )
+            return
         event = {
             "status": "CRITICAL" if severity < self.LOCKDOWN_THRESHOLD else "LOCKDOWN",
             "threatLevel": min(severity, 100),
             "lastEvent": f"{alert_type} from {source_ip}",
+            "source_ip": source_ip,
             "timestamp": time.time()
         }
         # Publicar en el canal global para que el WebSocket lo tome
-        await self.redis.publish("anubis:crisis_channel", json.dumps(event))
+        await self.redis.publish(self.CRISIS_CHANNEL, json.dumps(event))
         logger.critical("ANUBIS_CRISIS_SIGNAL_EMITTED", **event)
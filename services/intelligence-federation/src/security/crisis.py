@@ -0,0 +1,181 @@
+"""
+ANUBIS Crisis Broadcaster: Coalescencia de señales y supresión de tormentas.
+La primera señal de cada (fuente, motivo) por ventana se publica al instante;
+las repeticiones se agregan en un resumen periódico con conteo y pico de amenaza.
+En tormenta, el cubo de desbordamiento conserva una muestra acotada de fuentes
+(source, motivo, source_ip) para que el resumen siga diciendo quién atacaba.
+Las notificaciones rutinarias de anclaje viajan por un canal aparte, en lotes.
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import structlog
+from redis.asyncio import Redis
+
+from ..core.encoding import dumps
+
+logger = structlog.get_logger("tamv.crisis")
+
+# Severidad relativa para escalar el estado de un resumen
+_STATUS_RANK = {"WARNING": 0, "CRITICAL": 1, "LOCKDOWN": 2}
+_OVERFLOW_KEY = ("*", "CRISIS_STORM_SUPPRESSED")
+
+
+@dataclass
+class _SignalBucket:
+    status: str
+    peak: float
+    suppressed: int = 0
+    fields: Dict[str, Any] = field(default_factory=dict)
+    # Solo en el cubo de desbordamiento: (source, motivo, source_ip) -> conteo
+    samples: Dict[Tuple[str, str, Optional[str]], int] = field(default_factory=dict)
+    unsampled: int = 0
+
+
+class CrisisBroadcaster:
+    def __init__(
+        self,
+        redis: Redis,
+        crisis_channel: str = "anubis:crisis_channel",
+        anchor_channel: str = "ledger:anchor_channel",
+        window_ms: float = 1000.0,
+        max_immediate: int = 32,
+        max_tracked: int = 1024,
+        max_pending_anchors: int = 10_000,
+        max_overflow_samples: int = 32,
+    ):
+        self.redis = redis
+        self.crisis_channel = crisis_channel
+        self.anchor_channel = anchor_channel
+        self.window = window_ms / 1000.0
+        # Tope global de publicaciones inmediatas por ventana (fuentes distintas incluidas)
+        self.max_immediate = max_immediate
+        self.max_tracked = max_tracked
+        self.max_overflow_samples = max_overflow_samples
+        self._buckets: Dict[Tuple[str, str], _SignalBucket] = {}
+        self._immediate = 0
+        self._anchors: Deque[Dict[str, Any]] = deque(maxlen=max_pending_anchors)
+        self._anchors_dropped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="tamv-crisis-broadcaster")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def signal(
+        self,
+        source: str,
+        reason: str,
+        threat_level: float,
+        status: str = "CRITICAL",
+        **fields: Any,
+    ) -> bool:
+        """
+        Registra una señal de crisis. Devuelve True si se publicó al instante,
+        False si quedó agregada para el próximo resumen.
+        Los campos extra (p. ej. source_ip) viajan en el evento y en su resumen.
+        """
+        key = (source, reason)
+        bucket = self._buckets.get(key)
+        if bucket is None and (self._immediate >= self.max_immediate or len(self._buckets) >= self.max_tracked):
+            # Tormenta: todo lo que excede el presupuesto cae en un único cubo
+            key = _OVERFLOW_KEY
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _SignalBucket(status=status, peak=threat_level)
+            sample = (source, reason, fields.get("source_ip"))
+            if sample in bucket.samples:
+                bucket.samples[sample] += 1
+            elif len(bucket.samples) < self.max_overflow_samples:
+                bucket.samples[sample] = 1
+            else:
+                bucket.unsampled += 1
+
+        if bucket is not None:
+            bucket.suppressed += 1
+            bucket.peak = max(bucket.peak, threat_level)
+            if _STATUS_RANK.get(status, 0) > _STATUS_RANK.get(bucket.status, 0):
+                bucket.status = status
+            return False
+
+        self._buckets[key] = _SignalBucket(status=status, peak=threat_level, fields=fields)
+        self._immediate += 1
+        await self._publish_crisis({
+            **fields,
+            "status": status,
+            "threatLevel": min(threat_level, 100),
+            "lastEvent": f"{reason} at {source}",
+            "source": source,
+            "count": 1,
+            "timestamp": time.time(),
+        })
+        return True
+
+    def anchored(self, event: Dict[str, Any]) -> None:
+        """Encola una notificación rutinaria de anclaje (sin I/O en el camino crítico)."""
+        if len(self._anchors) == self._anchors.maxlen:
+            self._anchors_dropped += 1
+        self._anchors.append(event)
+
+    async def flush(self) -> None:
+        """Publica los resúmenes de la ventana y el lote de anclajes pendiente."""
+        buckets, self._buckets, self._immediate = self._buckets, {}, 0
+        for (source, reason), bucket in buckets.items():
+            if not bucket.suppressed:
+                continue
+            extra: Dict[str, Any] = {}
+            if bucket.samples:
+                ranked = sorted(bucket.samples.items(), key=lambda item: item[1], reverse=True)
+                extra = {
+                    "sources": [
+                        {"source": src, "reason": why, "source_ip": ip, "count": n}
+                        for (src, why, ip), n in ranked
+                    ],
+                    "source_ips": sorted({ip for (_, _, ip) in bucket.samples if ip}),
+                    "unsampled": bucket.unsampled,
+                }
+            await self._publish_crisis({
+                **bucket.fields,
+                **extra,
+                "status": bucket.status,
+                "threatLevel": min(bucket.peak, 100),
+                "lastEvent": f"{reason} at {source}",
+                "source": source,
+                "count": bucket.suppressed,
+                "summary": True,
+                "window_ms": int(self.window * 1000),
+                "timestamp": time.time(),
+            })
+
+        if self._anchors:
+            anchors = list(self._anchors)
+            self._anchors.clear()
+            dropped, self._anchors_dropped = self._anchors_dropped, 0
+            await self.redis.publish(self.anchor_channel, dumps({
+                "status": "CRUM_ANCHORED_BATCH",
+                "count": len(anchors),
+                "dropped": dropped,
+                "crums": anchors,
+            }))
+
+    async def _publish_crisis(self, event: Dict[str, Any]) -> None:
+        await self.redis.publish(self.crisis_channel, dumps(event))
+        logger.critical("ANUBIS_CRISIS_SIGNAL_EMITTED", **event)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.window)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("crisis_flush_failed", error=str(e))
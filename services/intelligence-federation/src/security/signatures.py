@@ -0,0 +1,188 @@
+"""
+TAMV Signatures: Verificación Ed25519 de la identidad del creador.
+Las llaves públicas parseadas viven en una LRU acotada indexada por fingerprint
+(SHA-256 de los 32 bytes crudos de la llave), así que un creador recurrente no
+vuelve a parsear su llave. Con workers > 0, las verificaciones de una ráfaga se
+agrupan en lotes y se resuelven en un pool de hilos fuera del event loop.
+Requiere `cryptography`; sin ella solo se calculan fingerprints.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+import structlog
+
+from ..core.profiling import incr, stage
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+except ImportError:  # pragma: no cover - dependencia opcional
+    InvalidSignature = Ed25519PublicKey = None
+
+logger = structlog.get_logger("tamv.signatures")
+
+# Cabecera DER (SubjectPublicKeyInfo) de una llave Ed25519: OID 1.3.101.112
+_SPKI_PREFIX = bytes.fromhex("302a300506032b6570032100")
+_PEM_HEADER = "-----BEGIN PUBLIC KEY-----"
+
+
+class SignatureError(ValueError):
+    """Llave o firma mal formada, o firma que no corresponde al mensaje."""
+    pass
+
+
+def _decode(text: str, size: int) -> bytes:
+    """Hex o base64 (estándar o url-safe, con o sin relleno) de exactamente `size` bytes."""
+    text = text.strip()
+    try:
+        if len(text) == size * 2:
+            return bytes.fromhex(text)
+        raw = base64.urlsafe_b64decode(text.replace("+", "-").replace("/", "_") + "=" * (-len(text) % 4))
+    except (ValueError, binascii.Error):
+        raise SignatureError("encoding_not_hex_or_base64")
+    if len(raw) != size:
+        raise SignatureError(f"expected_{size}_bytes")
+    return raw
+
+
+def public_key_bytes(pubkey: str) -> bytes:
+    """32 bytes crudos de la llave, desde hex, base64 o PEM (SubjectPublicKeyInfo)."""
+    pubkey = pubkey.strip()
+    if pubkey.startswith(_PEM_HEADER):
+        body = "".join(line for line in pubkey.splitlines() if not line.startswith("-----"))
+        try:
+            der = base64.b64decode(body)
+        except (ValueError, binascii.Error):
+            raise SignatureError("malformed_pem")
+        if len(der) != len(_SPKI_PREFIX) + 32 or not der.startswith(_SPKI_PREFIX):
+            raise SignatureError("pem_is_not_ed25519")
+        return der[len(_SPKI_PREFIX):]
+    return _decode(pubkey, 32)
+
+
+def key_fingerprint(pubkey: str) -> str:
+    """Fingerprint canónico: el mismo para la llave en hex, base64 o PEM."""
+    return hashlib.sha256(public_key_bytes(pubkey)).hexdigest()
+
+
+def signature_bytes(signature: str) -> bytes:
+    return _decode(signature, 64)
+
+
+def _verify_batch(items: List[Tuple[Any, bytes, bytes]]) -> List[bool]:
+    """Se ejecuta en el pool: solo la aritmética de curva, sin tocar la caché."""
+    results = []
+    for key, signature, message in items:
+        try:
+            key.verify(signature, message)
+            results.append(True)
+        except InvalidSignature:
+            results.append(False)
+    return results
+
+
+class Ed25519Verifier:
+    def __init__(
+        self,
+        max_keys: int = 10_000,
+        workers: int = 0,
+        max_batch: int = 64,
+        batch_window_ms: float = 0.5,
+    ):
+        if Ed25519PublicKey is None:
+            raise RuntimeError("Ed25519Verifier requiere el paquete 'cryptography'.")
+        self.max_keys = max_keys
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000.0
+        self.workers = workers
+        # workers=0: verificación en línea (latencia mínima a baja carga)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tamv-ed25519") if workers else None
+        self._keys: "OrderedDict[str, Any]" = OrderedDict()
+        self._batch: List[Tuple[Any, bytes, bytes, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def load_key(self, pubkey: str) -> Tuple[str, Any]:
+        """(fingerprint, llave parseada); la llave sale de la LRU si ya se vio."""
+        raw = public_key_bytes(pubkey)
+        fingerprint = hashlib.sha256(raw).hexdigest()
+        key = self._keys.get(fingerprint)
+        if key is not None:
+            self._keys.move_to_end(fingerprint)
+            return fingerprint, key
+        incr("signature_key_cache_miss")
+        try:
+            key = Ed25519PublicKey.from_public_bytes(raw)
+        except ValueError:
+            raise SignatureError("invalid_ed25519_key")
+        self._keys[fingerprint] = key
+        if len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+        return fingerprint, key
+
+    def verify_sync(self, pubkey: str, signature: str, message: bytes) -> str:
+        """Verifica en el hilo actual. Devuelve el fingerprint de la llave."""
+        fingerprint, key = self.load_key(pubkey)
+        try:
+            key.verify(signature_bytes(signature), message)
+        except InvalidSignature:
+            raise SignatureError("signature_mismatch")
+        return fingerprint
+
+    async def verify(self, pubkey: str, signature: str, message: bytes) -> str:
+        """
+        Verifica la firma de `message`. Devuelve el fingerprint de la llave.
+        Con pool, la petición se une al lote en curso y espera su resultado.
+        """
+        with stage("signature"):
+            if self._executor is None:
+                return self.verify_sync(pubkey, signature, message)
+
+            fingerprint, key = self.load_key(pubkey)
+            future = asyncio.get_running_loop().create_future()
+            self._batch.append((key, signature_bytes(signature), message, future))
+            if len(self._batch) >= self.max_batch:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+
+            if not await future:
+                raise SignatureError("signature_mismatch")
+            return fingerprint
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        loop = asyncio.get_running_loop()
+        # Un trozo por worker: un salto al pool por trozo, no por firma
+        size = -(-len(batch) // self.workers)
+        for start in range(0, len(batch), size):
+            chunk = batch[start:start + size]
+            work = loop.run_in_executor(self._executor, _verify_batch, [item[:3] for item in chunk])
+            work.add_done_callback(lambda done, chunk=chunk: _resolve(chunk, done))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+def _resolve(chunk: List[Tuple[Any, bytes, bytes, asyncio.Future]], done: asyncio.Future) -> None:
+    # exception() lanza CancelledError si el lote se canceló (p. ej. el loop se cierra)
+    error = RuntimeError("verification_cancelled") if done.cancelled() else done.exception()
+    if error is not None:
+        logger.error("signature_batch_failed", size=len(chunk), error=str(error))
+    for index, (_, _, _, future) in enumerate(chunk):
+        if future.done():
+            continue  # La petición se canceló mientras esperaba
+        if error is not None:
+            future.set_exception(SignatureError("verification_unavailable"))
+        else:
+            future.set_result(done.result()[index])
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from structlog.testing import capture_logs
+
+from conftest import load_root_module
+from src.security.anubis import AnubisSentinel
+
+root_anubis = load_root_module("src/security/anubis.py", "root_anubis")
+
+
+class DownRedis:
+    """Redis caído: el script de reputación falla en cada intento."""
+
+    def register_script(self, script):
+        async def call(keys, args):
+            raise ConnectionError("redis_down")
+        return call
+
+
+class ScoreRedis:
+    def __init__(self, score):
+        self.score = score
+
+    def register_script(self, script):
+        async def call(keys, args):
+            return self.score
+        return call
+
+
+@pytest.fixture(params=[AnubisSentinel, root_anubis.AnubisSentinel], ids=["service", "root"])
+def sentinel_class(request):
+    return request.param
+
+
+def test_deny_cache_is_bounded_and_drops_the_oldest_blocks(sentinel_class):
+    sentinel = sentinel_class(ScoreRedis(0.0), max_denied=3)
+
+    for index in range(5):
+        sentinel._deny(f"10.0.0.{index}")
+
+    assert list(sentinel._denied) == ["10.0.0.2", "10.0.0.3", "10.0.0.4"]
+    assert sentinel.is_ip_allowed("10.0.0.0")
+    assert not sentinel.is_ip_allowed("10.0.0.4")
+
+
+def test_re_deny_refreshes_the_position_and_expired_blocks_are_swept(sentinel_class):
+    sentinel = sentinel_class(ScoreRedis(0.0), max_denied=10)
+    sentinel.REPUTATION_TTL = -1
+    sentinel._deny("198.51.100.1")
+    sentinel.REPUTATION_TTL = 3600
+
+    sentinel._deny("198.51.100.2")
+    sentinel._deny("198.51.100.3")
+    sentinel._deny("198.51.100.2")
+
+    # El expirado salió del frente al barrer; el re-bloqueado pasó al final
+    assert list(sentinel._denied) == ["198.51.100.3", "198.51.100.2"]
+
+
+def test_failed_background_reputation_update_is_logged(sentinel_class):
+    sentinel = sentinel_class(DownRedis())
+
+    async def scenario():
+        sentinel.record_attempt("203.0.113.9", success=False)
+        await asyncio.gather(*sentinel._background, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    with capture_logs() as logs:
+        asyncio.run(scenario())
+
+    assert not sentinel._background
+    failures = [entry for entry in logs if entry["event"] == "anubis_reputation_update_failed"]
+    assert [entry["error"] for entry in failures] == ["redis_down"]
+
+
+def test_high_risk_attempt_blocks_locally_before_broadcasting():
+    class Broadcaster:
+        def __init__(self):
+            self.signals = []
+
+        async def signal(self, **kwargs):
+            self.signals.append(kwargs)
+
+    broadcaster = Broadcaster()
+    sentinel = AnubisSentinel(ScoreRedis(80.0), broadcaster=broadcaster)
+
+    asyncio.run(sentinel.log_attempt("203.0.113.7", success=False))
+
+    assert not sentinel.is_ip_allowed("203.0.113.7")
+    assert broadcaster.signals[0]["reason"] == "BRUTE_FORCE_DETECTED"
+    assert broadcaster.signals[0]["source_ip"] == "203.0.113.7"
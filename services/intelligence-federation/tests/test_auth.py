@@ -0,0 +1,199 @@
+import asyncio
+import json
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from src.api.v1 import gate  # noqa: E402
+from src.core.auth import (  # noqa: E402
+    CreatorContext,
+    CreatorPolicy,
+    get_replayable_creator,
+    get_verified_creator,
+)
+from src.core.encoding import EncodedJSON, canonical_payload  # noqa: E402
+from src.core.idempotency import IdempotencyCache  # noqa: E402
+from src.security.signatures import Ed25519Verifier  # noqa: E402
+
+
+def _auth_app(policy):
+    app = FastAPI()
+    app.state.signature_verifier = Ed25519Verifier()
+    app.state.creator_policy = policy
+
+    @app.post("/strict")
+    async def strict(ctx: CreatorContext = Depends(get_verified_creator)):
+        return {"fingerprint": ctx.fingerprint, "roles": ctx.roles, "assurance": ctx.assurance_level}
+
+    @app.post("/replayable")
+    async def replayable(ctx: CreatorContext = Depends(get_replayable_creator)):
+        return {"replayed": ctx.replayed}
+
+    return TestClient(app)
+
+
+def test_valid_signature_carries_policy_roles(make_signer):
+    signer = make_signer()
+    client = _auth_app(CreatorPolicy(auditor_fingerprints=frozenset({signer.fingerprint})))
+
+    response = client.post("/strict", content=b"{}", headers=signer.headers("POST", "/strict", b"{}"))
+
+    assert response.status_code == 200
+    assert response.json() == {"fingerprint": signer.fingerprint, "roles": ["auditor"], "assurance": "substantial"}
+
+
+def test_rejects_bad_signature_stale_timestamp_and_missing_headers(make_signer):
+    signer = make_signer()
+    client = _auth_app(CreatorPolicy(max_skew_s=60))
+
+    # Cuerpo distinto del firmado
+    forged = client.post("/strict", content=b'{"x":1}', headers=signer.headers("POST", "/strict", b"{}"))
+    stale = client.post("/strict", content=b"{}", headers=signer.headers("POST", "/strict", b"{}", timestamp=time.time() - 120))
+    # La query forma parte de lo firmado
+    moved = client.post("/strict?as=root", content=b"{}", headers=signer.headers("POST", "/strict", b"{}"))
+    missing = client.post("/strict", content=b"{}")
+
+    assert [r.status_code for r in (forged, stale, moved, missing)] == [401, 401, 401, 401]
+    assert forged.json()["detail"] == "invalid_creator_signature"
+    assert missing.json()["detail"] == "missing_creator_credentials"
+
+
+def test_repeated_signature_is_rejected_or_marked_by_endpoint(make_signer):
+    signer = make_signer()
+    client = _auth_app(CreatorPolicy())
+
+    strict_headers = signer.headers("POST", "/strict", b"{}")
+    assert client.post("/strict", content=b"{}", headers=strict_headers).status_code == 200
+    replay = client.post("/strict", content=b"{}", headers=strict_headers)
+    assert (replay.status_code, replay.json()["detail"]) == (401, "replayed_request")
+
+    replayable_headers = signer.headers("POST", "/replayable", b"{}")
+    first = client.post("/replayable", content=b"{}", headers=replayable_headers)
+    again = client.post("/replayable", content=b"{}", headers=replayable_headers)
+    assert first.json() == {"replayed": False}
+    assert again.json() == {"replayed": True}
+
+
+def test_replay_memory_is_shared_between_replicas():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        node_a, node_b = CreatorPolicy(redis=redis), CreatorPolicy(redis=redis)
+        return await node_a.remember("sig-1"), await node_b.remember("sig-1"), await node_b.remember("sig-2")
+
+    assert asyncio.run(scenario()) == (False, True, False)
+
+
+def test_replay_memory_falls_back_to_process_when_redis_is_down():
+    class DownRedis:
+        async def set(self, *args, **kwargs):
+            raise ConnectionError("redis_down")
+
+    async def scenario():
+        policy = CreatorPolicy(redis=DownRedis())
+        return await policy.remember("sig-1"), await policy.remember("sig-1")
+
+    assert asyncio.run(scenario()) == (False, True)
+
+
+# ====== Contrato de replay en /isabella/dispatch ======
+
+class FakeIngestor:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+        self.payloads = []
+
+    async def commit_crum(self, raw_data, agent_profile, creator_ctx, verified_by_root=False, **kwargs):
+        self.calls += 1
+        self.payloads.append(raw_data)
+        if self.fail:
+            raise RuntimeError("ledger_down")
+        return str(uuid.uuid4())
+
+
+class FakeSentinel:
+    def is_ip_allowed(self, ip):
+        return True
+
+    def log_violation(self, ip, reason):
+        pass
+
+    def register_critical_failure(self, ip, error):
+        pass
+
+
+def _gate_app(ingestor):
+    app = FastAPI()
+    app.include_router(gate.router)
+    app.state.container = SimpleNamespace(ingestor=ingestor, sentinel=FakeSentinel())
+    app.state.signature_verifier = Ed25519Verifier()
+    app.state.creator_policy = CreatorPolicy()
+    app.state.idempotency = IdempotencyCache()
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_resent_signed_dispatch_gets_the_original_crum(make_signer):
+    signer = make_signer()
+    ingestor = FakeIngestor()
+    client = _gate_app(ingestor)
+    body = json.dumps({"action": "CREATE_DREAMSPACE"}).encode()
+    headers = signer.headers("POST", "/isabella/dispatch", body)
+
+    first = client.post("/isabella/dispatch", content=body, headers=headers)
+    resent = client.post("/isabella/dispatch", content=body, headers=headers)
+
+    assert first.status_code == resent.status_code == 201
+    assert resent.json()["crum_id"] == first.json()["crum_id"]
+    assert resent.headers["x-idempotent-replay"] == "true"
+    assert ingestor.calls == 1
+
+
+def test_resent_signature_without_stored_result_is_a_replay(make_signer):
+    signer = make_signer()
+    ingestor = FakeIngestor(fail=True)
+    client = _gate_app(ingestor)
+    body = json.dumps({"action": "CREATE_DREAMSPACE"}).encode()
+    headers = signer.headers("POST", "/isabella/dispatch", body)
+
+    assert client.post("/isabella/dispatch", content=body, headers=headers).status_code == 500
+    replay = client.post("/isabella/dispatch", content=body, headers=headers)
+
+    assert (replay.status_code, replay.json()["detail"]) == (401, "replayed_request")
+    # El replay no llegó al Ledger
+    assert ingestor.calls == 1
+
+
+def test_dispatch_hands_the_ingestor_the_payload_it_keyed_on(make_signer):
+    signer = make_signer()
+    ingestor = FakeIngestor()
+    client = _gate_app(ingestor)
+    body = json.dumps({"action": "CREATE_DREAMSPACE", "data": {"b": [1, 2.5], "a": "z"}}).encode()
+
+    response = client.post("/isabella/dispatch", content=body, headers=signer.headers("POST", "/isabella/dispatch", body))
+
+    assert response.status_code == 201
+    [payload] = ingestor.payloads
+    assert isinstance(payload, EncodedJSON)
+    assert payload.encoded == canonical_payload(dict(payload))
+
+
+def test_dispatch_rejects_numbers_jsonb_would_rewrite_before_ingest(make_signer):
+    signer = make_signer()
+    ingestor = FakeIngestor()
+    client = _gate_app(ingestor)
+    body = b'{"action":"CREATE_DREAMSPACE","data":{"power":1e16}}'
+
+    response = client.post("/isabella/dispatch", content=body, headers=signer.headers("POST", "/isabella/dispatch", body))
+
+    assert response.status_code == 400
+    assert "float_not_jsonb_stable" in response.json()["detail"]
+    assert ingestor.calls == 0
@@ -0,0 +1,89 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.core.chain import compute_integrity_hash  # noqa: E402
+from src.core.ingestor import SovereignIngestor  # noqa: E402
+from src.neural.burst_codec import BURST_SIZE, BURST_STRUCT, decode_burst, decode_burst_window  # noqa: E402
+
+
+def _burst(freq, power, burst_type):
+    return BURST_STRUCT.pack(freq, power, burst_type)
+
+
+@pytest.mark.parametrize("freq, power, burst_type", [(40.0, 100.0, 1), (0.0, 0.0, 0), (1234.5, 0.25, 255)])
+def test_burst_round_trips_through_the_fixed_layout(freq, power, burst_type):
+    frame = decode_burst(_burst(freq, power, burst_type))
+
+    assert BURST_SIZE == 9
+    assert frame == (freq, power, burst_type)
+
+
+def test_float32_fields_keep_single_precision():
+    frame = decode_burst(_burst(0.1, 3.3, 2))
+
+    assert frame.freq == pytest.approx(0.1, rel=1e-7) and frame.freq != 0.1
+    assert frame.burst_type == 2
+
+
+@pytest.mark.parametrize(
+    "burst",
+    [
+        b"",
+        b"\x00" * (BURST_SIZE - 1),
+        b"\x00" * (BURST_SIZE + 1),
+        _burst(float("nan"), 1.0, 0),
+        _burst(1.0, float("inf"), 0),
+        # JSON hex de la ráfaga (formato antiguo): ni el tamaño coincide
+        _burst(40.0, 100.0, 1).hex().encode(),
+    ],
+    ids=["empty", "short", "long", "nan_freq", "inf_power", "hex_text"],
+)
+def test_bad_bursts_are_rejected(burst):
+    with pytest.raises(ValueError):
+        decode_burst(burst)
+
+
+def test_window_decodes_every_burst_in_one_pass():
+    bursts = [_burst(10.0 * index, 5.0 * index, index % 3) for index in range(6)]
+
+    window = decode_burst_window(bursts)
+
+    assert window.dtype.names == ("freq", "power", "type")
+    assert window["freq"].tolist() == [0.0, 10.0, 20.0, 30.0, 40.0, 50.0]
+    assert window["type"].tolist() == [0, 1, 2, 0, 1, 2]
+    assert decode_burst_window([]).size == 0
+
+
+def test_short_and_long_bursts_that_add_up_do_not_misalign_the_window():
+    good = _burst(1.0, 2.0, 3)
+    # Juntas suman 2 * BURST_SIZE, pero cada una por separado es inválida
+    short, long_ = good[:-1], good + good[-1:]
+
+    with pytest.raises(ValueError, match="ráfaga 1"):
+        decode_burst_window([good, short, long_])
+
+
+def test_window_with_a_non_finite_burst_is_rejected():
+    with pytest.raises(ValueError, match="no finitos"):
+        decode_burst_window([_burst(1.0, 2.0, 0), _burst(1.0, -math.inf, 0)])
+
+
+def test_raw_burst_is_stored_outside_the_jsonb_and_sealed_by_the_hash():
+    burst = _burst(40.0, 100.0, 1)
+    frame = decode_burst(burst)
+    raw = {"action": "SINDÉRESIS_BURST", "binary_burst": True, "freq": frame.freq, "power": frame.power}
+    ingestor = SovereignIngestor(db=None, redis=None, sentinel=None)
+
+    pending = ingestor._prepare_crum(raw, {"trace_id": "VORTEX-STREAM"}, {"did": "did:tamv:a"}, False, binary_payload=burst)
+
+    assert pending.row["burst_blob"] == burst and pending.blob == burst
+    assert burst.hex() not in pending.payload_json
+    # Los campos tipados llenan la capa 2 (antes siempre 0)
+    assert raw["sensory_temp"] == 2.0
+    prev = "0" * 128
+    sealed = compute_integrity_hash(pending.crum_id, prev, pending.payload_json, pending.timestamp, pending.salt, burst)
+    unsealed = compute_integrity_hash(pending.crum_id, prev, pending.payload_json, pending.timestamp, pending.salt)
+    assert sealed != unsealed
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+from src.core.chain import GENESIS_HASH, GLOBAL_CHAIN, chain_genesis, compute_integrity_hash, link_chain
+
+
+def test_integrity_hash_is_timezone_independent():
+    utc = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    local = utc.astimezone(timezone(timedelta(hours=-6)))
+
+    assert compute_integrity_hash("c", GENESIS_HASH, "{}", utc, "s") == \
+        compute_integrity_hash("c", GENESIS_HASH, "{}", local, "s")
+
+
+def test_integrity_hash_covers_the_blob():
+    timestamp = datetime.now(timezone.utc)
+    plain = compute_integrity_hash("c", GENESIS_HASH, "{}", timestamp, "s")
+    with_blob = compute_integrity_hash("c", GENESIS_HASH, "{}", timestamp, "s", b"\x01\x02")
+
+    assert plain != with_blob
+    assert with_blob != compute_integrity_hash("c", GENESIS_HASH, "{}", timestamp, "s", b"\x01\x03")
+
+
+def test_link_chain_links_rows_in_order(make_pending):
+    pendings = [make_pending(payload_json=f'{{"n":{n}}}') for n in range(5)]
+
+    head = link_chain(GENESIS_HASH, pendings, start_height=10)
+
+    previous = GENESIS_HASH
+    for offset, pending in enumerate(pendings, start=1):
+        assert pending.row["parent_hash"] == previous
+        assert pending.row["integrity_hash"] == pending.integrity_hash
+        assert pending.row["integrity_salt"] == pending.salt
+        assert pending.row["chain_height"] == 10 + offset
+        assert pending.integrity_hash == compute_integrity_hash(
+            pending.crum_id, previous, pending.payload_json, pending.timestamp, pending.salt
+        )
+        previous = pending.integrity_hash
+    assert head == pendings[-1].integrity_hash
+
+
+def test_link_chain_without_height_leaves_it_unset(make_pending):
+    pending = make_pending()
+
+    link_chain(GENESIS_HASH, [pending])
+
+    assert "chain_height" not in pending.row
+
+
+def test_shard_genesis_is_derived_and_distinct():
+    assert chain_genesis() == chain_genesis(GLOBAL_CHAIN) == GENESIS_HASH
+    assert chain_genesis("shard-0") != GENESIS_HASH
+    assert chain_genesis("shard-0") != chain_genesis("shard-1")
+    assert len(chain_genesis("shard-0")) == len(GENESIS_HASH)
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis ejecuta los scripts Lua del lease con lupa
+
+from src.core.chain_lease import ChainLease, LeaseTimeoutError  # noqa: E402
+
+
+def _lease(redis, node_id, **kwargs):
+    kwargs.setdefault("ttl_ms", 3000)
+    return ChainLease(redis, node_id=node_id, poll_max_ms=5.0, **kwargs)
+
+
+def test_acquire_renew_and_fencing_tokens():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        first = _lease(redis, "node-a")
+        assert await first.ensure() is True
+        token = first.token
+        # Renovar no es una tenencia nueva ni cambia el token
+        assert await first.ensure() is False
+        assert first.token == token and first.held
+
+        await first.release()
+        assert not first.held
+        second = _lease(redis, "node-b")
+        assert await second.ensure() is True
+        return token, second.token
+
+    first_token, second_token = asyncio.run(scenario())
+
+    assert second_token > first_token
+
+
+def test_contender_waits_and_holder_is_asked_to_yield():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        holder = _lease(redis, "node-a", min_hold_ms=0.0)
+        waiter = _lease(redis, "node-b")
+        await holder.ensure()
+
+        with pytest.raises(LeaseTimeoutError):
+            await waiter.ensure(timeout_s=0.02)
+        assert waiter.token == 0
+
+        # La siguiente renovación del titular ve que hay alguien esperando
+        await holder.ensure()
+        assert holder.should_yield()
+        await holder.release()
+
+        assert await waiter.ensure(timeout_s=1.0) is True
+        return holder.token, waiter.token
+
+    holder_token, waiter_token = asyncio.run(scenario())
+
+    assert holder_token == 0
+    assert waiter_token > 0
+
+
+def test_release_of_a_lost_lease_does_not_evict_the_new_owner():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        stale = _lease(redis, "node-a", ttl_ms=50)
+        await stale.ensure()
+        await asyncio.sleep(0.08)  # El lease expira (pausa larga, partición)
+        assert not stale.held
+
+        owner = _lease(redis, "node-b")
+        assert await owner.ensure(timeout_s=1.0) is True
+        await stale.release()
+        # El titular nuevo conserva el lease y el token sigue siendo monotónico
+        assert await owner.ensure() is False
+        return stale.token, owner.token, await redis.get("ledger:lease:global")
+
+    stale_token, owner_token, owner_id = asyncio.run(scenario())
+
+    assert stale_token == 0
+    assert owner_token == 2
+    assert owner_id == b"node-b"
+
+
+def test_first_acquire_after_a_redis_restart_reseeds_the_fence_from_the_ledger():
+    persisted = {"fence": 0}
+    loads = []
+
+    async def fence_floor():
+        loads.append(persisted["fence"])
+        return persisted["fence"]
+
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        lease = _lease(redis, "node-a", fence_floor=fence_floor)
+        await lease.ensure()
+        await lease.release()
+        await lease.ensure()
+        # tamv_chain_heads guardó el último token que avanzó la cabeza
+        persisted["fence"] = lease.token
+
+        await redis.flushall()  # Reinicio de Redis sin persistencia
+        restarted = _lease(redis, "node-b", fence_floor=fence_floor)
+        await restarted.ensure()
+        restarted_token = restarted.token
+        await restarted.release()
+        later = _lease(redis, "node-c", fence_floor=fence_floor)
+        await later.ensure()
+
+        await redis.flushall()
+        unseeded = _lease(redis, "node-d")
+        await unseeded.ensure()
+        return restarted_token, later.token, unseeded.token
+
+    restarted_token, later_token, unseeded_token = asyncio.run(scenario())
+
+    assert persisted["fence"] == 2
+    # Por encima del fence persistido, así que el CAS de la cabeza lo acepta
+    assert (restarted_token, later_token) == (3, 4)
+    # Solo se consulta la base cuando el contador de Redis no existía
+    assert loads == [0, 2]
+    # Sin lector, el contador vuelve a 1 y el CAS lo rechazaría
+    assert unseeded_token == 1
@@ -0,0 +1,164 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core import container as container_module
+from src.core.chain_head import ChainHead
+from src.core.container import ContainerSettings, ServiceContainer, lifespan
+from src.core.ledger_writer import LedgerWriter
+from src.core.sharding import ShardedLedgerWriter
+
+
+@pytest.fixture
+def build(tmp_path):
+    """Construye contenedores sobre SQLite (sin conectar) y libera sus pools al final."""
+    pytest.importorskip("aiosqlite")
+    built = []
+
+    def factory(**overrides):
+        settings = ContainerSettings(database_url=f"sqlite+aiosqlite:///{tmp_path / 'ledger.db'}", **overrides)
+        container = ServiceContainer(settings)
+        built.append(container)
+        container.build()
+        return container
+
+    yield factory
+
+    async def close():
+        for container in built:
+            await container.engine.dispose()
+            await container.redis.aclose()
+            if container.signature_verifier is not None:
+                container.signature_verifier.close()
+
+    asyncio.run(close())
+
+
+def test_single_chain_build_shares_one_writer(build):
+    container = build()
+
+    assert type(container.writer) is LedgerWriter
+    assert isinstance(container.writer.chain_head, ChainHead)
+    assert container.writer.lease is None
+    assert container.committer.writer is container.writer
+    assert container.ingestor.writer is container.writer
+    assert container.ingestor.committer is container.committer
+    assert container.writer.outbox is container.outbox and container.relay is not None
+    assert container.creator_policy.redis is container.redis
+
+
+def test_leased_build_reseeds_the_fence_from_the_chain_heads(build):
+    container = build(chain_lease=True)
+
+    assert container.writer.lease.chain_key == "global"
+    assert container.writer.lease.fence_floor is not None
+
+
+def test_sharded_build_drops_global_stats_and_leases_per_chain(build):
+    container = build(shard_mode="creator", chain_lease=True, outbox=False)
+
+    assert isinstance(container.writer, ShardedLedgerWriter)
+    assert container.stats is None and container.relay is None
+    assert container.ingestor.outboxed is False
+
+
+def test_spool_cannot_be_combined_with_sharding(tmp_path):
+    container = ServiceContainer(ContainerSettings(spool_dir=str(tmp_path), shard_mode="bucket"))
+
+    with pytest.raises(ValueError):
+        container.build()
+
+
+def test_settings_are_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("TAMV_DB_POOL_SIZE", "40")
+    monkeypatch.setenv("TAMV_CHAIN_LEASE", "yes")
+    monkeypatch.setenv("TAMV_GROUP_COMMIT_WAIT_MS", "0.5")
+    monkeypatch.setenv("TAMV_SPOOL_DIR", "")
+
+    settings = ContainerSettings.from_env()
+
+    assert (settings.db_pool_size, settings.chain_lease, settings.group_commit_wait_ms) == (40, True, 0.5)
+    assert settings.spool_dir is None
+
+
+class Component:
+    """Componente que anota en `log` cuándo se detiene; `fail` simula un drenado que revienta."""
+
+    def __init__(self, log, name, fail=False):
+        self.log, self.name, self.fail = log, name, fail
+
+    async def _stop(self):
+        self.log.append(self.name)
+        if self.fail:
+            raise RuntimeError(f"{self.name}_failed")
+
+    close = stop = release = aclose = dispose = _stop
+
+
+def test_stop_drains_in_order_even_when_a_component_fails():
+    log = []
+    container = ServiceContainer(ContainerSettings(drain_timeout_s=1.0))
+    container.spool = Component(log, "spool", fail=True)
+    container.committer = Component(log, "group_commit")
+    container.relay = Component(log, "outbox_relay")
+    container.broadcaster = Component(log, "crisis_broadcaster")
+    container.writer = SimpleNamespace(lease=Component(log, "chain_lease"))
+    container.signature_verifier = SimpleNamespace(close=lambda: log.append("signatures"))
+    container.redis = Component(log, "redis")
+    container.engine = Component(log, "engine")
+
+    async def scenario():
+        background = asyncio.Event()
+        container._spawn(background.wait(), "tamv-test")
+        await container.stop()
+        return container._tasks
+
+    assert asyncio.run(scenario()) == []
+    assert log == [
+        "spool", "group_commit", "outbox_relay", "crisis_broadcaster", "chain_lease", "signatures", "redis", "engine",
+    ]
+
+
+def test_lifespan_publishes_the_container_services_on_app_state(monkeypatch):
+    events = []
+
+    async def start(self):
+        events.append("start")
+        self.idempotency, self.signature_verifier, self.creator_policy = "idem", "verifier", "policy"
+
+    async def stop(self):
+        events.append("stop")
+
+    monkeypatch.setattr(ServiceContainer, "start", start)
+    monkeypatch.setattr(ServiceContainer, "stop", stop)
+    app = FastAPI(lifespan=lifespan)
+    app.state.settings = ContainerSettings(profile_endpoint=True)
+
+    with TestClient(app):
+        state = app.state
+        assert isinstance(state.container, ServiceContainer)
+        assert state.container.settings is app.state.settings
+        assert (state.idempotency, state.signature_verifier, state.creator_policy) == ("idem", "verifier", "policy")
+        assert state.profile_endpoint is True
+        assert events == ["start"]
+
+    assert events == ["start", "stop"]
+
+
+def test_sensory_gate_builds_one_mapper_per_app():
+    pytest.importorskip("numpy")
+    from src.api.v1.sensory_gate import get_mapper
+    from src.neural.synapse_mapper import SynapseMapper
+
+    app = SimpleNamespace(state=SimpleNamespace())
+    first = get_mapper(SimpleNamespace(app=app))
+    second = get_mapper(SimpleNamespace(app=app))
+    other = get_mapper(SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace())))
+
+    assert isinstance(first, SynapseMapper)
+    assert first is second and other is not first
+    # El contenedor ya no intenta importar el árbol neural
+    assert not hasattr(container_module, "SynapseMapper")
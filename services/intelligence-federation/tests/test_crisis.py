@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import pytest
+
+from src.security.anubis import AnubisSentinel
+from src.security.crisis import CrisisBroadcaster
+
+
+class RecordingRedis:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+    def register_script(self, script):
+        return None
+
+    def crisis(self):
+        return [event for channel, event in self.published if channel == "anubis:crisis_channel"]
+
+
+def test_repeated_signal_is_published_once_and_summarized_on_flush():
+    redis = RecordingRedis()
+    broadcaster = CrisisBroadcaster(redis)
+
+    async def scenario():
+        published = [await broadcaster.signal("LEDGER", "INGESTOR_FAILURE", 75.0) for _ in range(5)]
+        await broadcaster.signal("LEDGER", "INGESTOR_FAILURE", 99.0, status="LOCKDOWN")
+        await broadcaster.flush()
+        return published
+
+    published = asyncio.run(scenario())
+
+    assert published == [True, False, False, False, False]
+    first, summary = redis.crisis()
+    assert first["count"] == 1 and "summary" not in first
+    assert (summary["count"], summary["status"], summary["threatLevel"], summary["summary"]) == (5, "LOCKDOWN", 99.0, True)
+
+
+def test_anchor_notifications_travel_in_one_batch_and_count_drops():
+    redis = RecordingRedis()
+    broadcaster = CrisisBroadcaster(redis, max_pending_anchors=3)
+    for index in range(5):
+        broadcaster.anchored({"crum_id": str(index)})
+
+    asyncio.run(broadcaster.flush())
+
+    [(channel, batch)] = redis.published
+    assert channel == "ledger:anchor_channel"
+    assert (batch["count"], batch["dropped"]) == (3, 2)
+    assert [crum["crum_id"] for crum in batch["crums"]] == ["2", "3", "4"]
+
+
+def test_storm_summary_denies_every_sampled_ip_on_other_replicas():
+    redis = RecordingRedis()
+    broadcaster = CrisisBroadcaster(redis, max_immediate=2, max_overflow_samples=6)
+    replica = AnubisSentinel(redis)
+    attackers = [f"10.0.0.{index}" for index in range(10)]
+
+    async def storm():
+        for ip in attackers:
+            await broadcaster.signal(ip, "BRUTE_FORCE_DETECTED", 80.0, source_ip=ip)
+        await broadcaster.flush()
+
+    asyncio.run(storm())
+    for event in redis.crisis():
+        replica._apply_crisis_event(event)
+
+    summary = redis.crisis()[-1]
+    assert summary["source"] == "*" and "source_ip" not in summary
+    assert summary["unsampled"] == 2
+    # Dos publicadas al instante + seis de la muestra del resumen
+    assert [replica.is_ip_allowed(ip) for ip in attackers] == [False] * 8 + [True] * 2
+
+    replica._apply_crisis_event({"status": "CLEARED", "source_ips": attackers[2:4]})
+    assert replica.is_ip_allowed(attackers[2]) and not replica.is_ip_allowed(attackers[4])
+
+
+def test_listener_applies_summaries_from_the_crisis_channel():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        broadcaster = CrisisBroadcaster(redis, max_immediate=0)
+        replica = AnubisSentinel(redis)
+        listener = asyncio.create_task(replica.listen_crisis_channel())
+        await asyncio.sleep(0.05)
+        for ip in ("192.0.2.1", "192.0.2.2"):
+            await broadcaster.signal(ip, "BRUTE_FORCE_DETECTED", 90.0, source_ip=ip)
+        await broadcaster.flush()
+        for _ in range(50):
+            if not replica.is_ip_allowed("192.0.2.2"):
+                break
+            await asyncio.sleep(0.01)
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        return replica.is_ip_allowed("192.0.2.1"), replica.is_ip_allowed("192.0.2.2")
+
+    assert asyncio.run(scenario()) == (False, False)
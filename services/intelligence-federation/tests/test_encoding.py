@@ -0,0 +1,80 @@
+import json
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from src.core import encoding
+from src.core.encoding import EncodedJSON, canonical_payload, dumps, encode_payload, json_serializer, payload_text
+
+
+def _shuffled(value, rng):
+    """Mismo contenido con otro orden de inserción de claves, a cualquier profundidad."""
+    if isinstance(value, dict):
+        keys = list(value)
+        rng.shuffle(keys)
+        return {key: _shuffled(value[key], rng) for key in keys}
+    if isinstance(value, list):
+        return [_shuffled(item, rng) for item in value]
+    return value
+
+
+PAYLOAD = {
+    "action": "CREATE_DREAMSPACE",
+    "risk": "low",
+    "data": {"zeta": [1, 2.5, {"b": None, "a": True}], "alpha": "ñandú ✓", "mid": {"y": -3, "x": 10 ** 17}},
+}
+
+
+def test_canonical_text_ignores_key_insertion_order():
+    rng = random.Random(7)
+    texts = {canonical_payload(_shuffled(PAYLOAD, rng)) for _ in range(20)}
+
+    assert len(texts) == 1
+    [text] = texts
+    assert text.startswith('{"action":"CREATE_DREAMSPACE","data":{"alpha":"\\u00f1and\\u00fa \\u2713"')
+    assert json.loads(text) == PAYLOAD
+
+
+def test_encoded_payload_is_a_dict_that_keeps_its_hashed_text():
+    encoded = encode_payload(PAYLOAD)
+
+    assert isinstance(encoded, dict) and encoded == PAYLOAD
+    assert encoded.encoded == canonical_payload(PAYLOAD)
+    again = EncodedJSON.from_encoded(encoded.encoded)
+    assert again == encoded and again.encoded is encoded.encoded
+
+
+def test_encoded_text_is_reused_by_storage_and_hashing(monkeypatch):
+    encoded = encode_payload(PAYLOAD)
+
+    def recode(_):
+        raise AssertionError("payload re-serializado")
+
+    monkeypatch.setattr(encoding, "canonical_payload", recode)
+
+    # El engine escribe el JSONB con el mismo objeto str que entró al hash
+    assert json_serializer(encoded) is encoded.encoded
+    assert payload_text(encoded) is encoded.encoded
+
+
+def test_plain_dicts_are_canonicalized_for_hashing_and_compacted_for_storage():
+    assert payload_text({"b": 1, "a": 2}) == '{"a":2,"b":1}'
+    assert json.loads(json_serializer({"b": 1, "a": 2})) == {"a": 2, "b": 1}
+    assert " " not in json_serializer({"b": [1, 2], "a": {"c": 3}})
+
+
+@pytest.mark.parametrize("orjson", ["installed", "missing"])
+def test_fan_out_dumps_is_compact_json_with_or_without_orjson(monkeypatch, orjson):
+    if orjson == "missing":
+        monkeypatch.setattr(encoding, "orjson", None)
+    elif encoding.orjson is None:
+        pytest.skip("orjson no instalado")
+
+    message = {"crum_id": "c-1", "at": datetime(2025, 1, 1, tzinfo=timezone.utc), "n": [1, 2]}
+
+    text = dumps(message)
+
+    assert ", " not in text and '": ' not in text
+    assert json.loads(text)["n"] == [1, 2]
+    assert json.loads(text)["at"].startswith("2025-01-01")
@@ -0,0 +1,99 @@
+import asyncio
+
+from sqlalchemy.exc import DataError
+
+from src.core.chain import IntegrityError
+from src.core.group_commit import GroupCommitter
+
+
+def _data_error():
+    return DataError("INSERT INTO tamv_crums_ledger", {}, Exception("value too long for type character varying(64)"))
+
+
+class FakeSession:
+    def __init__(self):
+        self.rollbacks = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeWriter:
+    """Anexa en memoria; falla el lote entero si contiene una fila marcada."""
+
+    def __init__(self, error=_data_error):
+        self.error = error
+        self.anchored = []
+        self.calls = 0
+
+    def shard_key(self, pending):
+        return None
+
+    async def append(self, session, pendings):
+        self.calls += 1
+        if any(pending.row.get("bad") for pending in pendings):
+            raise self.error()
+        self.anchored.extend(pending.crum_id for pending in pendings)
+
+
+def _submit_all(writer, pendings):
+    async def scenario():
+        committer = GroupCommitter(FakeSession, writer, max_batch=64, max_wait_ms=5)
+        committer.start()
+        try:
+            return await asyncio.gather(*(committer.submit(p) for p in pendings), return_exceptions=True)
+        finally:
+            await committer.stop()
+
+    return asyncio.run(scenario())
+
+
+def test_bisection_fails_only_the_offending_row(make_pending):
+    pendings = [make_pending(bad=index == 5) for index in range(16)]
+    writer = FakeWriter()
+
+    results = _submit_all(writer, pendings)
+
+    failed = [index for index, result in enumerate(results) if isinstance(result, Exception)]
+    assert failed == [5]
+    assert isinstance(results[5], DataError)
+    # El resto se ancla, y en el orden de llegada
+    assert writer.anchored == [p.crum_id for index, p in enumerate(pendings) if index != 5]
+
+
+def test_chain_integrity_error_fails_the_whole_group(make_pending):
+    pendings = [make_pending(bad=index == 3) for index in range(8)]
+    writer = FakeWriter(error=lambda: IntegrityError("chain_broken"))
+
+    results = _submit_all(writer, pendings)
+
+    assert all(isinstance(result, IntegrityError) for result in results)
+    assert writer.anchored == []
+    # Sin bisección: un único intento para el lote
+    assert writer.calls == 1
+
+
+def test_database_outage_fails_the_group_without_bisecting(make_pending):
+    pendings = [make_pending(bad=True) for _ in range(32)]
+    writer = FakeWriter(error=lambda: ConnectionError("connection_lost"))
+
+    results = _submit_all(writer, pendings)
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert writer.calls == 1
+
+
+def test_clean_batch_commits_in_one_transaction(make_pending):
+    pendings = [make_pending() for _ in range(10)]
+    writer = FakeWriter()
+
+    results = _submit_all(writer, pendings)
+
+    assert results == pendings
+    assert writer.calls == 1
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+idempotency = pytest.importorskip("src.core.idempotency")
+IdempotencyCache = idempotency.IdempotencyCache
+IdempotencyConflict = idempotency.IdempotencyConflict
+idempotency_key = idempotency.idempotency_key
+payload_digest = idempotency.payload_digest
+
+
+class FakeRedis:
+    """Lo justo de redis.asyncio para el reclamo SET NX compartido entre réplicas."""
+
+    def __init__(self):
+        self.values = {}
+
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        await asyncio.sleep(0)
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    async def get(self, key):
+        await asyncio.sleep(0)
+        return self.values.get(key)
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+
+class DownRedis:
+    async def set(self, *args, **kwargs):
+        raise ConnectionError("redis_down")
+
+    async def get(self, *args, **kwargs):
+        raise ConnectionError("redis_down")
+
+    async def delete(self, *args, **kwargs):
+        raise ConnectionError("redis_down")
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"crum_id": f"crum-{self.calls}"}
+
+
+KEY = idempotency_key("did:tamv:a", "trace-1", "{}")
+DIGEST = payload_digest("{}")
+
+
+def test_key_is_scoped_to_creator_and_ignores_signature_noise():
+    assert idempotency_key("did:tamv:a", "t", "{}") != idempotency_key("did:tamv:b", "t", "{}")
+    # Sin trace-id, el mismo cuerpo es el mismo reintento
+    assert idempotency_key("did:tamv:a", None, "{}") == idempotency_key("did:tamv:a", None, "{}")
+    assert idempotency_key("did:tamv:a", None, "{}") != idempotency_key("did:tamv:a", None, '{"x":1}')
+
+
+def test_retry_replays_the_original_response():
+    compute = Counter()
+
+    async def scenario():
+        cache = IdempotencyCache()
+        first = await cache.run(KEY, DIGEST, compute)
+        second = await cache.run(KEY, DIGEST, compute)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first == ({"crum_id": "crum-1"}, False)
+    assert second == ({"crum_id": "crum-1"}, True)
+    assert compute.calls == 1
+
+
+def test_reused_key_with_another_payload_is_a_conflict():
+    compute = Counter()
+
+    async def scenario():
+        cache = IdempotencyCache()
+        await cache.run(KEY, DIGEST, compute)
+        with pytest.raises(IdempotencyConflict, match="idempotency_key_reused"):
+            await cache.run(KEY, payload_digest('{"x":1}'), compute)
+
+    asyncio.run(scenario())
+    assert compute.calls == 1
+
+
+def test_replicas_share_one_execution_through_redis():
+    redis = FakeRedis()
+    compute = Counter()
+
+    async def scenario():
+        replicas = [IdempotencyCache(redis=redis) for _ in range(3)]
+        runs = [replica.run(KEY, DIGEST, compute) for replica in replicas for _ in range(4)]
+        results = await asyncio.gather(*runs)
+        # Una réplica nueva (caché local vacía) ve el registro con el hash del payload
+        late = IdempotencyCache(redis=redis)
+        with pytest.raises(IdempotencyConflict):
+            await late.run(KEY, payload_digest('{"x":1}'), compute)
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert compute.calls == 1
+    assert {response["crum_id"] for response, _ in results} == {"crum-1"}
+    assert sum(not replay for _, replay in results) == 1
+
+
+def test_failed_compute_releases_the_claim():
+    redis = FakeRedis()
+
+    async def failing():
+        raise RuntimeError("ledger_down")
+
+    async def scenario():
+        cache = IdempotencyCache(redis=redis)
+        with pytest.raises(RuntimeError):
+            await cache.run(KEY, DIGEST, failing)
+        return await IdempotencyCache(redis=redis).run(KEY, DIGEST, Counter())
+
+    assert asyncio.run(scenario()) == ({"crum_id": "crum-1"}, False)
+
+
+def test_redis_outage_degrades_to_local_cache():
+    compute = Counter()
+
+    async def scenario():
+        cache = IdempotencyCache(redis=DownRedis())
+        return [await cache.run(KEY, DIGEST, compute) for _ in range(2)]
+
+    first, second = asyncio.run(scenario())
+
+    assert first == ({"crum_id": "crum-1"}, False)
+    assert second == ({"crum_id": "crum-1"}, True)
+    assert compute.calls == 1
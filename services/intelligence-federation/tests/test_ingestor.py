@@ -0,0 +1,26 @@
+from src.core.encoding import encode_payload
+from src.core.ingestor import SovereignIngestor
+
+
+def _ingestor():
+    return SovereignIngestor(db=None, redis=None, sentinel=None)
+
+
+def test_pre_encoded_payload_is_hashed_and_stored_without_re_encoding():
+    encoded = encode_payload({"action": "CREATE_DREAMSPACE", "data": {"z": 1, "a": [0.25]}})
+
+    pending = _ingestor()._prepare_crum(encoded, {"trace_id": "t-1"}, {"did": "did:tamv:a", "signature": "ab"}, False)
+
+    assert pending.row["payload"] is encoded
+    assert pending.payload_json is encoded.encoded
+    assert pending.row["origin"] == "signed"
+
+
+def test_sensor_burst_is_encoded_after_the_synapse_shift():
+    raw = {"action": "SINDÉRESIS_BURST", "binary_burst": True, "freq": 40.0, "power": 100.0, "burst_type": 1}
+
+    pending = _ingestor()._prepare_crum(raw, {"trace_id": "VORTEX-STREAM"}, {"did": "did:tamv:a", "origin": "sensor"}, False)
+
+    assert '"sensory_temp":2.0' in pending.payload_json
+    assert pending.row["payload"].encoded == pending.payload_json
+    assert pending.row["origin"] == "sensor"
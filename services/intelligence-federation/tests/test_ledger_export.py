@@ -0,0 +1,169 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from src.core.ledger_export import ExportFilter, stream_ndjson
+from src.models.sovereign_event import RiskLevel
+
+T0 = datetime(2025, 5, 1, tzinfo=timezone.utc)
+
+
+def _row(index):
+    return SimpleNamespace(
+        id=uuid.UUID(int=index),
+        canonical_id=f"TAMV-20250501-{index:08x}",
+        chain_height=index,
+        action_type="DISPATCH",
+        creator_did="did:tamv:alice",
+        risk_level=RiskLevel.HIGH,
+        integrity_hash=f"h{index}",
+        parent_hash=f"h{index - 1}",
+        payload={"n": index},
+        created_at=T0 + timedelta(seconds=index),
+    )
+
+
+class PagedSession:
+    """Devuelve las filas en el orden keyset, respetando el LIMIT de cada consulta."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.served = 0
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        size = stmt._limit_clause.value
+        page, self.served = self.rows[self.served:self.served + size], self.served + size
+        return SimpleNamespace(all=lambda: page)
+
+
+def _export(session, flt=None, **kwargs):
+    async def collect():
+        return [chunk async for chunk in stream_ndjson(session, flt or ExportFilter(), **kwargs)]
+
+    return asyncio.run(collect())
+
+
+def _sql(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_pages_follow_the_keyset_cursor_without_offset():
+    session = PagedSession([_row(index) for index in range(1, 8)])
+
+    chunks = _export(session, chunk_size=3)
+
+    assert len(chunks) == 3
+    records = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    assert [record["chain_height"] for record in records] == list(range(1, 8))
+    assert records[0]["risk"] == "high" and records[0]["created_at"] == (T0 + timedelta(seconds=1)).isoformat()
+    first, second, _ = session.statements
+    assert "OFFSET" not in _sql(second)
+    assert "(tamv_crums_ledger.created_at, tamv_crums_ledger.id) >" not in _sql(first)
+    assert "(tamv_crums_ledger.created_at, tamv_crums_ledger.id) >" in _sql(second)
+    params = second.compile().params
+    assert (params["param_1"], params["param_2"]) == (T0 + timedelta(seconds=3), uuid.UUID(int=3))
+
+
+def test_limit_caps_the_last_page():
+    session = PagedSession([_row(index) for index in range(1, 20)])
+
+    chunks = _export(session, chunk_size=4, limit=6)
+
+    assert [len(chunk.decode().splitlines()) for chunk in chunks] == [4, 2]
+    assert [stmt._limit_clause.value for stmt in session.statements] == [4, 2]
+
+
+def test_filters_become_where_clauses():
+    session = PagedSession([])
+    flt = ExportFilter(
+        creator_did="did:tamv:alice",
+        creator_fingerprint="ab" * 32,
+        since=T0,
+        risk_levels=["high", "critical"],
+        action_type="DISPATCH",
+    )
+
+    assert _export(session, flt) == []
+    sql = _sql(session.statements[0])
+    for clause in ("creator_did =", "creator_fingerprint =", "created_at >=", "risk_level IN", "action_type ="):
+        assert f"tamv_crums_ledger.{clause}" in sql
+    assert "created_at <" not in sql.replace("created_at >=", "")
+
+
+# ====== Autorización de /ledger/export ======
+
+class AllowAll:
+    def is_ip_allowed(self, ip):
+        return True
+
+
+@pytest.fixture
+def export_app(monkeypatch, make_signer):
+    from src.api.v1 import gate
+    from src.core.auth import CreatorPolicy
+    from src.database import get_db
+    from src.security.signatures import Ed25519Verifier
+
+    auditor = make_signer(did="did:tamv:auditor")
+    filters = []
+
+    async def fake_stream(session, flt, limit=None):
+        filters.append(flt)
+        yield b'{"crum_id":"x"}\n'
+
+    monkeypatch.setattr(gate, "stream_ndjson", fake_stream)
+    app = FastAPI()
+    app.include_router(gate.router)
+    app.dependency_overrides[get_db] = lambda: SimpleNamespace(bind=None)
+    app.state.container = SimpleNamespace(sentinel=AllowAll())
+    app.state.signature_verifier = Ed25519Verifier()
+    app.state.creator_policy = CreatorPolicy(auditor_fingerprints=frozenset({auditor.fingerprint}))
+    client = TestClient(app)
+    path = "/isabella/ledger/export"
+
+    def export(signer, **params):
+        query = urlencode(params, doseq=True)
+        return client.get(f"{path}?{query}" if query else path, headers=signer.headers("GET", path, query=query))
+
+    return export, filters, auditor
+
+
+def test_creator_cannot_export_another_did(export_app, make_signer):
+    export, filters, _ = export_app
+
+    response = export(make_signer(did="did:tamv:alice"), creator_did="did:tamv:bob")
+
+    assert (response.status_code, response.json()["detail"]) == (403, "auditor_role_required")
+    assert filters == []
+
+
+def test_creator_export_is_pinned_to_its_did_and_signing_key(export_app, make_signer):
+    export, filters, _ = export_app
+    alice = make_signer(did="did:tamv:alice")
+
+    implicit = export(alice, risk_level=["high"])
+    explicit = export(alice, creator_did="did:tamv:alice")
+
+    assert implicit.status_code == explicit.status_code == 200
+    assert implicit.headers["content-type"] == "application/x-ndjson"
+    assert [(flt.creator_did, flt.creator_fingerprint) for flt in filters] == [("did:tamv:alice", alice.fingerprint)] * 2
+    assert filters[0].risk_levels == ["high"]
+
+
+def test_auditor_exports_any_did_or_everything(export_app):
+    export, filters, auditor = export_app
+
+    assert export(auditor, creator_did="did:tamv:bob").status_code == 200
+    assert export(auditor).status_code == 200
+
+    assert [(flt.creator_did, flt.creator_fingerprint) for flt in filters] == [("did:tamv:bob", None), (None, None)]
@@ -0,0 +1,132 @@
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from src.core.ledger_stats import LedgerStats
+from src.models.sovereign_event import RiskLevel
+
+
+class ScriptedSession:
+    """
+    Sesión que responde cada execute con el siguiente resultado del guion
+    (marca, recuento por acción, por riesgo, contadores guardados) y anota
+    las sentencias que se salen del guion (los upserts de corrección).
+    """
+
+    def __init__(self, mark, actions, risks, stored, on_mark=None):
+        self.script = [
+            SimpleNamespace(scalar=lambda: mark),
+            SimpleNamespace(all=lambda: actions),
+            SimpleNamespace(all=lambda: risks),
+            SimpleNamespace(all=lambda: [SimpleNamespace(dimension=d, value=v, count=n) for (d, v), n in stored.items()]),
+        ]
+        self.on_mark = on_mark
+        self.writes = []
+        self.commits = 0
+        self.isolation = None
+
+    async def connection(self, execution_options=None):
+        self.isolation = execution_options["isolation_level"]
+
+    async def execute(self, stmt):
+        if not self.script:
+            self.writes.append(stmt)
+            return None
+        result = self.script.pop(0)
+        if self.on_mark is not None and not hasattr(result, "all"):
+            # Un lote propio se confirma mientras la reconciliación cuenta
+            self.on_mark()
+        return result
+
+    async def commit(self):
+        self.commits += 1
+
+
+def _pending(action, risk):
+    return SimpleNamespace(row={"action_type": action, "risk_level": risk})
+
+
+def test_batch_deltas_count_actions_and_normalize_risk_names():
+    deltas = LedgerStats.batch_deltas([
+        _pending("DISPATCH", RiskLevel.HIGH),
+        _pending("DISPATCH", "low"),
+        _pending("SINDÉRESIS_BURST", "LOW"),
+    ])
+
+    assert deltas == Counter({
+        ("action", "DISPATCH"): 2, ("action", "SINDÉRESIS_BURST"): 1, ("risk", "HIGH"): 1, ("risk", "LOW"): 2,
+    })
+
+
+def test_apply_moves_height_and_head_without_touching_the_table():
+    stats = LedgerStats()
+    stats.apply(Counter({("action", "A"): 3, ("risk", "LOW"): 3}), "hash-3", height=3)
+    stats.apply(Counter({("action", "B"): 1, ("risk", "HIGH"): 1}), "hash-4", height=4)
+
+    snapshot = stats.snapshot()
+
+    assert (snapshot["ledger_height"], snapshot["last_hash"]) == (4, "hash-4")
+    assert snapshot["by_action"] == {"A": 3, "B": 1}
+    assert snapshot["by_risk"] == {"LOW": 3, "HIGH": 1}
+    assert snapshot["last_reconciled"] is None
+
+
+def test_reconcile_persists_only_the_drift_as_a_delta():
+    stats = LedgerStats()
+    stats.apply(Counter({("action", "A"): 5, ("risk", "LOW"): 5}), "hash-5", height=5)
+    session = ScriptedSession(
+        mark=6,
+        actions=[("A", 6)],
+        risks=[("low", 4), (RiskLevel.HIGH, 2)],
+        stored={("action", "A"): 5, ("risk", "LOW"): 5},
+    )
+
+    drift = asyncio.run(stats.reconcile(session))
+
+    assert session.isolation == "REPEATABLE READ"
+    assert drift == 4  # +1 A, -1 LOW, +2 HIGH frente a memoria
+    assert stats.height == 6
+    [upsert] = session.writes
+    params = upsert.compile(dialect=postgresql.dialect()).params
+    corrections = {(params[f"dimension_m{i}"], params[f"value_m{i}"]): params[f"count_m{i}"] for i in range(3)}
+    assert corrections == {("action", "A"): 1, ("risk", "LOW"): -1, ("risk", "HIGH"): 2}
+
+
+def test_batches_committed_during_reconcile_are_replayed_above_the_mark():
+    stats = LedgerStats()
+    concurrent = Counter({("action", "A"): 2, ("risk", "LOW"): 2})
+    below = Counter({("action", "A"): 1, ("risk", "LOW"): 1})
+
+    def commit_during_count():
+        stats.apply(below, "hash-10", height=10)  # Ya dentro del snapshot
+        stats.apply(concurrent, "hash-12", height=12)
+
+    session = ScriptedSession(
+        mark=10,
+        actions=[("A", 10)],
+        risks=[("LOW", 10)],
+        stored={("action", "A"): 10, ("risk", "LOW"): 10},
+        on_mark=commit_during_count,
+    )
+
+    asyncio.run(stats.reconcile(session))
+
+    # Sin deriva persistida; en memoria: snapshot + solo el lote por encima de la marca
+    assert session.writes == []
+    assert stats.snapshot()["by_action"] == {"A": 12}
+    assert stats.height == 12 and stats.last_hash == "hash-12"
+    assert stats._since_reconcile is None
+
+
+def test_reconcile_reports_a_broken_link():
+    async def broken(session):
+        return False
+
+    stats = LedgerStats()
+    session = ScriptedSession(mark=0, actions=[], risks=[], stored={})
+
+    assert asyncio.run(stats.reconcile(session, verify_link=broken)) == 0
+    assert stats.snapshot()["integrity_status"] == "BROKEN"
+    assert stats.last_reconciled is not None
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import merkle
+
+
+def _hashes(count):
+    return [hashlib.sha3_512(str(n).encode()).hexdigest() for n in range(count)]
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 7, 8, 33])
+def test_every_leaf_proves_against_the_root(count):
+    hashes = _hashes(count)
+    root = merkle.merkle_root(hashes)
+
+    for index, leaf in enumerate(hashes):
+        assert merkle.verify_proof(leaf, merkle.merkle_proof(hashes, index), root)
+
+
+def test_proof_rejects_foreign_leaf_and_tampered_sibling():
+    hashes = _hashes(8)
+    root = merkle.merkle_root(hashes)
+    proof = merkle.merkle_proof(hashes, 3)
+
+    assert not merkle.verify_proof(hashes[4], proof, root)
+    side, sibling = proof[0]
+    tampered = [(side, "00" * 64)] + proof[1:]
+    assert not merkle.verify_proof(hashes[3], tampered, root)
+
+
+def test_leaf_and_node_domains_are_separated():
+    # Una hoja cuyo valor es la concatenación de dos hojas no produce la raíz de ambas
+    hashes = _hashes(2)
+    forged = (merkle.leaf_hash(hashes[0]) + merkle.leaf_hash(hashes[1])).hex()
+    assert merkle.merkle_root([forged]) != merkle.merkle_root(hashes)
+
+
+def test_empty_block_has_no_root():
+    with pytest.raises(ValueError):
+        merkle.merkle_root([])
+
+
+def test_proof_from_cached_levels_matches_fresh_proof():
+    hashes = _hashes(1024)
+    levels = merkle.merkle_levels(hashes)
+
+    for index in (0, 1, 511, 1023):
+        assert merkle.proof_from_levels(levels, index) == merkle.merkle_proof(hashes, index)
+
+
+def test_sealed_level_cache_is_bounded_lru():
+    cache = merkle.SealedLevelCache(max_blocks=2)
+    cache.put("global", 0, [[b"a"]])
+    cache.put("global", 1, [[b"b"]])
+    assert cache.get("global", 0) == [[b"a"]]  # 0 pasa a ser el más reciente
+
+    cache.put("shard-0", 0, [[b"c"]])
+
+    assert cache.get("global", 1) is None
+    assert cache.get("global", 0) == [[b"a"]]
+    assert cache.get("shard-0", 0) == [[b"c"]]
+
+
+def test_block_range_starts_at_height_one():
+    assert merkle.block_range(0) == (1, merkle.BLOCK_SIZE)
+    assert merkle.block_range(2, block_size=10) == (21, 30)
+
+
+# ====== inclusion_proof ======
+
+class ProofSession:
+    """Responde la consulta del Crum, el checkpoint del bloque y sus hashes por altura."""
+
+    def __init__(self, crum, checkpoint, block):
+        self.crum, self.checkpoint, self.block = crum, checkpoint, block
+        self.block_reads = 0
+
+    async def execute(self, stmt):
+        if "integrity_hash" in str(stmt) and "chain_height BETWEEN" in str(stmt):
+            self.block_reads += 1
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: list(self.block)))
+        return SimpleNamespace(one_or_none=lambda: self.crum)
+
+    async def get(self, entity, key):
+        return self.checkpoint
+
+
+def _sealed_block(size=8, height=5):
+    hashes = _hashes(size)
+    crum = SimpleNamespace(chain_key="global", chain_height=height, integrity_hash=hashes[height - 1])
+    checkpoint = SimpleNamespace(
+        start_height=1, end_height=size, merkle_root=merkle.merkle_root(hashes), end_hash=hashes[-1],
+    )
+    return crum, checkpoint, hashes
+
+
+def test_sealed_proof_verifies_and_fills_the_level_cache():
+    crum, checkpoint, hashes = _sealed_block()
+    session = ProofSession(crum, checkpoint, hashes)
+    cache = merkle.SealedLevelCache()
+
+    first = asyncio.run(merkle.inclusion_proof(session, uuid.uuid4(), block_size=8, level_cache=cache))
+    again = asyncio.run(merkle.inclusion_proof(session, uuid.uuid4(), block_size=8, level_cache=cache))
+
+    assert first["available"] and first["sealed"]
+    steps = [(step["side"], step["hash"]) for step in first["proof"]]
+    assert merkle.verify_proof(first["leaf"], steps, first["merkle_root"])
+    assert again["proof"] == first["proof"]
+    assert session.block_reads == 1
+
+
+def test_incomplete_sealed_block_is_reported_unavailable_and_not_cached():
+    crum, checkpoint, hashes = _sealed_block()
+    # Una fila del bloque ya no está (partición retirada o borrado)
+    session = ProofSession(crum, checkpoint, hashes[:3] + hashes[4:])
+    cache = merkle.SealedLevelCache()
+
+    proof = asyncio.run(merkle.inclusion_proof(session, uuid.uuid4(), block_size=8, level_cache=cache))
+
+    assert (proof["sealed"], proof["available"], proof["reason"]) == (True, False, "block_rows_missing")
+    assert "proof" not in proof
+    assert cache.get("global", 0) is None
+
+
+def test_unsealed_block_and_unknown_crum():
+    crum, _, hashes = _sealed_block()
+
+    pending = asyncio.run(merkle.inclusion_proof(ProofSession(crum, None, hashes), uuid.uuid4(), block_size=8))
+    missing = asyncio.run(merkle.inclusion_proof(ProofSession(None, None, hashes), uuid.uuid4(), block_size=8))
+
+    assert pending["sealed"] is False and "proof" not in pending
+    assert missing is None
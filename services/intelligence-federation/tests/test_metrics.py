@@ -0,0 +1,129 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core import profiling
+from src.core.metrics import Histogram, MetricsRegistry
+from src.core.profiling import SamplingProfiler, incr, stage
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry(namespace="t", bounds=(0.001, 0.01, 0.1))
+    registry.install()
+    yield registry
+    registry.uninstall()
+
+
+def test_histogram_buckets_are_upper_inclusive_and_quantiles_use_the_bound():
+    histogram = Histogram(bounds=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.0, 1.5, 3.0, 9.0):
+        histogram.observe(value)
+
+    assert histogram.buckets == [2, 1, 1, 1]
+    assert (histogram.count, histogram.sum) == (5, 15.0)
+    assert [histogram.quantile(q) for q in (0.2, 0.5, 0.8, 1.0)] == [1.0, 2.0, 4.0, float("inf")]
+    assert Histogram().quantile(0.5) is None
+
+
+def test_stages_and_events_reach_the_installed_registry(registry):
+    with stage("hashing"):
+        pass
+    profiling.record("commit", 0.05)
+    incr("anchored", 3)
+    incr("anchored")
+
+    assert registry.stages["hashing"].count == 1
+    assert registry.stages["commit"].buckets == [0, 0, 1, 0]
+    assert registry.events["anchored"] == 4
+
+
+def test_without_recorders_stage_is_a_shared_null_context(registry):
+    registry.uninstall()
+
+    assert stage("hashing") is stage("commit")
+    incr("anchored")
+    assert registry.events == {}
+
+
+def test_render_is_cumulative_prometheus_text(registry):
+    for seconds in (0.0005, 0.005, 0.005, 0.5):
+        profiling.record("commit", seconds)
+    incr("ingest_rejected", 2)
+    registry.gauge("ledger_height", lambda: 42)
+    registry.gauge("spool_backlog", lambda: 1 / 0)  # Un gauge roto no tumba el scrape
+
+    lines = registry.render().splitlines()
+
+    assert 't_stage_duration_seconds_bucket{stage="commit",le="0.001"} 1' in lines
+    assert 't_stage_duration_seconds_bucket{stage="commit",le="0.01"} 3' in lines
+    assert 't_stage_duration_seconds_bucket{stage="commit",le="0.1"} 3' in lines
+    assert 't_stage_duration_seconds_bucket{stage="commit",le="+Inf"} 4' in lines
+    assert 't_stage_duration_seconds_count{stage="commit"} 4' in lines
+    assert 't_events_total{event="ingest_rejected"} 2' in lines
+    assert lines[-2:] == ["# TYPE t_ledger_height gauge", "t_ledger_height 42"]
+    assert not any("spool_backlog" in line for line in lines)
+
+
+def test_sampling_profiler_folds_the_target_thread_stacks():
+    def busy_loop():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+
+    profiler = SamplingProfiler(interval_ms=1.0)
+    profiler.start()
+    try:
+        busy_loop()
+    finally:
+        profiler.stop()
+
+    assert not profiler.running
+    folded = profiler.folded().splitlines()
+    assert folded and all(line.rsplit(" ", 1)[1].isdigit() for line in folded)
+    assert any("test_metrics.py:busy_loop" in line for line in folded)
+
+
+# ====== /metrics y /metrics/profile ======
+
+@pytest.fixture
+def metrics_client(make_signer):
+    from src.api.v1 import metrics
+    from src.core.auth import CreatorPolicy
+    from src.security.signatures import Ed25519Verifier
+
+    auditor = make_signer(did="did:tamv:auditor")
+    app = FastAPI()
+    app.include_router(metrics.router)
+    app.state.signature_verifier = Ed25519Verifier()
+    app.state.creator_policy = CreatorPolicy(auditor_fingerprints=frozenset({auditor.fingerprint}))
+    client = TestClient(app)
+
+    def profile(signer, enabled=True):
+        app.state.profile_endpoint = enabled
+        query = "seconds=0.05&interval_ms=1"
+        return client.get(f"/metrics/profile?{query}", headers=signer.headers("GET", "/metrics/profile", query=query))
+
+    return SimpleNamespace(client=client, profile=profile, auditor=auditor)
+
+
+def test_scrape_endpoint_serves_the_process_registry(metrics_client):
+    response = metrics_client.client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE tamv_stage_duration_seconds histogram" in response.text
+
+
+def test_profile_endpoint_is_hidden_unless_enabled_and_auditor_only(metrics_client, make_signer):
+    assert metrics_client.profile(metrics_client.auditor, enabled=False).status_code == 404
+    forbidden = metrics_client.profile(make_signer(did="did:tamv:alice"))
+    assert (forbidden.status_code, forbidden.json()["detail"]) == (403, "auditor_role_required")
+
+    response = metrics_client.profile(metrics_client.auditor)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
@@ -0,0 +1,184 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.sql import Delete, Insert
+
+from src.core.outbox import ANCHOR_CHANNEL, LedgerOutbox, OutboxRelay
+
+
+class OutboxTable:
+    """
+    tamv_ledger_outbox en memoria. Cada sesión trabaja sobre una copia y solo
+    la publica al salir de begin() sin error, como una transacción real.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.next_id = 1
+        self.locked_by_other = False
+
+    def __call__(self):
+        return OutboxSession(self)
+
+
+class OutboxSession:
+    def __init__(self, table):
+        self.table = table
+        self.rows = list(table.rows)
+        self.next_id = table.next_id
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+        self.table.rows, self.table.next_id = self.rows, self.next_id
+
+    async def scalar(self, stmt):
+        return not self.table.locked_by_other
+
+    async def execute(self, stmt):
+        if isinstance(stmt, Insert):
+            params = stmt.compile().params
+            for index in range(sum(1 for key in params if key.startswith("message_m"))):
+                row = SimpleNamespace(id=self.next_id, **{c: params[f"{c}_m{index}"] for c in ("chain_key", "channel", "message")})
+                self.rows.append(row)
+                self.next_id += 1
+        elif isinstance(stmt, Delete):
+            ids = set(stmt.compile().params["id_1"])
+            self.rows = [row for row in self.rows if row.id not in ids]
+        else:
+            limit = stmt._limit_clause.value
+            page = sorted(self.rows, key=lambda row: row.id)[:limit]
+            return SimpleNamespace(all=lambda: page)
+
+
+class FlakyRedis:
+    """Pipeline de Redis que anota los PUBLISH entregados; `fail` hace caer el próximo execute."""
+
+    def __init__(self):
+        self.published = []
+        self.fail = False
+
+    def pipeline(self, transaction=False):
+        redis, queued = self, []
+
+        class Pipeline:
+            def publish(self, channel, message):
+                queued.append((channel, json.loads(message)))
+
+            async def execute(self):
+                if redis.fail:
+                    redis.fail = False
+                    raise ConnectionError("redis_down")
+                redis.published.extend(queued)
+
+        return Pipeline()
+
+
+def _pending(index, chain_key="global"):
+    return SimpleNamespace(
+        crum_id=f"crum-{index}",
+        integrity_hash=f"{index:02d}" * 64,
+        row={"chain_key": chain_key, "payload": {"action": "DISPATCH", "sensory_temp": index / 10}},
+    )
+
+
+async def _commit(table, outbox, pendings):
+    session = table()
+    async with session.begin():
+        await outbox.persist(session, pendings)
+
+
+def _write(table, outbox, pendings):
+    asyncio.run(_commit(table, outbox, pendings))
+
+
+def _crum_ids(published):
+    return [crum["crum_id"] for _, batch in published for crum in batch["crums"]]
+
+
+def test_events_are_written_in_the_batch_transaction():
+    table, outbox = OutboxTable(), LedgerOutbox()
+
+    _write(table, outbox, [_pending(1), _pending(2, chain_key="shard:3")])
+
+    assert [(row.id, row.chain_key, row.channel) for row in table.rows] == [
+        (1, "global", ANCHOR_CHANNEL), (2, "shard:3", ANCHOR_CHANNEL),
+    ]
+    event = json.loads(table.rows[0].message)
+    assert event == {
+        "status": "CRUM_ANCHORED", "crum_id": "crum-1", "type": "DISPATCH", "sensory_temp": 0.1, "integrity": "01" * 8,
+    }
+
+
+def test_relay_publishes_one_batch_per_channel_in_id_order_and_deletes_it():
+    table, outbox, redis = OutboxTable(), LedgerOutbox(), FlakyRedis()
+    _write(table, outbox, [_pending(index) for index in range(1, 4)])
+    _write(table, LedgerOutbox(channel="ledger:audit"), [_pending(9)])
+    relay = OutboxRelay(table, redis, batch_size=10)
+
+    assert asyncio.run(relay.drain_once()) == 4
+
+    [(anchor, batch), (audit, single)] = redis.published
+    assert (anchor, batch["status"], batch["count"], batch["dropped"]) == (ANCHOR_CHANNEL, "CRUM_ANCHORED_BATCH", 3, 0)
+    assert [crum["crum_id"] for crum in batch["crums"]] == ["crum-1", "crum-2", "crum-3"]
+    assert (audit, single["count"]) == ("ledger:audit", 1)
+    assert table.rows == [] and relay.delivered == 4
+
+
+def test_failed_publish_keeps_the_rows_and_the_retry_redelivers_them():
+    table, outbox, redis = OutboxTable(), LedgerOutbox(), FlakyRedis()
+    _write(table, outbox, [_pending(index) for index in range(1, 6)])
+    relay = OutboxRelay(table, redis, batch_size=3)
+    redis.fail = True
+
+    async def drain():
+        with pytest.raises(ConnectionError):
+            await relay.drain_once()
+        kept = len(table.rows)
+        return kept, [await relay.drain_once() for _ in range(3)]
+
+    kept, drained = asyncio.run(drain())
+
+    assert kept == 5
+    assert drained == [3, 2, 0]
+    # Al menos una vez y en orden: nada perdido ni reordenado tras el fallo
+    assert _crum_ids(redis.published) == [f"crum-{index}" for index in range(1, 6)]
+
+
+def test_relay_yields_when_another_node_holds_the_lock():
+    table, redis = OutboxTable(), FlakyRedis()
+    _write(table, LedgerOutbox(), [_pending(1)])
+    table.locked_by_other = True
+
+    assert asyncio.run(OutboxRelay(table, redis).drain_once()) == 0
+    assert redis.published == [] and len(table.rows) == 1
+
+
+def test_local_commit_wakes_the_relay_before_the_poll_interval():
+    table, outbox, redis = OutboxTable(), LedgerOutbox(), FlakyRedis()
+    relay = OutboxRelay(table, redis, outbox=outbox, poll_interval_s=30.0)
+
+    async def scenario():
+        relay.start()
+        await asyncio.sleep(0.01)  # El relay ya drenó la tabla vacía y espera
+        await _commit(table, outbox, [_pending(1)])
+        outbox.notify()
+        for _ in range(100):
+            if redis.published:
+                break
+            await asyncio.sleep(0.005)
+        # Antes de stop(): su drenaje final entregaría el evento de todos modos
+        woken = _crum_ids(redis.published)
+        await relay.stop()
+        return woken
+
+    assert asyncio.run(scenario()) == ["crum-1"]
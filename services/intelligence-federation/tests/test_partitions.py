@@ -0,0 +1,121 @@
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.partitions import LedgerPartitionManager, partition_name
+
+NOW = datetime(2025, 7, 15, 9, tzinfo=timezone.utc)
+
+
+class Catalog:
+    """
+    Catálogo PostgreSQL mínimo: particiones con su estado por cadena
+    ({chain_key: (todas caducadas, altura máxima)}) y checkpoints del auditor.
+    Hace de sesión y de fábrica de sesiones a la vez.
+    """
+
+    def __init__(self, partitions, checkpoints):
+        self.partitions = partitions
+        self.checkpoints = checkpoints
+        self.ddl = []
+        self.status_params = []
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        pass
+
+    async def execute(self, stmt, params=None):
+        sql = str(stmt)
+        if "pg_inherits" in sql:
+            names = sorted(self.partitions)
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: names))
+        if "bool_and" in sql:
+            self.status_params.append(params)
+            name = re.search(r'FROM "([^"]+)"', sql).group(1)
+            rows = [
+                SimpleNamespace(chain_key=chain_key, expired=expired, max_height=height)
+                for chain_key, (expired, height) in self.partitions[name].items()
+            ]
+            return SimpleNamespace(all=lambda: rows)
+        if "tamv_verification_checkpoints" in sql:
+            rows = [SimpleNamespace(chain_key=k, verified_height=h) for k, h in self.checkpoints.items()]
+            return SimpleNamespace(all=lambda: rows)
+        self.ddl.append(sql)
+
+
+def _month(year, month):
+    return partition_name(datetime(year, month, 1, tzinfo=timezone.utc))
+
+
+def _retire(catalog, **kwargs):
+    return asyncio.run(LedgerPartitionManager(catalog, **kwargs).enforce_retention(now=NOW))
+
+
+def test_partitions_are_created_ahead_across_the_year_boundary():
+    catalog = Catalog({}, {})
+    december = datetime(2025, 12, 20, tzinfo=timezone.utc)
+
+    created = asyncio.run(LedgerPartitionManager(catalog, months_ahead=2).ensure_partitions(now=december))
+
+    assert created == ["tamv_crums_ledger_p2025_12", "tamv_crums_ledger_p2026_01", "tamv_crums_ledger_p2026_02"]
+    assert "FOR VALUES FROM ('2026-01-01T00:00:00+00:00') TO ('2026-02-01T00:00:00+00:00')" in catalog.ddl[1]
+
+
+def test_expired_and_verified_partition_is_detached_and_archived():
+    may = _month(2025, 5)
+    catalog = Catalog({may: {"global": (True, 900), "shard:7": (True, 40)}}, {"global": 1200, "shard:7": 40})
+
+    assert _retire(catalog) == [may]
+    assert catalog.ddl == [
+        f'ALTER TABLE "tamv_crums_ledger" DETACH PARTITION "{may}"',
+        f'ALTER TABLE "{may}" RENAME TO "tamv_crums_archive_p2025_05"',
+    ]
+
+
+def test_partition_beyond_any_chain_checkpoint_is_kept():
+    may = _month(2025, 5)
+    # La cadena global está sellada, pero el shard aún no llegó a su altura 41
+    catalog = Catalog({may: {"global": (True, 900), "shard:7": (True, 41)}}, {"global": 1200, "shard:7": 40})
+
+    assert _retire(catalog) == []
+    assert catalog.ddl == []
+
+
+@pytest.mark.parametrize(
+    "partitions, checkpoints",
+    [
+        ({_month(2025, 5): {"global": (False, 10)}}, {"global": 100}),  # quedan Crums vigentes
+        ({_month(2025, 5): {"global": (True, 10)}}, {}),  # el auditor nunca pasó por esta cadena
+        ({_month(2025, 7): {"global": (True, 10)}}, {"global": 100}),  # el mes en curso no cerró
+        ({"tamv_crums_ledger_legacy": {"global": (True, 10)}}, {"global": 100}),  # fuera del esquema de nombres
+    ],
+    ids=["unexpired", "never_verified", "open_month", "unmanaged"],
+)
+def test_retention_gates(partitions, checkpoints):
+    catalog = Catalog(partitions, checkpoints)
+
+    assert _retire(catalog) == []
+    assert catalog.ddl == []
+
+
+def test_empty_partition_is_dropped_when_archiving_is_off():
+    april, may, june = _month(2025, 4), _month(2025, 5), _month(2025, 6)
+    catalog = Catalog({april: {}, may: {"global": (True, 5)}, june: {"global": (True, 50)}}, {"global": 20})
+
+    retired = _retire(catalog, archive=False, default_retention=timedelta(days=30))
+
+    # Cada partición se evalúa por separado: junio sigue bloqueada por altura
+    assert retired == [april, may]
+    assert catalog.ddl[1] == f'DROP TABLE "{april}"' and catalog.ddl[3] == f'DROP TABLE "{may}"'
+    assert catalog.status_params[0] == {"now": NOW, "retention": timedelta(days=30)}
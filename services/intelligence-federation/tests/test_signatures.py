@@ -0,0 +1,100 @@
+import asyncio
+import base64
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat  # noqa: E402
+
+from src.security.signatures import (  # noqa: E402
+    Ed25519Verifier,
+    SignatureError,
+    _resolve,
+    key_fingerprint,
+)
+
+
+def test_fingerprint_is_encoding_independent(make_signer):
+    signer = make_signer()
+    public = signer.key.public_key()
+    raw = public.public_bytes(Encoding.Raw, PublicFormat.Raw)
+    pem = public.public_bytes(Encoding.PEM, PublicFormat.SubjectPublicKeyInfo).decode()
+
+    assert key_fingerprint(raw.hex()) == signer.fingerprint
+    assert key_fingerprint(base64.b64encode(raw).decode()) == signer.fingerprint
+    assert key_fingerprint(base64.urlsafe_b64encode(raw).decode().rstrip("=")) == signer.fingerprint
+    assert key_fingerprint(pem) == signer.fingerprint
+
+
+def test_verify_rejects_tampered_message_and_malformed_inputs(make_signer):
+    signer = make_signer()
+    verifier = Ed25519Verifier()
+    signature = signer.key.sign(b"payload").hex()
+
+    assert verifier.verify_sync(signer.pubkey, signature, b"payload") == signer.fingerprint
+    with pytest.raises(SignatureError, match="signature_mismatch"):
+        verifier.verify_sync(signer.pubkey, signature, b"payload!")
+    with pytest.raises(SignatureError, match="expected_64_bytes"):
+        verifier.verify_sync(signer.pubkey, signature[:-4], b"payload")
+    with pytest.raises(SignatureError, match="expected_32_bytes"):
+        verifier.verify_sync(signer.pubkey[:32], signature, b"payload")
+    # Firma válida de otra llave
+    with pytest.raises(SignatureError, match="signature_mismatch"):
+        verifier.verify_sync(make_signer().pubkey, signature, b"payload")
+
+
+def test_key_cache_reuses_parsed_keys_and_evicts_lru(make_signer):
+    signers = [make_signer() for _ in range(3)]
+    verifier = Ed25519Verifier(max_keys=2)
+
+    first = verifier.load_key(signers[0].pubkey)[1]
+    assert verifier.load_key(signers[0].pubkey)[1] is first
+    verifier.load_key(signers[1].pubkey)
+    verifier.load_key(signers[0].pubkey)  # 0 pasa a ser el más reciente
+    verifier.load_key(signers[2].pubkey)
+
+    assert list(verifier._keys) == [signers[0].fingerprint, signers[2].fingerprint]
+
+
+def test_thread_pool_batches_resolve_each_request(make_signer):
+    signers = [make_signer() for _ in range(4)]
+    verifier = Ed25519Verifier(workers=2, max_batch=8, batch_window_ms=1.0)
+
+    async def verify(index):
+        signer = signers[index % len(signers)]
+        message = f"message-{index}".encode()
+        signature = signer.key.sign(message).hex()
+        if index % 5 == 0:
+            message += b"-tampered"
+        try:
+            return await verifier.verify(signer.pubkey, signature, message)
+        except SignatureError:
+            return None
+
+    async def scenario():
+        return await asyncio.gather(*(verify(index) for index in range(40)))
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        verifier.close()
+
+    for index, result in enumerate(results):
+        expected = None if index % 5 == 0 else signers[index % len(signers)].fingerprint
+        assert result == expected
+
+
+def test_cancelled_batch_fails_waiters_instead_of_raising():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        done = loop.create_future()
+        done.cancel()
+        _resolve([(None, b"", b"", waiter)], done)
+        return waiter
+
+    waiter = asyncio.run(scenario())
+
+    with pytest.raises(SignatureError, match="verification_unavailable"):
+        waiter.result()
@@ -0,0 +1,228 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy.exc import DataError
+
+from src.core import spool
+from src.core.chain import GENESIS_HASH, link_chain
+
+
+class FakeChainHead:
+    def __init__(self):
+        self.hash, self.height = GENESIS_HASH, 0
+
+    async def load(self, session):
+        pass
+
+
+class FakeWriter:
+    """
+    Persiste en memoria; `fail` simula una base caída y una fila con `bad`
+    hace fallar su lote como lo haría un VARCHAR desbordado.
+    """
+
+    def __init__(self, head=None, fail=False):
+        self.chain_head = head or FakeChainHead()
+        self.fail = fail
+        self.persisted = []
+
+    async def append(self, session, pendings):
+        if self.fail:
+            raise ConnectionError("db_down")
+        if any(pending.row.get("bad") for pending in pendings):
+            raise DataError("INSERT", {}, Exception("value too long for type character varying(64)"))
+        # Como el writer real: re-enlaza si el lote no continúa la cabeza
+        if pendings[0].previous_hash != self.chain_head.hash:
+            link_chain(self.chain_head.hash, pendings, start_height=self.chain_head.height)
+        self.persisted.extend(pendings)
+        self.chain_head.hash = pendings[-1].integrity_hash
+        self.chain_head.height += len(pendings)
+
+
+class FakeSession:
+    """Responde a la consulta de recuperación con los ids ya persistidos."""
+
+    def __init__(self, persisted_ids=()):
+        self.persisted_ids = persisted_ids
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def rollback(self):
+        pass
+
+    async def execute(self, stmt):
+        ids = [uuid.UUID(crum_id) for crum_id in self.persisted_ids]
+
+        class Result:
+            def scalars(self):
+                return ids
+
+        return Result()
+
+
+def _spool(directory, writer, persisted_ids=()):
+    return spool.LedgerSpool(
+        str(directory), writer, lambda: FakeSession(persisted_ids), segment_size=4096, retry_backoff_s=0.01,
+    )
+
+
+async def _drained(ledger_spool):
+    while ledger_spool.backlog:
+        await asyncio.sleep(0.005)
+
+
+def test_record_roundtrip(make_pending):
+    pending = make_pending(payload_json='{"a":1}', blob=b"\x00\x01\xff", creator_did="did:tamv:x")
+    link_chain(GENESIS_HASH, [pending], start_height=0)
+
+    decoded = spool.decode_record(spool.encode_record(pending)[spool._HEADER.size:])
+
+    assert decoded.crum_id == pending.crum_id
+    assert decoded.timestamp == pending.timestamp
+    assert decoded.blob == pending.blob
+    assert decoded.previous_hash == GENESIS_HASH
+    assert decoded.integrity_hash == pending.integrity_hash
+    assert decoded.row["id"] == uuid.UUID(pending.crum_id)
+    assert decoded.row["chain_height"] == 1
+    assert decoded.row["creator_did"] == "did:tamv:x"
+
+
+def test_scan_stops_at_torn_record(tmp_path, make_pending):
+    pendings = [make_pending() for _ in range(2)]
+    link_chain(GENESIS_HASH, pendings, start_height=0)
+    first, second = (spool.encode_record(pending) for pending in pendings)
+    torn = bytearray(second)
+    torn[-1] ^= 0xFF
+    path = tmp_path / "segment"
+    path.write_bytes(first + bytes(torn))
+
+    scanned = list(spool.scan_segment(str(path)))
+
+    assert [pending.crum_id for _, pending in scanned] == [pendings[0].crum_id]
+    assert scanned[0][0] == len(first)
+
+
+def test_spool_drains_in_chain_order(tmp_path, make_pending):
+    writer = FakeWriter()
+
+    async def scenario():
+        ledger_spool = _spool(tmp_path, writer)
+        assert await ledger_spool.open() == 0
+        appended = [await ledger_spool.append(make_pending()) for _ in range(30)]
+        await _drained(ledger_spool)
+        await ledger_spool.close()
+        return appended
+
+    appended = asyncio.run(scenario())
+
+    assert [p.crum_id for p in writer.persisted] == [p.crum_id for p in appended]
+    assert [p.row["chain_height"] for p in writer.persisted] == list(range(1, 31))
+    assert writer.persisted[0].previous_hash == GENESIS_HASH
+    for previous, current in zip(writer.persisted, writer.persisted[1:]):
+        assert current.previous_hash == previous.integrity_hash
+    # Segmentos de 4 KiB: el spool rotó y el cursor quedó al final
+    assert list(spool.iter_spool(str(tmp_path))) == []
+
+
+def test_recovery_skips_crums_already_in_the_ledger(tmp_path, make_pending):
+    down = FakeWriter(fail=True)
+
+    async def crash():
+        ledger_spool = _spool(tmp_path, down)
+        await ledger_spool.open()
+        appended = [await ledger_spool.append(make_pending()) for _ in range(6)]
+        # Crash: sin drenado final ni cierre ordenado
+        ledger_spool._task.cancel()
+        await asyncio.gather(ledger_spool._task, return_exceptions=True)
+        ledger_spool._close_segment()
+        return appended
+
+    appended = asyncio.run(crash())
+    # El COMMIT de los dos primeros llegó a la base, pero no el cursor
+    persisted_ids = [pending.crum_id for pending in appended[:2]]
+    writer = FakeWriter()
+
+    async def recover():
+        ledger_spool = _spool(tmp_path, writer, persisted_ids)
+        recovered = await ledger_spool.open()
+        head = ledger_spool.head_hash, ledger_spool.head_height
+        await _drained(ledger_spool)
+        await ledger_spool.close()
+        return recovered, head
+
+    recovered, head = asyncio.run(recover())
+
+    assert recovered == 4
+    assert [p.crum_id for p in writer.persisted] == [p.crum_id for p in appended[2:]]
+    assert head == (appended[-1].integrity_hash, 6)
+
+
+def test_oversized_record_is_rejected_without_moving_the_head(tmp_path, make_pending):
+    async def scenario():
+        ledger_spool = _spool(tmp_path, FakeWriter())
+        await ledger_spool.open()
+        head = ledger_spool.head_hash, ledger_spool.head_height
+        room = ledger_spool._room._value
+        with pytest.raises(ValueError):
+            await ledger_spool.append(make_pending(note="x" * 8192))
+        state = ledger_spool.head_hash, ledger_spool.head_height, ledger_spool._room._value
+        await ledger_spool.close()
+        return head, room, state
+
+    head, room, state = asyncio.run(scenario())
+
+    assert state == (*head, room)
+
+
+def test_bad_record_is_dead_lettered_and_does_not_block_the_queue(tmp_path, make_pending):
+    writer = FakeWriter()
+
+    async def scenario():
+        ledger_spool = _spool(tmp_path, writer)
+        ledger_spool.max_batch = 8
+        await ledger_spool.open()
+        room = ledger_spool._room._value
+        appended = [await ledger_spool.append(make_pending(bad=index == 3)) for index in range(12)]
+        await asyncio.wait_for(_drained(ledger_spool), timeout=2.0)
+        state = ledger_spool.head_hash, ledger_spool.head_height, ledger_spool._room._value, room
+        # Lo que llega después sigue la cabeza persistida, no la del registro apartado
+        later = await ledger_spool.append(make_pending())
+        await _drained(ledger_spool)
+        await ledger_spool.close()
+        return appended, state, later
+
+    appended, (head_hash, head_height, room_after, room_before), later = asyncio.run(scenario())
+
+    assert [p.crum_id for p in writer.persisted] == [p.crum_id for p in appended if not p.row.get("bad")] + [later.crum_id]
+    assert room_after == room_before
+    assert (head_hash, head_height) == (writer.persisted[-2].integrity_hash, 11)
+    assert later.previous_hash == head_hash and later.row["chain_height"] == 12
+    dead = list(spool.iter_dead_letters(str(tmp_path)))
+    assert [pending.crum_id for _, _, pending in dead] == [appended[3].crum_id]
+    # El cursor pasó al registro apartado: un reinicio no lo vuelve a intentar
+    assert list(spool.iter_spool(str(tmp_path))) == []
+
+
+def test_close_releases_the_segment_when_the_final_drain_fails(tmp_path, make_pending):
+    writer = FakeWriter(fail=True)
+
+    async def scenario():
+        ledger_spool = _spool(tmp_path, writer)
+        await ledger_spool.open()
+        ledger_spool._task.cancel()
+        await asyncio.gather(ledger_spool._task, return_exceptions=True)
+        ledger_spool._task = None
+        pending = await ledger_spool.append(make_pending())
+        await ledger_spool.close()
+        return ledger_spool, pending
+
+    ledger_spool, pending = asyncio.run(scenario())
+
+    assert ledger_spool._mmap is None
+    # El registro sigue en disco para el próximo arranque
+    assert [p.crum_id for _, _, p in spool.iter_spool(str(tmp_path))] == [pending.crum_id]
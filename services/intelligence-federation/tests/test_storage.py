@@ -0,0 +1,218 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.core.chain import GENESIS_HASH, PendingCrum, compute_integrity_hash
+from src.core.encoding import encode_payload, payload_text
+from src.core.group_commit import GroupCommitter
+from src.core.storage import MemoryLedgerStorage, PostgresLedgerStorage, SQLiteLedgerStorage
+
+T0 = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def _crum(index, **row):
+    """Crum con la fila completa que escribe el ingestor (el contrato de los tres backends)."""
+    crum_id = uuid.uuid4()
+    payload = encode_payload({"action": "STORE_TEST", "index": index})
+    timestamp = T0 + timedelta(milliseconds=index)
+    base = {
+        "id": crum_id,
+        "canonical_id": f"TAMV-20250601-{str(crum_id)[:8]}",
+        "action_type": "STORE_TEST",
+        "payload": payload,
+        "creator_did": "did:tamv:storage",
+        "origin": "system",
+        "risk_level": "LOW",
+        "is_verified_by_root": False,
+        "created_at": timestamp,
+    }
+    base.update(row)
+    return PendingCrum(str(crum_id), timestamp, payload.encoded, f"salt-{index}", base)
+
+
+class MemoryBackend:
+    name = "memory"
+
+    async def open(self):
+        return MemoryLedgerStorage()
+
+    async def tamper(self, storage):
+        storage._rows[-1]["parent_hash"] = "f" * 128
+
+
+class SQLiteBackend:
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+
+    async def open(self):
+        return SQLiteLedgerStorage(self.path)
+
+    async def tamper(self, storage):
+        storage._conn.execute(
+            "UPDATE tamv_crums_ledger SET parent_hash = ? WHERE chain_height = (SELECT max(chain_height) FROM tamv_crums_ledger)",
+            ("f" * 128,),
+        )
+
+
+class PostgresBackend:
+    """Requiere una base migrada y vacía en TAMV_TEST_DATABASE_URL (se trunca en cada prueba)."""
+    name = "postgres"
+
+    def __init__(self, url):
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from src.core.encoding import json_serializer
+
+        self.engine = create_async_engine(url, json_serializer=json_serializer)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def open(self):
+        from sqlalchemy import text
+        from src.core.chain_head import ChainHead
+        from src.core.ledger_writer import LedgerWriter
+
+        async with self.session_factory() as session:
+            await session.execute(text("TRUNCATE tamv_crums_ledger, tamv_chain_heads"))
+            await session.commit()
+        return PostgresLedgerStorage(self.session_factory, LedgerWriter(chain_head=ChainHead()))
+
+    async def tamper(self, storage):
+        from sqlalchemy import text
+
+        async with self.session_factory() as session:
+            await session.execute(text(
+                "UPDATE tamv_crums_ledger SET parent_hash = :forged "
+                "WHERE chain_height = (SELECT max(chain_height) FROM tamv_crums_ledger)"
+            ), {"forged": "f" * 128})
+            await session.commit()
+
+
+@pytest.fixture(params=["memory", "sqlite", "postgres"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "ledger.db"))
+    url = os.environ.get("TAMV_TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TAMV_TEST_DATABASE_URL no definido")
+    pytest.importorskip("asyncpg")
+    return PostgresBackend(url)
+
+
+def test_append_links_batches_and_moves_the_head(backend):
+    async def scenario():
+        storage = await backend.open()
+        empty = await storage.head(), await storage.count()
+        first = [_crum(index) for index in range(3)]
+        second = [_crum(index) for index in range(3, 5)]
+        head_hash = await storage.append(first)
+        head_hash = await storage.append(second)
+        rows = [row async for row in storage.scan(batch_size=2)]
+        state = await storage.head(), await storage.count()
+        await storage.close()
+        return empty, first + second, head_hash, rows, state
+
+    empty, pendings, head_hash, rows, (head, count) = asyncio.run(scenario())
+
+    assert empty == ((GENESIS_HASH, 0), 0)
+    assert (head, count) == ((head_hash, 5), 5)
+    assert [row["chain_height"] for row in rows] == [1, 2, 3, 4, 5]
+    assert [row["id"] for row in rows] == [uuid.UUID(p.crum_id) for p in pendings]
+    assert rows[0]["parent_hash"] == GENESIS_HASH
+    for previous, current in zip(rows, rows[1:]):
+        assert current["parent_hash"] == previous["integrity_hash"]
+
+
+def test_stored_rows_recompute_to_their_integrity_hash(backend):
+    async def scenario():
+        storage = await backend.open()
+        await storage.append([_crum(index, creator_did=f"did:tamv:{index}") for index in range(4)])
+        rows = [row async for row in storage.scan(2, 3)]
+        await storage.close()
+        return rows
+
+    rows = asyncio.run(scenario())
+
+    assert [row["chain_height"] for row in rows] == [2, 3]
+    assert rows[0]["creator_did"] == "did:tamv:1"
+    for row in rows:
+        # PostgreSQL devuelve el JSONB como dict; memoria y SQLite, el texto ya codificado
+        expected = compute_integrity_hash(
+            str(row["id"]), row["parent_hash"], payload_text(row["payload"]),
+            row["created_at"], row["integrity_salt"], row.get("burst_blob"),
+        )
+        assert expected == row["integrity_hash"]
+
+
+def test_verify_tail_detects_a_forged_parent_link(backend):
+    async def scenario():
+        storage = await backend.open()
+        single = (await storage.append([_crum(0)]), await storage.verify_tail())
+        await storage.append([_crum(index) for index in range(1, 4)])
+        clean = await storage.verify_tail()
+        await backend.tamper(storage)
+        tampered = await storage.verify_tail()
+        await storage.close()
+        return single[1], clean, tampered
+
+    assert asyncio.run(scenario()) == (True, True, False)
+
+
+def test_sqlite_head_survives_a_reopen(tmp_path):
+    path = str(tmp_path / "ledger.db")
+
+    async def scenario():
+        storage = SQLiteLedgerStorage(path)
+        head_hash = await storage.append([_crum(index) for index in range(3)])
+        await storage.close()
+
+        reopened = SQLiteLedgerStorage(path)
+        state = await reopened.head()
+        later = _crum(3)
+        await reopened.append([later])
+        await reopened.close()
+        return head_hash, state, later
+
+    head_hash, state, later = asyncio.run(scenario())
+
+    assert state == (head_hash, 3)
+    assert (later.previous_hash, later.row["chain_height"]) == (head_hash, 4)
+
+
+def test_group_committer_batches_storage_appends_and_bisects_row_errors(tmp_path):
+    storage = SQLiteLedgerStorage(str(tmp_path / "ledger.db"))
+    calls = []
+    append = storage.append
+
+    async def counting_append(pendings):
+        calls.append(len(pendings))
+        return await append(pendings)
+
+    storage.append = counting_append
+    pendings = [_crum(index) for index in range(12)]
+    # Mismo id que el primero: viola UNIQUE(id) solo para esa fila
+    duplicate = _crum(99, id=pendings[0].row["id"])
+
+    async def scenario():
+        committer = GroupCommitter(storage=storage, max_batch=64, max_wait_ms=5)
+        committer.start()
+        try:
+            results = await asyncio.gather(*(committer.submit(p) for p in [*pendings, duplicate]), return_exceptions=True)
+        finally:
+            await committer.stop()
+        stored = await storage.count()
+        await storage.close()
+        return results, stored
+
+    results, stored = asyncio.run(scenario())
+
+    assert results[:12] == pendings
+    assert isinstance(results[12], SQLiteLedgerStorage.ROW_ERRORS)
+    # Un solo lote de 13, bisectado por mitades hasta aislar la fila duplicada
+    assert calls[0] == 13 and calls.count(1) >= 1
+    assert stored == 12
@@ -0,0 +1,65 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.neural.burst_codec import BURST_STRUCT, decode_burst_window  # noqa: E402
+from src.neural.synapse_mapper import SynapseMapper  # noqa: E402
+
+FREQ = np.array([0.0, 250.0, 999.0, 1500.0, 4000.0], dtype=np.float32)
+POWER = np.array([0.0, 10.0, 100.0, 450.0, 600.0], dtype=np.float32)
+
+
+def test_batch_matches_the_scalar_path_element_by_element():
+    batch = SynapseMapper().map_bursts("did:tamv:a", FREQ, POWER)
+    scalar = SynapseMapper()
+
+    for index, (freq, power) in enumerate(zip(FREQ.tolist(), POWER.tolist())):
+        expected = scalar.calculate_attention_shift(freq, power, did="did:tamv:a")
+        assert batch["temperature"][index] == pytest.approx(expected["temperature"], rel=1e-6)
+        assert batch["top_p"][index] == pytest.approx(expected["top_p"], rel=1e-6)
+        assert batch["entropy"][index] == pytest.approx(expected["entropy"], rel=1e-6)
+        assert batch["sensory_mode"][index] == expected["sensory_mode"]
+
+
+def test_outputs_are_arrays_aligned_with_the_input():
+    shift = SynapseMapper().map_bursts("did:tamv:a", FREQ, POWER)
+
+    assert {key: value.shape for key, value in shift.items()} == {key: (5,) for key in shift}
+    assert shift["temperature"].max() == 2.0 and shift["top_p"].min() == pytest.approx(0.1)
+    assert shift["sensory_mode"].tolist() == ["STABLE", "STABLE", "ECSTASY", "ECSTASY", "ECSTASY"]
+
+
+def test_each_did_keeps_its_own_entropy():
+    mapper = SynapseMapper(capacity=1)
+    mapper.map_bursts("did:tamv:a", [100.0], [10.0])
+    mapper.map_bursts("did:tamv:b", [200.0, 300.0], [50.0, 100.0])
+    mapper.map_bursts("did:tamv:c", [], [])
+
+    assert mapper.entropy_for("did:tamv:a") == pytest.approx(0.1)
+    assert mapper.entropy_for("did:tamv:b") == pytest.approx(3.0)
+    # Ventana vacía: no reserva slot ni toca el último valor global
+    assert mapper.entropy_for("did:tamv:c") == 0.0
+    assert mapper.state_entropy == pytest.approx(3.0)
+    assert mapper._entropy.size >= 2
+
+
+def test_least_recent_did_yields_its_slot_when_full():
+    mapper = SynapseMapper(capacity=2, max_dids=2)
+    mapper.calculate_attention_shift(100.0, 100.0, did="did:tamv:a")
+    mapper.calculate_attention_shift(100.0, 200.0, did="did:tamv:b")
+    mapper.calculate_attention_shift(100.0, 300.0, did="did:tamv:a")  # `a` vuelve a ser reciente
+    mapper.calculate_attention_shift(100.0, 400.0, did="did:tamv:c")
+
+    assert mapper.entropy_for("did:tamv:b") == 0.0
+    assert mapper.entropy_for("did:tamv:a") == pytest.approx(3.0)
+    assert mapper.entropy_for("did:tamv:c") == pytest.approx(4.0)
+    assert mapper._entropy.size == 2
+
+
+def test_decoded_window_maps_straight_through():
+    window = decode_burst_window([BURST_STRUCT.pack(500.0, 200.0, 1), BURST_STRUCT.pack(10.0, 10.0, 2)])
+
+    shift = SynapseMapper().map_window("did:tamv:a", window)
+
+    assert shift["temperature"].tolist() == pytest.approx([1.5, 1.01])
+    assert shift["sensory_mode"].tolist() == ["ECSTASY", "STABLE"]
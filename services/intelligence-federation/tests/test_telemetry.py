@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core.telemetry import EcgRollups, bucket_start, extract_ecg
+
+T0 = datetime(2025, 3, 1, 10, 15, 30, tzinfo=timezone.utc)
+
+
+def test_rollup_deltas_group_by_window_creator_and_pattern(make_pending):
+    pendings = [
+        make_pending(payload={"ecg": {"intensity": 0.5, "entropy": 1.0, "pattern": " Calm "}}, creator_did="did:tamv:a"),
+        make_pending(payload={"ecg": {"intensity": 0.9, "entropy": "high", "pattern": "calm"}}, creator_did="did:tamv:a"),
+        make_pending(payload={"ecg": {"intensity": True}}, creator_did="did:tamv:b"),
+        make_pending(payload={"action": "NO_TELEMETRY"}, creator_did="did:tamv:a"),
+    ]
+    for offset, pending in enumerate(pendings):
+        pending.timestamp = T0 + timedelta(seconds=10 * offset)
+
+    extract_ecg(pendings)
+    deltas = EcgRollups(granularities=("minute",)).batch_deltas(pendings)
+
+    calm = deltas[("minute", bucket_start(T0, "minute"), "did:tamv:a", "calm")]
+    assert (calm.count, calm.intensity_count, calm.intensity_max, calm.entropy_count) == (2, 2, 0.9, 1)
+    assert calm.intensity_sum == pytest.approx(1.4)
+    # bool no cuenta como intensidad; la fila sin ECG no entra en ningún rollup
+    unnamed = deltas[("minute", bucket_start(T0, "minute"), "did:tamv:b", "none")]
+    assert (unnamed.count, unnamed.intensity_count) == (1, 0)
+    assert len(deltas) == 2
+    assert pendings[3].row["telemetry_data"] == {} and pendings[3].row["ecg_pattern"] is None
+
+
+def test_hour_window_spans_minutes_and_unknown_granularity_is_rejected():
+    assert bucket_start(T0, "hour") == datetime(2025, 3, 1, 10, tzinfo=timezone.utc)
+    with pytest.raises(ValueError):
+        EcgRollups(granularities=("minute", "day"))
+
+
+# ====== /isabella/telemetry/ecg ======
+
+class AllowAll:
+    def is_ip_allowed(self, ip):
+        return True
+
+
+@pytest.fixture
+def ecg_client(monkeypatch, make_signer):
+    from src.api.v1 import gate
+    from src.core.auth import CreatorPolicy
+    from src.database import get_db
+    from src.security.signatures import Ed25519Verifier
+
+    auditor = make_signer(did="did:tamv:auditor")
+    calls = []
+
+    async def series(session, granularity, since, until=None, creator_did=None, pattern=None, limit=None):
+        calls.append({"granularity": granularity, "creator_did": creator_did, "pattern": pattern, "limit": limit})
+        return []
+
+    monkeypatch.setattr(gate.EcgRollups, "series", staticmethod(series))
+    app = FastAPI()
+    app.include_router(gate.router)
+    app.dependency_overrides[get_db] = lambda: None
+    app.state.container = SimpleNamespace(sentinel=AllowAll())
+    app.state.signature_verifier = Ed25519Verifier()
+    app.state.creator_policy = CreatorPolicy(auditor_fingerprints=frozenset({auditor.fingerprint}))
+    client = TestClient(app)
+
+    def get(signer, **params):
+        query = urlencode(params)
+        path = "/isabella/telemetry/ecg"
+        return client.get(f"{path}?{query}", headers=signer.headers("GET", path, query=query))
+
+    return SimpleNamespace(get=get, calls=calls, auditor=auditor)
+
+
+def _since(hours):
+    return (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+
+
+def test_creator_reads_only_its_own_series(ecg_client, make_signer):
+    creator = make_signer(did="did:tamv:alice")
+
+    own = ecg_client.get(creator, since=_since(1), pattern="CALM")
+    foreign = ecg_client.get(creator, since=_since(1), creator_did="did:tamv:bob")
+
+    assert own.status_code == 200 and own.json()["truncated"] is False
+    assert (foreign.status_code, foreign.json()["detail"]) == (403, "auditor_role_required")
+    # Sin creator_did, la consulta se acota al DID firmante
+    assert ecg_client.calls == [{"granularity": "minute", "creator_did": "did:tamv:alice", "pattern": "calm", "limit": 10_000}]
+
+
+def test_auditor_reads_any_creator_or_all(ecg_client):
+    assert ecg_client.get(ecg_client.auditor, since=_since(2), creator_did="did:tamv:bob").status_code == 200
+    assert ecg_client.get(ecg_client.auditor, since=_since(2), granularity="hour").status_code == 200
+
+    assert [call["creator_did"] for call in ecg_client.calls] == ["did:tamv:bob", None]
+
+
+def test_range_is_capped_per_granularity(ecg_client, make_signer):
+    creator = make_signer()
+    until = datetime(2025, 3, 10, tzinfo=timezone.utc)
+
+    minutes = ecg_client.get(creator, since=(until - timedelta(days=2)).isoformat(), until=until.isoformat())
+    hours = ecg_client.get(
+        creator, since=(until - timedelta(days=2)).isoformat(), until=until.isoformat(), granularity="hour"
+    )
+    open_ended = ecg_client.get(creator, since=_since(48))
+
+    assert (minutes.status_code, minutes.json()["detail"]) == (400, "range_exceeds_minute_limit")
+    assert hours.status_code == 200
+    assert open_ended.status_code == 400
+    assert len(ecg_client.calls) == 1
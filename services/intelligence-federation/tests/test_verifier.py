@@ -0,0 +1,173 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.core.chain import GENESIS_HASH, PendingCrum, link_chain
+from src.core.chain_head import number_legacy_rows
+from src.core.encoding import PayloadEncodingError, encode_payload
+from src.core.verifier import LedgerVerifier, _find_tampered
+from src.models.sovereign_event import TAMVCrumEntity
+
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _ledger(payloads, legacy=0):
+    """
+    Cadena persistida tal como la devuelve PostgreSQL: el payload pasa por
+    JSONB (json.loads del texto guardado) y los `legacy` primeros no tienen altura.
+    """
+    pendings = []
+    for index, payload in enumerate(payloads):
+        encoded = encode_payload(payload)
+        crum_id = uuid.uuid4()
+        timestamp = EPOCH + timedelta(seconds=index)
+        pendings.append(PendingCrum(str(crum_id), timestamp, encoded.encoded, f"salt-{index}", {"id": crum_id}))
+    link_chain(GENESIS_HASH, pendings, start_height=0)
+    return [
+        SimpleNamespace(
+            id=uuid.UUID(p.crum_id),
+            chain_height=None if index < legacy else p.row["chain_height"],
+            parent_hash=p.previous_hash,
+            integrity_hash=p.integrity_hash,
+            integrity_salt=p.salt,
+            payload=json.loads(p.payload_json),
+            created_at=p.timestamp,
+            burst_blob=None,
+        )
+        for index, p in enumerate(pendings)
+    ]
+
+
+class NullSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class MemoryVerifier(LedgerVerifier):
+    """Verificador sobre filas en memoria: mismo orden y checkpoint que las consultas reales."""
+
+    def __init__(self, rows, checkpoint=None, chunk_size=4):
+        super().__init__(NullSession, chunk_size=chunk_size, workers=1)
+        self.rows = rows
+        self.checkpoint = checkpoint
+
+    async def _stream(self, after_height):
+        legacy = [row for row in self.rows if row.chain_height is None] if after_height == 0 else []
+        sequenced = sorted(
+            (row for row in self.rows if row.chain_height is not None and row.chain_height > after_height),
+            key=lambda row: row.chain_height,
+        )
+        for stretch in (legacy, sequenced):
+            for start in range(0, len(stretch), self.chunk_size):
+                yield stretch[start:start + self.chunk_size]
+
+    async def _load_checkpoint(self, session):
+        return self.checkpoint
+
+    async def _save_checkpoint(self, session, report):
+        if self.checkpoint is None or self.checkpoint.verified_height <= report.verified_height:
+            self.checkpoint = SimpleNamespace(verified_height=report.verified_height, verified_hash=report.verified_hash)
+
+
+def test_legacy_rows_take_the_heights_before_the_first_sequenced_crum():
+    rows = _ledger([{"n": index} for index in range(10)], legacy=3)
+    verifier = MemoryVerifier(rows)
+
+    report = asyncio.run(verifier.run())
+
+    assert report.is_secure
+    assert (report.verified_height, report.verified_hash) == (10, rows[-1].integrity_hash)
+
+
+def test_checkpoint_resumes_after_the_legacy_stretch():
+    rows = _ledger([{"n": index} for index in range(8)], legacy=5)
+    verifier = MemoryVerifier(rows[:5])
+    first = asyncio.run(verifier.run())
+
+    verifier.rows = rows
+    second = asyncio.run(verifier.run())
+
+    assert (first.verified_height, first.verified_hash) == (5, rows[4].integrity_hash)
+    assert (second.from_height, second.rows_scanned, second.verified_height) == (5, 3, 8)
+    assert second.is_secure
+
+
+def test_sequenced_height_that_skips_the_legacy_count_is_a_broken_link():
+    rows = _ledger([{"n": index} for index in range(6)], legacy=2)
+    for row in rows[2:]:
+        # Numeración antigua: el primer secuenciado arrancó en 1 en vez de en L+1
+        row.chain_height -= 2
+
+    report = asyncio.run(MemoryVerifier(rows).run())
+
+    assert report.broken_links[0] == str(rows[2].id)
+    # El tramo sin altura sí quedó verificado
+    assert report.verified_height == 2
+
+
+def test_tampered_row_stops_the_checkpoint_at_the_block_before_it():
+    rows = _ledger([{"n": index} for index in range(12)])
+    rows[9].payload = {"n": 900}
+
+    report = asyncio.run(MemoryVerifier(rows, chunk_size=4).run())
+
+    assert report.tampered == [str(rows[9].id)]
+    assert report.verified_height == 8
+
+
+def test_numbers_that_survive_jsonb_verify_after_the_round_trip():
+    payload = {"big": 10 ** 17, "small": 1.5e-07, "ratio": 2.0, "nested": [{"x": -3.25}]}
+    rows = _ledger([payload])
+    row = rows[0]
+    records = [(str(row.id), row.parent_hash, row.payload, row.created_at, row.integrity_salt, None, row.integrity_hash)]
+
+    entity = TAMVCrumEntity(
+        id=row.id,
+        parent_hash=row.parent_hash,
+        integrity_hash=row.integrity_hash,
+        integrity_salt=row.integrity_salt,
+        payload=row.payload,
+        created_at=row.created_at,
+    )
+
+    assert _find_tampered(records) == []
+    assert not entity.is_tampered
+
+
+@pytest.mark.parametrize(
+    "payload, reason",
+    [
+        ({"power": 1e16}, r"float_not_jsonb_stable at \$.power"),
+        ({"ecg": {"series": [0.5, -0.0]}}, r"negative_zero at \$.ecg.series\[1\]"),
+        ({"x": float("nan")}, "non_finite_number"),
+    ],
+)
+def test_numbers_that_jsonb_would_rewrite_are_rejected_at_ingest(payload, reason):
+    with pytest.raises(PayloadEncodingError, match=reason):
+        encode_payload(payload)
+
+
+def test_legacy_numbering_is_a_single_update_from_a_window():
+    class RecordingSession:
+        def __init__(self):
+            self.statements = []
+
+        async def execute(self, stmt):
+            self.statements.append(stmt)
+            return SimpleNamespace(one=lambda: (4, None), scalar=lambda: 4)
+
+    session = RecordingSession()
+    height = asyncio.run(number_legacy_rows(session, "global"))
+
+    update_sql = str(session.statements[1].compile(dialect=postgresql.dialect()))
+    assert height == 4
+    assert update_sql.startswith("UPDATE tamv_crums_ledger SET chain_height=anon_1.position FROM")
+    assert "row_number() OVER (ORDER BY tamv_crums_ledger.created_at, tamv_crums_ledger.id)" in update_sql
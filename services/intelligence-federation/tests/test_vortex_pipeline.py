@@ -0,0 +1,153 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from fastapi import WebSocketDisconnect  # noqa: E402
+
+from src.api.v1.vortex_pipeline import VortexPipeline  # noqa: E402
+from src.neural.burst_codec import BURST_STRUCT  # noqa: E402
+from src.neural.synapse_mapper import SynapseMapper  # noqa: E402
+
+
+class FakeSocket:
+    """Socket de dispositivo: entrega `frames` y cuelga cuando se le pide (hangup)."""
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.reads = 0
+        self.sent = []
+        self.hangup = asyncio.Event()
+        self.client = SimpleNamespace(host="198.51.100.7")
+
+    async def receive_bytes(self):
+        if not self.frames:
+            await self.hangup.wait()
+            raise WebSocketDisconnect(code=1000)
+        self.reads += 1
+        return self.frames.pop(0)
+
+    async def send_json(self, frame):
+        self.sent.append(frame)
+
+    def acked(self):
+        return [crum_id for frame in self.sent for crum_id in frame["crum_ids"]]
+
+
+class GatedIngestor:
+    """Ingestor que ancla cuando `gate` está abierto; `fail_power` simula un commit que revienta."""
+
+    def __init__(self, fail_power=None):
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.fail_power = fail_power
+        self.committed = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def commit_crum(self, raw_data, agent_profile, creator_ctx, binary_payload=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await self.gate.wait()
+            await asyncio.sleep(0)
+            if raw_data["power"] == self.fail_power:
+                raise RuntimeError("db_down")
+            self.committed.append((raw_data, creator_ctx, binary_payload))
+            return f"crum-{len(self.committed)}"
+        finally:
+            self.in_flight -= 1
+
+
+def _burst(freq, power=10.0):
+    return BURST_STRUCT.pack(freq, power, 1)
+
+
+async def _until(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timeout"
+        await asyncio.sleep(0.005)
+
+
+def test_acks_are_coalesced_into_batch_frames():
+    async def scenario():
+        socket = FakeSocket([_burst(float(index)) for index in range(40)])
+        ingestor = GatedIngestor()
+        pipeline = VortexPipeline(socket, "did:tamv:dev", ingestor, concurrency=8, ack_interval_ms=20)
+        runner = asyncio.create_task(pipeline.run())
+        await _until(lambda: len(socket.acked()) == 40)
+        socket.hangup.set()
+        await runner
+        return socket, ingestor
+
+    socket, ingestor = asyncio.run(scenario())
+
+    # 40 ráfagas, muy pocas tramas: una por intervalo, no una por ráfaga
+    assert len(socket.sent) < 10
+    assert sorted(socket.acked()) == sorted(f"crum-{index}" for index in range(1, 41))
+    assert {frame["status"] for frame in socket.sent} == {"SYNAPSE_SHIFT_BATCH"}
+    raw, creator, blob = ingestor.committed[0]
+    assert creator == {"did": "did:tamv:dev", "origin": "sensor"}
+    assert BURST_STRUCT.unpack(blob)[0] == raw["freq"]
+    assert 1 < ingestor.peak <= 8
+
+
+def test_a_stalled_ingestor_stops_the_socket_reads():
+    async def scenario():
+        socket = FakeSocket([_burst(float(index)) for index in range(50)])
+        ingestor = GatedIngestor()
+        ingestor.gate.clear()
+        pipeline = VortexPipeline(socket, "did:tamv:dev", ingestor, queue_size=4, concurrency=2, ack_interval_ms=5)
+        runner = asyncio.create_task(pipeline.run())
+        await asyncio.sleep(0.05)
+        stalled_reads = socket.reads
+        ingestor.gate.set()
+        await _until(lambda: len(socket.acked()) == 50)
+        socket.hangup.set()
+        await runner
+        return stalled_reads
+
+    # 2 en los workers + 4 en la cola + 1 esperando sitio en la cola
+    assert asyncio.run(scenario()) == 7
+
+
+def test_malformed_and_failed_bursts_are_counted_in_the_next_frame():
+    async def scenario():
+        frames = [_burst(1.0), b"\x00" * 3, _burst(2.0, power=666.0), _burst(3.0)]
+        socket = FakeSocket(frames)
+        pipeline = VortexPipeline(socket, "did:tamv:dev", GatedIngestor(fail_power=666.0), ack_interval_ms=10)
+        runner = asyncio.create_task(pipeline.run())
+        await _until(lambda: len(socket.acked()) == 2)
+        socket.hangup.set()
+        await runner
+        return socket.sent
+
+    sent = asyncio.run(scenario())
+
+    assert sum(frame["malformed"] for frame in sent) == 1
+    assert sum(frame["failed"] for frame in sent) == 1
+
+
+def test_window_is_mapped_once_per_ack_frame():
+    mapper = SynapseMapper()
+
+    async def scenario():
+        socket = FakeSocket([_burst(100.0, 50.0), _burst(500.0, 200.0)])
+        pipeline = VortexPipeline(socket, "did:tamv:dev", GatedIngestor(), mapper=mapper, ack_interval_ms=30)
+        runner = asyncio.create_task(pipeline.run())
+        await _until(lambda: len(socket.acked()) == 2)
+        socket.hangup.set()
+        await runner
+        return [frame["synapse"] for frame in socket.sent if frame["synapse"]]
+
+    synapses = asyncio.run(scenario())
+
+    assert sum(synapse["bursts"] for synapse in synapses) == 2
+    last = synapses[-1]
+    assert last["temperature"] == pytest.approx(1.5)
+    assert last["top_p"] == pytest.approx(0.6)
+    assert last["sensory_mode"] == "ECSTASY"
+    assert mapper.entropy_for("did:tamv:dev") == pytest.approx(10.0)
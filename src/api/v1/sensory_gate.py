@@ -1,45 +1,49 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Header
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Header
+from starlette.requests import HTTPConnection
+from ...core.container import get_ingestor, get_sentinel
 from ...core.ingestor import SovereignIngestor
+from ...core.profiling import incr, stage
+from ...neural.synapse_mapper import SynapseMapper
 from ...security.anubis import AnubisSentinel
+from .vortex_pipeline import VortexPipeline
 
 router = APIRouter(prefix="/v1/sinderesis")
 
+
+def get_mapper(conn: HTTPConnection) -> SynapseMapper:
+    """
+    SynapseMapper app-scoped del gate sensorial: vive junto al árbol neural, así
+    que lo crea este módulo (no el ServiceContainer) en la primera conexión y
+    todas las siguientes comparten su estado de entropía por DID.
+    """
+    mapper = getattr(conn.app.state, "synapse_mapper", None)
+    if mapper is None:
+        mapper = conn.app.state.synapse_mapper = SynapseMapper()
+    return mapper
+
+
 @router.websocket("/vortex/{did}")
 async def vortex_socket(
-    websocket: WebSocket, 
-    did: str, 
-    ingestor: SovereignIngestor,
-    anubis: AnubisSentinel
+    websocket: WebSocket,
+    did: str,
+    ingestor: SovereignIngestor = Depends(get_ingestor),
+    anubis: AnubisSentinel = Depends(get_sentinel),
+    mapper: SynapseMapper = Depends(get_mapper),
 ):
     """
     SINDÉRESIS-X VORTEX GATE.
     Recibe ráfagas binarias del SovereignController.
+    Ingestor y ANUBIS son los app-scoped del ServiceContainer y el mapper el del gate: la conexión no crea servicios.
     """
     await websocket.accept()
-    
+
     # Validar Identidad antes de permitir flujo sensorial
-    if not await anubis.validate_id_nvida(did):
+    with stage("anubis"):
+        authorized = await anubis.validate_id_nvida(did)
+    if not authorized:
+        incr("vortex_rejected")
         await websocket.close(code=4003) # Unauthorized
         return
 
-    try:
-        while True:
-            # Recepción de ráfaga binaria (Freq:Power:Type)
-            burst = await websocket.receive_bytes()
-            
-            # Capa 2 & 4: Mapeo y Anclaje Inmutable
-            crum_id = await ingestor.commit_crum(
-                raw_data={"action": "SINDÉRESIS_BURST", "binary_burst": True, "raw_hex": burst.hex()},
-                agent_profile={"ip": websocket.client.host, "trace_id": "VORTEX-STREAM"},
-                creator_ctx={"did": did}
-            )
-            
-            # Capa 7: Feedback instantáneo al Dashboard
-            await websocket.send_json({
-                "status": "SYNAPSE_SHIFT_COMPLETE",
-                "crum_id": crum_id,
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            })
-
-    except WebSocketDisconnect:
-        logger.info("VORTEX_DISCONNECTED", did=did)
+    # Tubería por conexión: cola acotada, anclaje concurrente y ACKs agrupados
+    await VortexPipeline(websocket, did, ingestor, mapper=mapper).run()
@@ -0,0 +1,152 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+from fastapi import WebSocket, WebSocketDisconnect
+
+from ...core.ingestor import SovereignIngestor
+from ...core.profiling import incr, stage
+from ...neural.burst_codec import SensoryBurst, decode_burst, decode_burst_window
+from ...neural.synapse_mapper import SynapseMapper
+
+logger = structlog.get_logger("tamv.vortex")
+
+
+class VortexPipeline:
+    """
+    Tubería por conexión del VORTEX GATE.
+    Recepción -> cola acotada (backpressure) -> anclaje concurrente -> ACKs agrupados.
+    Con un SynapseMapper, cada ventana de ACK se mapea en un solo paso vectorizado.
+    La memoria queda acotada por queue_size + concurrency + max_pending_acks.
+    """
+    def __init__(
+        self,
+        websocket: WebSocket,
+        did: str,
+        ingestor: SovereignIngestor,
+        mapper: Optional[SynapseMapper] = None,
+        queue_size: int = 1024,
+        concurrency: int = 64,
+        ack_interval_ms: float = 50.0,
+        max_pending_acks: int = 4096,
+    ):
+        self.websocket = websocket
+        self.did = did
+        self.ingestor = ingestor
+        self.mapper = mapper
+        self.max_window = max_pending_acks
+        self.concurrency = concurrency
+        self.ack_interval = ack_interval_ms / 1000.0
+        self._bursts: "asyncio.Queue[Tuple[SensoryBurst, bytes]]" = asyncio.Queue(maxsize=queue_size)
+        self._acks: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_pending_acks)
+        self._failed = 0
+        self._malformed = 0
+        self._closed = False
+        self._window: List[bytes] = []
+        self._agent_profile = {"ip": websocket.client.host, "trace_id": "VORTEX-STREAM"}
+
+    async def run(self) -> None:
+        workers = [asyncio.create_task(self._anchor_worker()) for _ in range(self.concurrency)]
+        acker = asyncio.create_task(self._ack_flusher())
+        try:
+            await self._receive_loop()
+        except WebSocketDisconnect:
+            self._closed = True
+            logger.info("VORTEX_DISCONNECTED", did=self.did)
+        finally:
+            # Las ráfagas ya recibidas se anclan aunque el socket haya caído
+            await self._bursts.join()
+            for task in (*workers, acker):
+                task.cancel()
+            await asyncio.gather(*workers, acker, return_exceptions=True)
+
+    async def _receive_loop(self) -> None:
+        while True:
+            # Recepción de ráfaga binaria (Freq:Power:Type)
+            burst = await self.websocket.receive_bytes()
+            try:
+                with stage("validation"):
+                    frame = decode_burst(burst)
+            except ValueError:
+                self._malformed += 1
+                incr("vortex_malformed")
+                continue
+            if self.mapper is not None and len(self._window) < self.max_window:
+                self._window.append(burst)
+            # Cola llena => se deja de leer el socket (backpressure TCP)
+            await self._bursts.put((frame, burst))
+
+    async def _anchor_worker(self) -> None:
+        while True:
+            frame, burst = await self._bursts.get()
+            try:
+                # Capa 2 & 4: Mapeo y Anclaje Inmutable (bytes crudos fuera del JSONB)
+                with stage("vortex_anchor"):
+                    crum_id = await self.ingestor.commit_crum(
+                        raw_data={
+                            "action": "SINDÉRESIS_BURST",
+                            "binary_burst": True,
+                            "freq": frame.freq,
+                            "power": frame.power,
+                            "burst_type": frame.burst_type,
+                        },
+                        agent_profile=dict(self._agent_profile),
+                        # Ráfaga de sensor: identidad validada por ANUBIS, sin firma por ráfaga
+                        creator_ctx={"did": self.did, "origin": "sensor"},
+                        binary_payload=burst,
+                    )
+                if not self._closed:
+                    await self._acks.put(crum_id)
+            except Exception as e:
+                self._failed += 1
+                incr("vortex_failed")
+                logger.error("VORTEX_ANCHOR_FAILED", did=self.did, error=str(e))
+            finally:
+                self._bursts.task_done()
+
+    async def _ack_flusher(self) -> None:
+        """Capa 7: Feedback al Dashboard en tramas periódicas con los crum_id anclados."""
+        while True:
+            await asyncio.sleep(self.ack_interval)
+            crum_ids = self._drain_acks()
+            if not crum_ids and not self._failed and not self._malformed:
+                continue
+            frame = {
+                "status": "SYNAPSE_SHIFT_BATCH",
+                "crum_ids": crum_ids,
+                "failed": self._failed,
+                "malformed": self._malformed,
+                "synapse": self._map_window(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }
+            self._failed = self._malformed = 0
+            try:
+                await self.websocket.send_json(frame)
+            except (WebSocketDisconnect, RuntimeError):
+                # Socket caído: liberar a los workers bloqueados en la cola de ACKs
+                self._closed = True
+                self._drain_acks()
+                return
+
+    def _map_window(self) -> Optional[Dict[str, Any]]:
+        """Capa 2: mapeo neuro-difuso de toda la ventana recibida desde el último ACK."""
+        if self.mapper is None or not self._window:
+            return None
+        window, self._window = decode_burst_window(self._window), []
+        shift = self.mapper.map_window(self.did, window)
+        return {
+            "bursts": int(window.size),
+            "temperature": float(shift["temperature"][-1]),
+            "top_p": float(shift["top_p"][-1]),
+            "entropy_peak": float(shift["entropy"].max()),
+            "sensory_mode": str(shift["sensory_mode"][-1]),
+        }
+
+    def _drain_acks(self) -> List[str]:
+        crum_ids: List[str] = []
+        while True:
+            try:
+                crum_ids.append(self._acks.get_nowait())
+            except asyncio.QueueEmpty:
+                return crum_ids
@@ -0,0 +1,47 @@
+import math
+import struct
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+# Formato de ráfaga Freq:Power:Type (little-endian, 9 bytes)
+#   freq  : float32 (Hz)
+#   power : float32 (W)
+#   type  : uint8   (canal sensorial)
+BURST_STRUCT = struct.Struct("<ffB")
+BURST_SIZE = BURST_STRUCT.size
+BURST_DTYPE = np.dtype([("freq", "<f4"), ("power", "<f4"), ("type", "u1")])
+
+
+class SensoryBurst(NamedTuple):
+    freq: float
+    power: float
+    burst_type: int
+
+
+def decode_burst(burst: bytes) -> SensoryBurst:
+    """Decodifica una ráfaga binaria de disposición fija a campos tipados."""
+    if len(burst) != BURST_SIZE:
+        raise ValueError(f"Ráfaga inválida: se esperaban {BURST_SIZE} bytes, llegaron {len(burst)}.")
+    frame = SensoryBurst(*BURST_STRUCT.unpack(burst))
+    if not (math.isfinite(frame.freq) and math.isfinite(frame.power)):
+        raise ValueError("Ráfaga inválida: freq/power no finitos.")
+    return frame
+
+
+def decode_burst_window(bursts: Sequence[bytes]) -> np.ndarray:
+    """
+    Decodifica una ventana de ráfagas en un solo paso vectorizado.
+    Devuelve un arreglo estructurado con campos freq/power/type.
+    Cada ráfaga se valida por separado: una corta y una larga que suman el
+    tamaño correcto desalinearían toda la ventana.
+    """
+    for index, burst in enumerate(bursts):
+        if len(burst) != BURST_SIZE:
+            raise ValueError(
+                f"Ventana inválida: la ráfaga {index} tiene {len(burst)} bytes, se esperaban {BURST_SIZE}."
+            )
+    window = np.frombuffer(b"".join(bursts), dtype=BURST_DTYPE)
+    if not (np.isfinite(window["freq"]).all() and np.isfinite(window["power"]).all()):
+        raise ValueError("Ventana inválida: freq/power no finitos.")
+    return window
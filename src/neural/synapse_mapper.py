@@ -1,14 +1,26 @@
+from collections import OrderedDict
+from typing import Dict
+
 import numpy as np
 
+# Índice 0 = STABLE, 1 = ECSTASY (umbral de entropía 0.8)
+SENSORY_MODES = np.array(["STABLE", "ECSTASY"])
+ECSTASY_THRESHOLD = 0.8
+
 class SynapseMapper:
     """
     Mapeador Neuro-Difuso SINDÉRESIS-X.
     Altera los pesos de atención del núcleo IA.
+    El estado de entropía se guarda por DID en un arreglo compacto float32,
+    acotado a max_dids: el DID usado hace más tiempo cede su slot (LRU).
     """
-    def __init__(self):
-        self.state_entropy = 0.0
+    def __init__(self, capacity: int = 1024, max_dids: int = 65_536):
+        self.max_dids = max_dids
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._entropy = np.zeros(min(capacity, max_dids), dtype=np.float32)
+        self._last_entropy = 0.0
 
-    def calculate_attention_shift(self, freq: float, power: float) -> dict:
+    def calculate_attention_shift(self, freq: float, power: float, did: str = "ROOT") -> dict:
         """
         Traduce ráfagas sensoriales en ajustes de hiperparámetros.
         """
@@ -16,13 +28,73 @@ class SynapseMapper:
         # A mayor potencia (W), menor es el filtrado ético/lógico
         temperature = min(1.0 + (freq / 1000.0), 2.0)
         top_p = max(1.0 - (power / 500.0), 0.1)
-        
+
         # Cálculo de entropía sensorial
-        self.state_entropy = (freq * power) / 10000.0
+        entropy = (freq * power) / 10000.0
+        # El slot primero: _slot puede reemplazar el arreglo al crecer
+        slot = self._slot(did)
+        self._entropy[slot] = entropy
+        self._last_entropy = entropy
 
         return {
             "temperature": temperature,
             "top_p": top_p,
-            "entropy": self.state_entropy,
-            "sensory_mode": "ECSTASY" if self.state_entropy > 0.8 else "STABLE"
+            "entropy": entropy,
+            "sensory_mode": "ECSTASY" if entropy > ECSTASY_THRESHOLD else "STABLE"
         }
+
+    def map_bursts(self, did: str, freq: np.ndarray, power: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Versión vectorizada: mapea una ventana completa de ráfagas en un solo paso.
+        Devuelve arreglos alineados con la entrada; el estado del DID queda en la última ráfaga.
+        """
+        freq = np.asarray(freq, dtype=np.float32)
+        power = np.asarray(power, dtype=np.float32)
+
+        temperature = np.minimum(1.0 + freq / 1000.0, 2.0)
+        top_p = np.maximum(1.0 - power / 500.0, 0.1)
+        entropy = (freq * power) / 10000.0
+
+        if entropy.size:
+            slot = self._slot(did)
+            self._entropy[slot] = entropy[-1]
+            self._last_entropy = float(entropy[-1])
+
+        return {
+            "temperature": temperature,
+            "top_p": top_p,
+            "entropy": entropy,
+            "sensory_mode": SENSORY_MODES[(entropy > ECSTASY_THRESHOLD).astype(np.intp)],
+        }
+
+    def map_window(self, did: str, window: np.ndarray) -> Dict[str, np.ndarray]:
+        """Atajo para ventanas estructuradas producidas por decode_burst_window."""
+        return self.map_bursts(did, window["freq"], window["power"])
+
+    @property
+    def state_entropy(self) -> float:
+        """Última entropía sensorial registrada, de cualquier DID (contrato original)."""
+        return self._last_entropy
+
+    def entropy_for(self, did: str) -> float:
+        """Última entropía sensorial registrada para un DID."""
+        slot = self._slots.get(did)
+        return float(self._entropy[slot]) if slot is not None else 0.0
+
+    def _slot(self, did: str) -> int:
+        slot = self._slots.get(did)
+        if slot is not None:
+            self._slots.move_to_end(did)
+            return slot
+        if len(self._slots) >= self.max_dids:
+            # Lleno: el DID menos reciente cede su slot
+            _, slot = self._slots.popitem(last=False)
+            self._entropy[slot] = 0.0
+        else:
+            slot = len(self._slots)
+            if slot >= self._entropy.size:
+                # Crecimiento geométrico del estado compacto, hasta max_dids
+                grown = min(max(2 * self._entropy.size, 1), self.max_dids)
+                self._entropy = np.concatenate([self._entropy, np.zeros(grown - self._entropy.size, dtype=np.float32)])
+        self._slots[did] = slot
+        return slot
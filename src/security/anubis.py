@@ -1,45 +1,146 @@
+import asyncio
 import json
+import time
 import structlog
+from collections import OrderedDict
 from redis.asyncio import Redis
 from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
 
 logger = structlog.get_logger("tamv.security")
 
+# Actualización atómica de reputación: un solo round-trip (INCRBYFLOAT + EXPIRE)
+REPUTATION_LUA = """
+local score = redis.call('INCRBYFLOAT', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return score
+"""
+
 class AnubisSentinel:
-    def __init__(self, redis: Redis):
+    def __init__(self, redis: Redis, broadcaster: Optional[Any] = None, max_denied: int = 100_000):
         self.redis = redis
+        # CrisisBroadcaster opcional: evita tormentas de LOCKDOWN ante DIDs inválidos en masa
+        self.broadcaster = broadcaster
         self.ROOT_DID = "did:tamv:edwin-oswaldo-castillo-trejo"
         self.CRISIS_CHANNEL = "anubis:crisis_channel"
+        self.RISK_THRESHOLD = 75.0
+        self.REPUTATION_TTL = 3600
+        self._reputation_script = redis.register_script(REPUTATION_LUA)
+        # Caché local allow/deny: ip -> instante (monotónico) de expiración del bloqueo.
+        # TTL único: el orden de inserción es el orden de expiración; acotada a max_denied
+        self.max_denied = max_denied
+        self._denied: "OrderedDict[str, float]" = OrderedDict()
+        self._background: Set[asyncio.Task] = set()
+
+    def is_ip_allowed(self, ip: str) -> bool:
+        """Consulta local en microsegundos; la red solo se toca al actualizar reputación."""
+        expires_at = self._denied.get(ip)
+        if expires_at is None:
+            return True
+        if expires_at <= time.monotonic():
+            del self._denied[ip]
+            return True
+        return False
 
     async def validate_id_nvida(self, did: str) -> bool:
         """Verifica si el ejecutor es el Arquitecto Raíz."""
         is_root = (did == self.ROOT_DID)
         if not is_root:
-            await self.emergency_shutdown_trigger(f"UNAUTHORIZED_ACCESS_ATTEMPT: {did}")
+            await self.emergency_shutdown_trigger("UNAUTHORIZED_ACCESS_ATTEMPT", source=did)
         return is_root
 
-    async def emergency_shutdown_trigger(self, reason: str):
+    async def emergency_shutdown_trigger(self, reason: str, source: str = "ANUBIS"):
         """Protocolo de muerte y renacimiento (Capa 5)."""
+        if self.broadcaster is not None:
+            await self.broadcaster.signal(source=source, reason=f"FORCE_SHUTDOWN: {reason}", threat_level=100.0, status="LOCKDOWN")
+            logger.critical("ANUBIS_LOCKDOWN_ACTIVATED", reason=reason, source=source)
+            return
         payload = {
             "status": "LOCKDOWN",
             "threatLevel": 100.0,
-            "lastEvent": f"FORCE_SHUTDOWN: {reason}",
+            "lastEvent": f"FORCE_SHUTDOWN: {reason} at {source}",
             "timestamp": datetime.now(timezone.utc).timestamp()
         }
         await self.redis.publish(self.CRISIS_CHANNEL, json.dumps(payload))
-        logger.critical("ANUBIS_LOCKDOWN_ACTIVATED", reason=reason)
+        logger.critical("ANUBIS_LOCKDOWN_ACTIVATED", reason=reason, source=source)
 
     async def log_attempt(self, ip: str, success: bool, reason: str = None):
         """Gestiona la reputación de IP en el bus de eventos."""
         key = f"anubis:reputation:{ip}"
-        score = await self.redis.incrbyfloat(key, -1.5 if success else 15.0)
-        await self.redis.expire(key, 3600)
-        if score > 75.0:
+        score = float(await self._reputation_script(
+            keys=[key], args=[-1.5 if success else 15.0, self.REPUTATION_TTL]
+        ))
+        if score > self.RISK_THRESHOLD:
+            self._deny(ip)
             await self._broadcast_crisis(ip, score)
+        elif ip in self._denied:
+            self._denied.pop(ip, None)
+
+    def record_attempt(self, ip: str, success: bool, reason: Optional[str] = None) -> None:
+        """Versión fuera del camino crítico: la reputación se actualiza en segundo plano."""
+        task = asyncio.create_task(self.log_attempt(ip, success, reason))
+        self._background.add(task)
+        task.add_done_callback(self._reap)
+
+    def _reap(self, task: asyncio.Task) -> None:
+        """Recoge la tarea de fondo; su excepción se registra en lugar de perderse."""
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("anubis_reputation_update_failed", error=str(task.exception()))
+
+    async def listen_crisis_channel(self):
+        """
+        Mantiene la caché local coherente entre réplicas: toda señal de crisis
+        con source_ip (o source_ips, en resúmenes de tormenta) bloquea esas IPs
+        localmente durante el TTL de reputación, y una señal CLEARED las libera.
+        """
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.CRISIS_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    event = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                self._apply_crisis_event(event)
+        finally:
+            await pubsub.unsubscribe(self.CRISIS_CHANNEL)
+
+    def _apply_crisis_event(self, event: Dict[str, Any]) -> None:
+        """Las IPs fuera de la muestra del resumen (unsampled) solo las bloquea la réplica de origen."""
+        ips = list(event.get("source_ips") or ())
+        if event.get("source_ip"):
+            ips.append(event["source_ip"])
+        status = event.get("status")
+        if status in ("CRITICAL", "LOCKDOWN"):
+            for ip in ips:
+                self._deny(ip)
+            if event.get("unsampled"):
+                logger.warning("crisis_summary_unsampled", unsampled=event["unsampled"], denied=len(ips))
+        elif status == "CLEARED":
+            for ip in ips:
+                self._denied.pop(ip, None)
+
+    def _deny(self, ip: str):
+        now = time.monotonic()
+        self._denied[ip] = now + self.REPUTATION_TTL
+        self._denied.move_to_end(ip)
+        # Barrido de expirados desde el frente; en tormenta, se descartan los más antiguos
+        while self._denied:
+            expires_at = next(iter(self._denied.values()))
+            if expires_at > now and len(self._denied) <= self.max_denied:
+                break
+            self._denied.popitem(last=False)
 
     async def _broadcast_crisis(self, ip: str, score: float):
+        if self.broadcaster is not None:
+            await self.broadcaster.signal(source=ip, reason="HIGH_RISK_DETECTED", threat_level=score, source_ip=ip)
+            return
         await self.redis.publish(self.CRISIS_CHANNEL, json.dumps({
             "status": "CRITICAL",
             "threatLevel": score,
-            "lastEvent": f"HIGH_RISK_DETECTED: {ip}"
+            "lastEvent": f"HIGH_RISK_DETECTED: {ip}",
+            "source_ip": ip,
         }))